@@ -0,0 +1,93 @@
+"""
+Compares the legacy str based response decoding with the bytes based one, for
+each available JSON codec, on a large ``/v1/catalog/nodes`` like payload.
+
+    python -m benchmarks.decode --size-mb 10
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import requests
+
+import consul.std
+from consul import base, codec
+from consul.callback import CB
+
+
+def make_payload(size_mb):
+    """Build a catalog nodes JSON document of roughly *size_mb* megabytes"""
+    nodes = []
+    size = 0
+    i = 0
+    while size < size_mb * 1024 * 1024:
+        node = {
+            "ID": f"{i:08x}-4b2e-9c5d-a1f0-3e2d1c0b9a87",
+            "Node": f"node-{i}",
+            "Address": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "Datacenter": "dc1",
+            "TaggedAddresses": {"lan": "10.0.0.1", "wan": "10.0.0.1"},
+            "Meta": {"consul-network-segment": "", "rack": f"r{i % 40}"},
+            "CreateIndex": i,
+            "ModifyIndex": i,
+        }
+        size += len(json.dumps(node)) + 2
+        nodes.append(node)
+        i += 1
+    return json.dumps(nodes).encode("utf-8")
+
+
+def make_response(payload):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["X-Consul-Index"] = "42"
+    response._content = payload  # pylint: disable=protected-access
+    return response
+
+
+def text_response(response):
+    """Response conversion as done before bodies were kept as bytes"""
+    response.encoding = "utf-8"
+    return base.Response(response.status_code, response.headers, response.text)
+
+
+def measure(convert, json_codec, payload, repeat):
+    http = consul.std.HTTPClient()
+    callback = CB.json(index=True, codec=json_codec)
+    timings = []
+    peaks = []
+    for _ in range(repeat):
+        response = make_response(payload)
+        tracemalloc.start()
+        start = time.perf_counter()
+        callback(convert(http, response))
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return min(timings), min(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = make_payload(args.size_mb)
+    print(f"payload: {len(payload) / 1024 / 1024:.1f} MB, best of {args.repeat}")
+    paths = [("str (legacy)", lambda http, response: text_response(response), codec.JSONCodec())]
+    for name, codec_class in codec.CODECS.items():
+        try:
+            json_codec = codec_class()
+        except ImportError:
+            continue
+        paths.append((f"bytes {name}", lambda http, response: http.response(response), json_codec))
+    for name, convert, json_codec in paths:
+        elapsed, peak = measure(convert, json_codec, payload, args.repeat)
+        print(f"{name:>14}: {elapsed * 1000:8.1f} ms  peak {peak / 1024 / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Measures the memory taken by parsing large responses, for each available JSON
+codec: a ``health.state("any")`` of every check of a cluster and a
+``kv.get(recurse=True)`` of a large tree, run through the same ``CB.json``
+callbacks as the endpoints.
+
+    python -m benchmarks.memory --nodes 20000 --keys 200000
+    python -m benchmarks.memory --json > memory-1.5.1.json
+
+*peak* is the tracemalloc peak while parsing, the response body excluded,
+*retained* what the parsed result keeps allocated, both also given per item
+(check or key) to be compared across scales and releases.
+"""
+
+import argparse
+import base64
+import gc
+import json
+import time
+import tracemalloc
+
+from consul import base, codec
+from consul.callback import CB
+
+
+def make_checks(nodes, checks_per_node=2):
+    """Build a /v1/health/state/any JSON document of *checks_per_node* checks for every one of *nodes* nodes"""
+    checks = []
+    for i in range(nodes):
+        checks.append({
+            "Node": f"node-{i}",
+            "CheckID": "serfHealth",
+            "Name": "Serf Health Status",
+            "Status": "passing",
+            "Notes": "",
+            "Output": "Agent alive and reachable",
+            "ServiceID": "",
+            "ServiceName": "",
+            "ServiceTags": [],
+            "Type": "",
+            "Interval": "",
+            "Timeout": "",
+            "CreateIndex": i,
+            "ModifyIndex": i,
+        })
+        for j in range(checks_per_node - 1):
+            checks.append({
+                "Node": f"node-{i}",
+                "CheckID": f"service:web-{i}-{j}",
+                "Name": "Service 'web' check",
+                "Status": "passing",
+                "Notes": "",
+                "Output": "HTTP GET http://10.0.0.1:8080/health: 200 OK Output: ok",
+                "ServiceID": f"web-{i}-{j}",
+                "ServiceName": "web",
+                "ServiceTags": ["v1", "blue"],
+                "Type": "http",
+                "Interval": "10s",
+                "Timeout": "1s",
+                "CreateIndex": i,
+                "ModifyIndex": i,
+            })
+    return json.dumps(checks).encode("utf-8")
+
+
+def make_keys(keys, value_size=64):
+    """Build a /v1/kv/?recurse JSON document of *keys* keys holding *value_size* bytes each"""
+    value = base64.b64encode(b"x" * value_size).decode()
+    entries = [
+        {
+            "LockIndex": 0,
+            "Key": f"config/service-{i % 500}/key-{i:08d}",
+            "Flags": 0,
+            "Value": value,
+            "CreateIndex": i,
+            "ModifyIndex": i,
+        }
+        for i in range(keys)
+    ]
+    return json.dumps(entries).encode("utf-8")
+
+
+def measure(callback, payload):
+    """Returns the time, the tracemalloc peak and the retained bytes of parsing *payload*, and its item count"""
+    response = base.Response(200, {"X-Consul-Index": "42"}, payload)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    _, data = callback(response)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, retained, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--checks-per-node", type=int, default=2)
+    parser.add_argument("--keys", type=int, default=200000)
+    parser.add_argument("--value-size", type=int, default=64, help="bytes")
+    parser.add_argument("--json", action="store_true", help="prints the results as JSON")
+    args = parser.parse_args()
+
+    workloads = [
+        ("health.state", make_checks(args.nodes, args.checks_per_node), {}),
+        ("kv recurse", make_keys(args.keys, args.value_size), {"decode": "Value"}),
+    ]
+    results = []
+    for name, payload, options in workloads:
+        for codec_name, codec_class in codec.CODECS.items():
+            try:
+                json_codec = codec_class()
+            except ImportError:
+                continue
+            elapsed, peak, retained, items = measure(CB.json(index=True, codec=json_codec, **options), payload)
+            results.append({
+                "workload": name,
+                "codec": codec_name,
+                "items": items,
+                "payload_bytes": len(payload),
+                "seconds": elapsed,
+                "peak_bytes": peak,
+                "retained_bytes": retained,
+                "peak_per_item": peak / items,
+                "retained_per_item": retained / items,
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    mb = 1024 * 1024
+    print(f"{'workload':>12} {'codec':>8} {'items':>8} {'payload':>10} {'time':>9} {'peak':>10} {'/item':>7}", end="")
+    print(f" {'retained':>10} {'/item':>7}")
+    for r in results:
+        print(
+            f"{r['workload']:>12} {r['codec']:>8} {r['items']:>8} {r['payload_bytes'] / mb:>7.1f} MB"
+            f" {r['seconds'] * 1000:>6.0f} ms {r['peak_bytes'] / mb:>7.1f} MB {r['peak_per_item']:>7.0f}"
+            f" {r['retained_bytes'] / mb:>7.1f} MB {r['retained_per_item']:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures the start-up cost of the client, each step in a fresh interpreter:
+importing consul, importing a transport, creating a client and using its
+first endpoint. It matters for short-lived CLI jobs and serverless functions.
+
+    python -m benchmarks.startup --repeat 20
+
+Times are the best of *repeat* runs, in milliseconds, the interpreter start
+excluded. The heavy dependencies loaded once the step ran are listed after
+its time, `import consul` should load none.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY = ("requests", "urllib3", "aiohttp", "httpx", "orjson", "ujson")
+
+# name, untimed setup, timed statement
+STEPS = [
+    ("import consul", "", "import consul"),
+    ("import consul.std", "", "import consul.std"),
+    ("import consul.aio", "", "import consul.aio"),
+    ("consul.Consul()", "import consul", "consul.Consul()"),
+    ("first endpoint", "import consul; c = consul.Consul()", "c.kv"),
+]
+
+SCRIPT = """
+import json, sys, time
+{setup}
+start = time.perf_counter()
+{timed}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def measure(setup, timed, repeat):
+    """Returns the best time of *timed* after *setup*, and the heavy modules then loaded"""
+    script = SCRIPT.format(setup=setup, timed=timed, heavy=HEAVY)
+    best, modules = None, []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+        elapsed, modules = json.loads(output)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, setup, timed in STEPS:
+        try:
+            elapsed, modules = measure(setup, timed, args.repeat)
+        except subprocess.CalledProcessError:
+            print(f"{name:>20}: unavailable")
+            continue
+        print(f"{name:>20}: {elapsed * 1000:7.1f} ms  {', '.join(modules) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Micro-benchmarks of the per-call overhead of the client, on canned responses
+so that no time is spent on the network:
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+They require pytest-benchmark (pip install pytest-benchmark).
+"""
+
+import base64
+import json
+
+import pytest
+
+from consul import base
+from consul.callback import CB
+from consul.check import Check
+
+pytest.importorskip("pytest_benchmark")
+
+
+def make_response(body, code=200):
+    return base.Response(code, {"X-Consul-Index": "42"}, body)
+
+
+class CannedHTTPClient(base.HTTPClient):
+    """Answers every request with *response* instead of sending it"""
+
+    response = make_response(b"[]")
+
+    def _answer(self, callback, path, params):
+        self.uri(path, params)
+        return callback(self.response)
+
+    def get(self, callback, path, params=None, headers=None):
+        return self._answer(callback, path, params)
+
+    def put(self, callback, path, params=None, data=""):
+        return self._answer(callback, path, params)
+
+    def delete(self, callback, path, params=None):
+        return self._answer(callback, path, params)
+
+    def post(self, callback, path, params=None, data=""):
+        return self._answer(callback, path, params)
+
+    def close(self):
+        pass
+
+
+class CannedConsul(base.Consul):
+    def http_connect(self, host, port, scheme, verify=True, cert=None):
+        return CannedHTTPClient(host, port, scheme, verify, cert, **self.http_options)
+
+
+def kv_entries(count, value_size=32):
+    value = base64.b64encode(b"x" * value_size).decode()
+    return [
+        {
+            "LockIndex": 0,
+            "Key": f"service/config/{i:08d}",
+            "Flags": 0,
+            "Value": value,
+            "CreateIndex": i,
+            "ModifyIndex": i,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def http():
+    return CannedHTTPClient()
+
+
+class TestURI:
+    def test_no_params(self, benchmark, http):
+        benchmark(http.uri, "/v1/kv/service/config/key")
+
+    def test_params(self, benchmark, http):
+        params = [("dc", "dc1"), ("index", "1234"), ("wait", "5m"), ("stale", "1"), ("token", "secret")]
+        benchmark(http.uri, "/v1/health/service/web", params)
+
+    def test_quoted_key(self, benchmark, http):
+        benchmark(http.uri, "/v1/kv/service/config/a key with spaces & symbols?", [("recurse", "1")])
+
+
+class TestParams:
+    def test_kv_get(self, benchmark):
+        c = CannedConsul(dc="dc1", token="secret", consistency="stale")
+        c.http.response = make_response(json.dumps(kv_entries(1)).encode())
+        benchmark(c.kv.get, "service/config/00000000", index="1234", wait="5m")
+
+    def test_kv_get_recurse_keys(self, benchmark):
+        c = CannedConsul()
+        c.http.response = make_response(b'["a/", "a/b"]')
+        benchmark(c.kv.get, "a/", recurse=True, keys=True, separator="/")
+
+    def test_health_service(self, benchmark):
+        c = CannedConsul(dc="dc1", token="secret")
+        benchmark(
+            c.health.service, "web", index="1234", wait="5m", passing=True, tag=["v1", "blue"], node_meta={"a": "b"}
+        )
+
+    def test_kv_put(self, benchmark):
+        c = CannedConsul()
+        c.http.response = make_response(b"true")
+        benchmark(c.kv.put, "service/config/key", "value", cas=12, flags=3)
+
+
+class TestCallbacks:
+    # pylint: disable=protected-access
+    def test_json_decode_value(self, benchmark):
+        response = make_response(json.dumps(kv_entries(10_000)).encode())
+        callback = CB.json(index=True, decode="Value")
+        benchmark(callback, response)
+
+    def test_json_one(self, benchmark):
+        response = make_response(json.dumps(kv_entries(1)).encode())
+        callback = CB.json(index=True, one=True, decode="Value")
+        benchmark(callback, response)
+
+    def test_status_ok(self, benchmark):
+        benchmark(CB._status, make_response(b"[]"))
+
+    def test_status_not_found(self, benchmark):
+        benchmark(CB._status, make_response(b"", code=404))
+
+    def test_bool(self, benchmark):
+        benchmark(CB.bool(), make_response(b"true"))
+
+
+class TestChecks:
+    # pylint: disable=protected-access
+    def test_http(self, benchmark):
+        benchmark(Check.http, "http://10.0.0.1:8080/health", "10s", timeout="1s", header={"X-Probe": ["1"]})
+
+    def test_tcp(self, benchmark):
+        benchmark(Check.tcp, "10.0.0.1", 8080, "10s", timeout="1s", deregister="1m")
+
+    def test_ttl(self, benchmark):
+        benchmark(Check.ttl, "30s")
+
+    def test_script(self, benchmark):
+        benchmark(Check.script, ["/bin/check", "--fast"], "10s")
+
+    def test_compat(self, benchmark):
+        benchmark(Check._compat, http="http://10.0.0.1:8080/health", interval="10s", timeout="1s")
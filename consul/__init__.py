@@ -1,5 +1,36 @@
+import importlib
+from typing import TYPE_CHECKING
+
 __version__ = "1.5.1"
 
 from consul.check import Check
-from consul.exceptions import ACLDisabled, ACLPermissionDenied, ConsulException, NotFound, Timeout
-from consul.std import Consul
+from consul.exceptions import (
+    ACLDisabled,
+    ACLPermissionDenied,
+    CircuitBreakerOpen,
+    ConsulException,
+    NotFound,
+    Timeout,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    # the lazy names below, declared for linters and type checkers
+    from consul import aio, httpx, std
+    from consul.std import Consul
+
+# imported on first access, so that importing consul doesn't import requests or aiohttp
+_SUBMODULES = ("aio", "httpx", "std")
+
+
+def __getattr__(name):
+    if name == "Consul":
+        Consul = importlib.import_module("consul.std").Consul
+        globals()["Consul"] = Consul
+        return Consul
+    if name in _SUBMODULES:
+        return importlib.import_module(f"consul.{name}")
+    raise AttributeError(f"module 'consul' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted({*globals(), "Consul", *_SUBMODULES})
@@ -1,4 +1,6 @@
 import asyncio
+import functools
+import time
 
 import aiohttp
 
@@ -16,50 +18,139 @@ class HTTPClient(base.HTTPClient):
         connector_kwargs = {}
         if connections_limit:
             connector_kwargs["limit"] = connections_limit
-        connector = aiohttp.TCPConnector(loop=self._loop, verify_ssl=self.verify, **connector_kwargs)
+        if self.socket_path:
+            connector = aiohttp.UnixConnector(path=self.socket_path, loop=self._loop, **connector_kwargs)
+        else:
+            connector = aiohttp.TCPConnector(loop=self._loop, verify_ssl=self.verify, **connector_kwargs)
         session_kwargs = {}
         if connections_timeout:
             timeout = aiohttp.ClientTimeout(total=connections_timeout)
             session_kwargs["timeout"] = timeout
+        if self.compress:
+            # decompress by hand to know the size of the body on the wire
+            session_kwargs["auto_decompress"] = False
+            session_kwargs["headers"] = {"Accept-Encoding": "gzip"}
         self._session = aiohttp.ClientSession(connector=connector, **session_kwargs)
 
-    async def _request(self, callback, method, uri, data=None, connections_timeout=None):
-        session_kwargs = {}
+    async def _send(self, method, uri, data=None, connections_timeout=None, headers=None):
+        session_kwargs = {"headers": headers}
         if connections_timeout:
             timeout = aiohttp.ClientTimeout(total=connections_timeout)
             session_kwargs["timeout"] = timeout
-        resp = await self._session.request(method, uri, data=data, **session_kwargs)
-        body = await resp.text(encoding="utf-8")
-        if resp.status == 599:
-            raise Timeout
-        r = base.Response(resp.status, resp.headers, body)
-        return callback(r)
+        async with self._session.request(method, uri, data=data, **session_kwargs) as resp:
+            body = await resp.read()
+        return resp.status, resp.headers, body
+
+    async def _request(self, callback, method, path, params=None, data=None, headers=None, connections_timeout=None):
+        with self.observe(method, path, params, data) as event:
+            # keyword arguments of every send of this request
+            options = {"connections_timeout": connections_timeout, "headers": headers}
+            attempt = functools.partial(self._attempt, method, path, params, data, options)
+            if event is not None:
+                attempt = event.counted(attempt)
+            if self.retry is None:
+                status, headers, body = await attempt()
+            else:
+                status, headers, body = await self.retry.arun(
+                    method,
+                    attempt,
+                    status=lambda result: result[0],
+                    errors=aiohttp.ClientConnectionError,
+                    connect_failed=lambda e: isinstance(e, aiohttp.ClientConnectorError),
+                )
+            if status == 599:
+                raise Timeout
+            if self.compress:
+                # once per request, like the other transports: neither the
+                # failed attempts nor the health probes are counted
+                body = self.decompress(headers, body)
+            self.invalidate(method)
+            return self.parse(callback, base.Response(status, headers, body), event)
+
+    def _attempt(self, method, path, params, data, options):
+        if self.endpoints is None:
+            return self._guarded_send(None, method, self.uri(path, params), data, options)
+        if self.hedged(method, params):
+            self.endpoints.astart(self._probe)
+            return self.hedge.arun(
+                lambda endpoint: self._endpoint_get(endpoint, path, params, options),
+                self.endpoints.candidates(),
+            )
+        self.endpoints.astart(self._probe)
+        return self.afailover(
+            method,
+            params,
+            lambda endpoint: self._guarded_send(
+                endpoint.base_uri, method, self.uri(path, params, endpoint.base_uri), data, options
+            ),
+            aiohttp.ClientConnectionError,
+            lambda e: isinstance(e, aiohttp.ClientConnectorError),
+        )
 
-    def get(self, callback, path, params=None, connections_timeout=None):
-        uri = self.uri(path, params)
-        return self._request(callback, "GET", uri, connections_timeout=connections_timeout)
+    async def _endpoint_get(self, endpoint, path, params, options):
+        start = time.monotonic()
+        try:
+            result = await self._guarded_send(
+                endpoint.base_uri, "GET", self.uri(path, params, endpoint.base_uri), None, options
+            )
+        except aiohttp.ClientConnectionError:
+            self.endpoints.record_failure(endpoint)
+            raise
+        self.endpoints.record_success(endpoint, time.monotonic() - start)
+        return result
+
+    async def _guarded_send(self, base_uri, method, uri, data, options):
+        with self.guard(base_uri) as call:
+            result = await self._send(method, uri, data=data, **options)
+            call.status = result[0]
+        return result
+
+    async def _probe(self, endpoint):
+        uri = self.uri(self.endpoints.probe_path, base_uri=endpoint.base_uri)
+        status, headers, body = await self._send("GET", uri, connections_timeout=self.endpoints.probe_timeout)
+        if self.compress:
+            body = self.decompress(headers, body, record=False)
+        return self.endpoints.probe_succeeded(status, body)
+
+    async def get(  # pylint: disable=invalid-overridden-method
+        self, callback, path, params=None, headers=None, connections_timeout=None
+    ):
+        hit, result, callback, params = self.cache_lookup(callback, path, params, headers)
+        if hit:
+            return result
+        request = functools.partial(
+            self._request, callback, "GET", path, params, headers=headers, connections_timeout=connections_timeout
+        )
+        key = self.flight_key(callback, path, params, headers)
+        return await (request() if key is None else self.single_flight.ado(key, request))
 
     def put(self, callback, path, params=None, data="", connections_timeout=None):
-        uri = self.uri(path, params)
-        return self._request(callback, "PUT", uri, data=data, connections_timeout=connections_timeout)
+        return self._request(callback, "PUT", path, params, data=data, connections_timeout=connections_timeout)
 
     def delete(self, callback, path, params=None, connections_timeout=None):
-        uri = self.uri(path, params)
-        return self._request(callback, "DELETE", uri, connections_timeout=connections_timeout)
+        return self._request(callback, "DELETE", path, params, connections_timeout=connections_timeout)
 
     def post(self, callback, path, params=None, data="", connections_timeout=None):
-        uri = self.uri(path, params)
-        return self._request(callback, "POST", uri, data=data, connections_timeout=connections_timeout)
+        return self._request(callback, "POST", path, params, data=data, connections_timeout=connections_timeout)
 
     def close(self):
+        if self.endpoints is not None:
+            self.endpoints.stop()
         return self._session.close()
 
 
 class Consul(base.Consul):
-    def __init__(self, *args, loop=None, connections_limit=None, connections_timeout=None, **kwargs):
+    def __init__(self, *args, loop=None, connections_limit=None, connections_timeout=None, compress=False, **kwargs):
+        """
+        *compress* if set, gzip encoded responses are explicitly requested
+        and the transferred sizes are tracked, see compression_stats.
+
+        See base.Consul for the remaining arguments.
+        """
         self._loop = loop or asyncio.get_event_loop()
         self.connections_limit = connections_limit
         self.connections_timeout = connections_timeout
+        self.compress = compress
         super().__init__(*args, **kwargs)
 
     def http_connect(self, host, port, scheme, verify=True, cert=None):
@@ -72,8 +163,14 @@ class Consul(base.Consul):
             connections_timeout=self.connections_timeout,
             verify=verify,
             cert=cert,
+            compress=self.compress,
+            **self.http_options,
         )
 
+    def compression_stats(self):
+        """Returns the transfer counters, see base.HTTPClient.compression_stats"""
+        return self.http.compression_stats()
+
     def close(self):
         """Close all opened http connections"""
         return self.http.close()
@@ -18,7 +18,7 @@ class Policy:
         token = token or self.agent.token
         if token:
             params.append(("token", token))
-        return self.agent.http.get(CB.json(), "/v1/acl/policies", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/acl/policies", params=params)
 
     def read(self, uuid, token=None):
         """
@@ -31,7 +31,7 @@ class Policy:
         token = token or self.agent.token
         if token:
             params.append(("token", token))
-        return self.agent.http.get(CB.json(), f"/v1/acl/policy/{uuid}", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), f"/v1/acl/policy/{uuid}", params=params)
 
     def create(self, name, token=None, description=None, rules=None):
         """
@@ -53,8 +53,8 @@ class Policy:
         if description:
             json_data["Description"] = description
         return self.agent.http.put(
-            CB.json(),
+            CB.json(codec=self.agent.codec),
             "/v1/acl/policy",
             params=params,
-            data=json.dumps(json_data),
+            data=self.agent.codec.dumps(json_data),
         )
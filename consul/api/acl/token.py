@@ -1,5 +1,3 @@
-import json
-
 from consul.callback import CB
 
 
@@ -18,7 +16,7 @@ class Token:
         token = token or self.agent.token
         if token:
             params.append(("token", token))
-        return self.agent.http.get(CB.json(), "/v1/acl/tokens", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/acl/tokens", params=params)
 
     def read(self, accessor_id, token=None):
         """
@@ -31,7 +29,7 @@ class Token:
         token = token or self.agent.token
         if token:
             params.append(("token", token))
-        return self.agent.http.get(CB.json(), f"/v1/acl/token/{accessor_id}", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), f"/v1/acl/token/{accessor_id}", params=params)
 
     def delete(self, accessor_id, token=None):
         """
@@ -61,10 +59,10 @@ class Token:
 
         json_data = {"Description": description}
         return self.agent.http.put(
-            CB.json(),
+            CB.json(codec=self.agent.codec),
             f"/v1/acl/token/{accessor_id}/clone",
             params=params,
-            data=json.dumps(json_data),
+            data=self.agent.codec.dumps(json_data),
         )
 
     def create(self, token=None, accessor_id=None, secret_id=None, policies_id=None, description=""):
@@ -94,10 +92,10 @@ class Token:
             json_data["Policies"] = [{"ID": policy} for policy in policies_id]
 
         return self.agent.http.put(
-            CB.json(),
+            CB.json(codec=self.agent.codec),
             "/v1/acl/token",
             params=params,
-            data=json.dumps(json_data),
+            data=self.agent.codec.dumps(json_data),
         )
 
     def update(self, accessor_id, token=None, secret_id=None, description=""):
@@ -121,8 +119,8 @@ class Token:
         if description:
             json_data["Description"] = description
         return self.agent.http.put(
-            CB.json(),
+            CB.json(codec=self.agent.codec),
             f"/v1/acl/token/{accessor_id}",
             params=params,
-            data=json.dumps(json_data),
+            data=self.agent.codec.dumps(json_data),
         )
@@ -1,5 +1,3 @@
-import json
-
 from consul import Check
 from consul.callback import CB
 
@@ -22,7 +20,7 @@ class Agent:
         """
         Returns configuration of the local agent and member information.
         """
-        return self.agent.http.get(CB.json(), "/v1/agent/self")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/agent/self")
 
     def services(self):
         """
@@ -35,14 +33,14 @@ class Agent:
         anti-entropy, so in most situations everything will be in sync
         within a few seconds.
         """
-        return self.agent.http.get(CB.json(), "/v1/agent/services")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/agent/services")
 
     def service_definition(self, service_id):
         """
         Returns a service definition for a single instance that is registered
         with the local agent.
         """
-        return self.agent.http.get(CB.json(), f"/v1/agent/service/{service_id}")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), f"/v1/agent/service/{service_id}")
 
     def checks(self):
         """
@@ -55,7 +53,7 @@ class Agent:
         anti-entropy, so in most situations everything will be in sync
         within a few seconds.
         """
-        return self.agent.http.get(CB.json(), "/v1/agent/checks")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/agent/checks")
 
     def members(self, wan=False):
         """
@@ -70,7 +68,7 @@ class Agent:
         params = []
         if wan:
             params.append(("wan", 1))
-        return self.agent.http.get(CB.json(), "/v1/agent/members", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/agent/members", params=params)
 
     def maintenance(self, enable, reason=None, token=None):
         """
@@ -229,7 +227,9 @@ class Agent:
             if token:
                 params.append(("token", token))
 
-            return self.agent.http.put(CB.bool(), "/v1/agent/service/register", params=params, data=json.dumps(payload))
+            return self.agent.http.put(
+                CB.bool(), "/v1/agent/service/register", params=params, data=self.agent.codec.dumps(payload)
+            )
 
         def deregister(self, service_id, token=None):
             """
@@ -342,7 +342,9 @@ class Agent:
             if token:
                 params.append(("token", token))
 
-            return self.agent.http.put(CB.bool(), "/v1/agent/check/register", params=params, data=json.dumps(payload))
+            return self.agent.http.put(
+                CB.bool(), "/v1/agent/check/register", params=params, data=self.agent.codec.dumps(payload)
+            )
 
         def deregister(self, check_id, token=None):
             """
@@ -428,7 +430,10 @@ class Agent:
                 params.append(("token", token))
 
             return self.agent.http.put(
-                CB.json(), "/v1/agent/connect/authorize", params=params, data=json.dumps(payload)
+                CB.json(codec=self.agent.codec),
+                "/v1/agent/connect/authorize",
+                params=params,
+                data=self.agent.codec.dumps(payload),
             )
 
         class CA:
@@ -436,7 +441,7 @@ class Agent:
                 self.agent = agent
 
             def roots(self):
-                return self.agent.http.get(CB.json(), "/v1/agent/connect/ca/roots")
+                return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/agent/connect/ca/roots")
 
             def leaf(self, service, token=None):
                 params = []
@@ -444,4 +449,6 @@ class Agent:
                 if token:
                     params.append(("token", token))
 
-                return self.agent.http.get(CB.json(), f"/v1/agent/connect/ca/leaf/{service}", params=params)
+                return self.agent.http.get(
+                    CB.json(codec=self.agent.codec), f"/v1/agent/connect/ca/leaf/{service}", params=params
+                )
@@ -1,5 +1,4 @@
-import json
-
+from consul.base import agent_cache
 from consul.callback import CB
 
 
@@ -82,7 +81,7 @@ class Catalog:
         if node_meta:
             for nodemeta_name, nodemeta_value in node_meta.items():
                 params.append(("node-meta", f"{nodemeta_name}:{nodemeta_value}"))
-        return self.agent.http.put(CB.bool(), "/v1/catalog/register", data=json.dumps(data), params=params)
+        return self.agent.http.put(CB.bool(), "/v1/catalog/register", data=self.agent.codec.dumps(data), params=params)
 
     def deregister(self, node, service_id=None, check_id=None, dc=None, token=None):
         """
@@ -112,15 +111,17 @@ class Catalog:
         token = token or self.agent.token
         if token:
             data["WriteRequest"] = {"Token": token}
-        return self.agent.http.put(CB.bool(), "/v1/catalog/deregister", data=json.dumps(data))
+        return self.agent.http.put(CB.bool(), "/v1/catalog/deregister", data=self.agent.codec.dumps(data))
 
     def datacenters(self):
         """
         Returns all the datacenters that are known by the Consul server.
         """
-        return self.agent.http.get(CB.json(), "/v1/catalog/datacenters")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/catalog/datacenters")
 
-    def nodes(self, index=None, wait=None, consistency=None, dc=None, near=None, token=None, node_meta=None):
+    def nodes(
+        self, index=None, wait=None, consistency=None, dc=None, near=None, token=None, node_meta=None, meta=False
+    ):
         """
         Returns a tuple of (*index*, *nodes*) of all nodes known
         about in the *dc* datacenter. *dc* defaults to the current
@@ -145,6 +146,9 @@ class Catalog:
         *node_meta* is an optional meta data used for filtering, a
         dictionary formatted as {k1:v1, k2:v2}.
 
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
+
         The response looks like this::
 
             (index, [
@@ -177,9 +181,23 @@ class Catalog:
         if node_meta:
             for nodemeta_name, nodemeta_value in node_meta.items():
                 params.append(("node-meta", f"{nodemeta_name}:{nodemeta_value}"))
-        return self.agent.http.get(CB.json(index=True), "/v1/catalog/nodes", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), "/v1/catalog/nodes", params=params
+        )
 
-    def services(self, index=None, wait=None, consistency=None, dc=None, token=None, node_meta=None):
+    def services(
+        self,
+        index=None,
+        wait=None,
+        consistency=None,
+        dc=None,
+        token=None,
+        node_meta=None,
+        cached=False,
+        max_age=None,
+        stale_if_error=None,
+        meta=False,
+    ):
         """
         Returns a tuple of (*index*, *services*) of all services known
         about in the *dc* datacenter. *dc* defaults to the current
@@ -214,6 +232,14 @@ class Catalog:
 
         The main keys are the service names and the list provides all the
         known tags for a given service.
+
+        *cached* if set, the read is served from the agent's cache,
+        *max_age* and *stale_if_error* then bound the age, in seconds, of
+        the cached response, see consul.base.agent_cache.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*, which also tells whether the agent's cache was hit and the
+        age of the response.
         """
         params = []
         dc = dc or self.agent.dc
@@ -232,9 +258,15 @@ class Catalog:
         if node_meta:
             for nodemeta_name, nodemeta_value in node_meta.items():
                 params.append(("node-meta", f"{nodemeta_name}:{nodemeta_value}"))
-        return self.agent.http.get(CB.json(index=True), "/v1/catalog/services", params=params)
-
-    def node(self, node, index=None, wait=None, consistency=None, dc=None, token=None):
+        http_kwargs = {}
+        headers = agent_cache(params, cached, max_age, stale_if_error)
+        if headers:
+            http_kwargs["headers"] = headers
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), "/v1/catalog/services", params=params, **http_kwargs
+        )
+
+    def node(self, node, index=None, wait=None, consistency=None, dc=None, token=None, meta=False):
         """
         Returns a tuple of (*index*, *services*) of all services provided
         by *node*.
@@ -255,6 +287,9 @@ class Catalog:
 
         *token* is an optional `ACL token`_ to apply to this request.
 
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
+
         The response looks like this::
 
             (index, {
@@ -294,7 +329,9 @@ class Catalog:
         consistency = consistency or self.agent.consistency
         if consistency in ("consistent", "stale"):
             params.append((consistency, "1"))
-        return self.agent.http.get(CB.json(index=True), f"/v1/catalog/node/{node}", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), f"/v1/catalog/node/{node}", params=params
+        )
 
     def _service(
         self,
@@ -307,6 +344,7 @@ class Catalog:
         near=None,
         token=None,
         node_meta=None,
+        meta=False,
     ):
         params = []
         dc = dc or self.agent.dc
@@ -329,7 +367,7 @@ class Catalog:
         if node_meta:
             for nodemeta_name, nodemeta_value in node_meta.items():
                 params.append(("node-meta", f"{nodemeta_name}:{nodemeta_value}"))
-        return self.agent.http.get(CB.json(index=True), internal_uri, params=params)
+        return self.agent.http.get(CB.json(index=True, codec=self.agent.codec, meta=meta), internal_uri, params=params)
 
     def service(self, service, **kwargs):
         """
@@ -359,6 +397,9 @@ class Catalog:
         *node_meta* is an optional meta data used for filtering, a
         dictionary formatted as {k1:v1, k2:v2}.
 
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
+
         The response looks like this::
 
             (index, [
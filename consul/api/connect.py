@@ -17,7 +17,7 @@ class Connect:
             if token:
                 params.append(("token", token))
 
-            return self.agent.http.get(CB.json(), "/v1/connect/ca/roots", params=params)
+            return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/connect/ca/roots", params=params)
 
         def configuration(self, token=None):
             params = []
@@ -25,4 +25,4 @@ class Connect:
             if token:
                 params.append(("token", token))
 
-            return self.agent.http.get(CB.json(), "/v1/connect/ca/configuration", params=params)
+            return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/connect/ca/configuration", params=params)
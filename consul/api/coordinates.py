@@ -10,9 +10,9 @@ class Coordinate:
         Returns the WAN network coordinates for all Consul servers,
         organized by DCs.
         """
-        return self.agent.http.get(CB.json(), "/v1/coordinate/datacenters")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/coordinate/datacenters")
 
-    def nodes(self, dc=None, index=None, wait=None, consistency=None):
+    def nodes(self, dc=None, index=None, wait=None, consistency=None, meta=False):
         """
         *dc* is the datacenter that this agent will communicate with. By
         default the datacenter of the host is used.
@@ -27,6 +27,9 @@ class Coordinate:
         *consistency* can be either 'default', 'consistent' or 'stale'. if
         not specified *consistency* will the consistency level this client
         was configured with.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         params = []
         if dc:
@@ -38,4 +41,6 @@ class Coordinate:
         consistency = consistency or self.agent.consistency
         if consistency in ("consistent", "stale"):
             params.append((consistency, "1"))
-        return self.agent.http.get(CB.json(index=True), "/v1/coordinate/nodes", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), "/v1/coordinate/nodes", params=params
+        )
@@ -54,9 +54,9 @@ class Event:
         if token:
             params.append(("token", token))
 
-        return self.agent.http.put(CB.json(), f"/v1/event/fire/{name}", params=params, data=body)
+        return self.agent.http.put(CB.json(codec=self.agent.codec), f"/v1/event/fire/{name}", params=params, data=body)
 
-    def list(self, name=None, index=None, wait=None):
+    def list(self, name=None, index=None, wait=None, meta=False):
         """
         Returns a tuple of (*index*, *events*)
             Note: Since Consul's event protocol uses gossip, there is no
@@ -91,6 +91,9 @@ class Event:
                     "LTime": 19
                   },
             }
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         params = []
         if name is not None:
@@ -99,4 +102,6 @@ class Event:
             params.append(("index", index))
             if wait:
                 params.append(("wait", wait))
-        return self.agent.http.get(CB.json(index=True, decode="Payload"), "/v1/event/list", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, decode="Payload", codec=self.agent.codec, meta=meta), "/v1/event/list", params=params
+        )
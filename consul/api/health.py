@@ -1,3 +1,4 @@
+from consul.base import agent_cache
 from consul.callback import CB
 
 
@@ -17,6 +18,10 @@ class Health:
         near=None,
         token=None,
         node_meta=None,
+        cached=False,
+        max_age=None,
+        stale_if_error=None,
+        meta=False,
     ):
         params = []
         if index:
@@ -41,7 +46,13 @@ class Health:
         if node_meta:
             for nodemeta_name, nodemeta_value in node_meta.items():
                 params.append(("node-meta", f"{nodemeta_name}:{nodemeta_value}"))
-        return self.agent.http.get(CB.json(index=True), internal_uri, params=params)
+        http_kwargs = {}
+        headers = agent_cache(params, cached, max_age, stale_if_error)
+        if headers:
+            http_kwargs["headers"] = headers
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), internal_uri, params=params, **http_kwargs
+        )
 
     def service(self, service, **kwargs):
         """
@@ -72,6 +83,14 @@ class Health:
 
         *node_meta* is an optional meta data used for filtering, a
         dictionary formatted as {k1:v1, k2:v2}.
+
+        *cached* if set, the read is served from the agent's cache,
+        *max_age* and *stale_if_error* then bound the age, in seconds, of
+        the cached response, see consul.base.agent_cache.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*, which also tells whether the agent's cache was hit and the
+        age of the response.
         """
         internal_uri = f"/v1/health/service/{service}"
         return self._service(internal_uri=internal_uri, **kwargs)
@@ -87,7 +106,7 @@ class Health:
         internal_uri = f"/v1/health/connect/{service}"
         return self._service(internal_uri=internal_uri, **kwargs)
 
-    def checks(self, service, index=None, wait=None, dc=None, near=None, token=None, node_meta=None):
+    def checks(self, service, index=None, wait=None, dc=None, near=None, token=None, node_meta=None, meta=False):
         """
         Returns a tuple of (*index*, *checks*) with *checks* being the
         checks associated with the service.
@@ -111,6 +130,9 @@ class Health:
 
         *node_meta* is an optional meta data used for filtering, a
         dictionary formatted as {k1:v1, k2:v2}.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         params = []
         if index:
@@ -128,9 +150,11 @@ class Health:
         if node_meta:
             for nodemeta_name, nodemeta_value in node_meta.items():
                 params.append(("node-meta", f"{nodemeta_name}:{nodemeta_value}"))
-        return self.agent.http.get(CB.json(index=True), f"/v1/health/checks/{service}", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), f"/v1/health/checks/{service}", params=params
+        )
 
-    def state(self, name, index=None, wait=None, dc=None, near=None, token=None, node_meta=None):
+    def state(self, name, index=None, wait=None, dc=None, near=None, token=None, node_meta=None, meta=False):
         """
         Returns a tuple of (*index*, *nodes*)
 
@@ -159,6 +183,9 @@ class Health:
         dictionary formatted as {k1:v1, k2:v2}.
 
         *nodes* are the nodes providing the given service.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         assert name in ["any", "unknown", "passing", "warning", "critical"]
         params = []
@@ -177,9 +204,11 @@ class Health:
         if node_meta:
             for nodemeta_name, nodemeta_value in node_meta.items():
                 params.append(("node-meta", f"{nodemeta_name}:{nodemeta_value}"))
-        return self.agent.http.get(CB.json(index=True), f"/v1/health/state/{name}", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), f"/v1/health/state/{name}", params=params
+        )
 
-    def node(self, node, index=None, wait=None, dc=None, token=None):
+    def node(self, node, index=None, wait=None, dc=None, token=None, meta=False):
         """
         Returns a tuple of (*index*, *checks*)
 
@@ -196,6 +225,9 @@ class Health:
         *token* is an optional `ACL token`_ to apply to this request.
 
         *nodes* are the nodes providing the given service.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         params = []
         if index:
@@ -209,4 +241,6 @@ class Health:
         if token:
             params.append(("token", token))
 
-        return self.agent.http.get(CB.json(index=True), f"/v1/health/node/{node}", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), f"/v1/health/node/{node}", params=params
+        )
@@ -23,6 +23,7 @@ class KV:
         separator=None,
         dc=None,
         connections_timeout=None,
+        meta=False,
     ):
         """
         Returns a tuple of (*index*, *value[s]*)
@@ -62,6 +63,9 @@ class KV:
         Note, if the requested key does not exists *(index, None)* is
         returned. It's then possible to long poll on the index for when the
         key is created.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         assert not key.startswith("/"), "keys should not start with a forward slash"
         params = []
@@ -96,7 +100,10 @@ class KV:
         if connections_timeout:
             http_kwargs["connections_timeout"] = connections_timeout
         return self.agent.http.get(
-            CB.json(index=True, decode=decode, one=one), f"/v1/kv/{key}", params=params, **http_kwargs
+            CB.json(index=True, decode=decode, one=one, codec=self.agent.codec, meta=meta),
+            f"/v1/kv/{key}",
+            params=params,
+            **http_kwargs,
         )
 
     def put(
@@ -165,7 +172,9 @@ class KV:
         http_kwargs = {}
         if connections_timeout:
             http_kwargs["connections_timeout"] = connections_timeout
-        return self.agent.http.put(CB.json(), f"/v1/kv/{key}", params=params, data=value, **http_kwargs)
+        return self.agent.http.put(
+            CB.json(codec=self.agent.codec), f"/v1/kv/{key}", params=params, data=value, **http_kwargs
+        )
 
     def delete(self, key, recurse=None, cas=None, token=None, dc=None, connections_timeout=None):
         """
@@ -202,4 +211,4 @@ class KV:
         http_kwargs = {}
         if connections_timeout:
             http_kwargs["connections_timeout"] = connections_timeout
-        return self.agent.http.delete(CB.json(), f"/v1/kv/{key}", params=params, **http_kwargs)
+        return self.agent.http.delete(CB.json(codec=self.agent.codec), f"/v1/kv/{key}", params=params, **http_kwargs)
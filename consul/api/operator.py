@@ -9,4 +9,4 @@ class Operator:
         """
         Returns raft configuration.
         """
-        return self.agent.http.get(CB.json(), "/v1/operator/raft/configuration")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/operator/raft/configuration")
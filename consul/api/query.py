@@ -1,5 +1,4 @@
-import json
-
+from consul.base import agent_cache
 from consul.callback import CB
 
 
@@ -25,7 +24,7 @@ class Query:
         if dc:
             params.append(("dc", dc))
 
-        return self.agent.http.get(CB.json(), "/v1/query", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/query", params=params)
 
     def _query_data(
         self,
@@ -65,7 +64,7 @@ class Query:
             }.items()
             if v is not None
         }
-        return json.dumps(data)
+        return self.agent.codec.dumps(data)
 
     def create(
         self,
@@ -124,7 +123,7 @@ class Query:
         path = "/v1/query"
         params = None if dc is None else [("dc", dc)]
         data = self._query_data(service, name, session, token, nearestn, datacenters, onlypassing, tags, ttl, regexp)
-        return self.agent.http.post(CB.json(), path, params=params, data=data)
+        return self.agent.http.post(CB.json(codec=self.agent.codec), path, params=params, data=data)
 
     def update(
         self,
@@ -170,7 +169,7 @@ class Query:
             params.append(("token", token))
         if dc:
             params.append(("dc", dc))
-        return self.agent.http.get(CB.json(), f"/v1/query/{query_id}", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), f"/v1/query/{query_id}", params=params)
 
     def delete(self, query_id, token=None, dc=None):
         """
@@ -191,7 +190,18 @@ class Query:
             params.append(("dc", dc))
         return self.agent.http.delete(CB.bool(), f"/v1/query/{query_id}", params=params)
 
-    def execute(self, query, token=None, dc=None, near=None, limit=None):
+    def execute(
+        self,
+        query,
+        token=None,
+        dc=None,
+        near=None,
+        limit=None,
+        cached=False,
+        max_age=None,
+        stale_if_error=None,
+        meta=False,
+    ):
         """
         This endpoint will execute certain query
 
@@ -207,6 +217,14 @@ class Query:
 
         *limit* is used to limit the size of the list to the given number
         of nodes. This is applied after any sorting or shuffling.
+
+        *cached* if set, the query is served from the agent's cache,
+        *max_age* and *stale_if_error* then bound the age, in seconds, of
+        the cached response, see consul.base.agent_cache.
+
+        *meta* if set, a tuple of (consul.callback.QueryMeta, *result*) is
+        returned, which also tells whether the agent's cache was hit and
+        the age of the response.
         """
         params = []
         token = token or self.agent.token
@@ -218,7 +236,13 @@ class Query:
             params.append(("near", near))
         if limit:
             params.append(("limit", limit))
-        return self.agent.http.get(CB.json(), f"/v1/query/{query}/execute", params=params)
+        http_kwargs = {}
+        headers = agent_cache(params, cached, max_age, stale_if_error)
+        if headers:
+            http_kwargs["headers"] = headers
+        return self.agent.http.get(
+            CB.json(codec=self.agent.codec, meta=meta), f"/v1/query/{query}/execute", params=params, **http_kwargs
+        )
 
     def explain(self, query, token=None, dc=None):
         """
@@ -237,4 +261,4 @@ class Query:
             params.append(("token", token))
         if dc:
             params.append(("dc", dc))
-        return self.agent.http.get(CB.json(), f"/v1/query/{query}/explain", params=params)
+        return self.agent.http.get(CB.json(codec=self.agent.codec), f"/v1/query/{query}/explain", params=params)
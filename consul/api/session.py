@@ -1,5 +1,3 @@
-import json
-
 from consul.callback import CB
 
 
@@ -59,9 +57,11 @@ class Session:
         if ttl:
             assert 10 <= ttl <= 86400
             data["ttl"] = f"{ttl}s"
-        data = json.dumps(data) if data else ""
+        data = self.agent.codec.dumps(data) if data else ""
 
-        return self.agent.http.put(CB.json(is_id=True), "/v1/session/create", params=params, data=data)
+        return self.agent.http.put(
+            CB.json(is_id=True, codec=self.agent.codec), "/v1/session/create", params=params, data=data
+        )
 
     def destroy(self, session_id, dc=None):
         """
@@ -75,7 +75,7 @@ class Session:
             params.append(("dc", dc))
         return self.agent.http.put(CB.bool(), f"/v1/session/destroy/{session_id}", params=params)
 
-    def list(self, index=None, wait=None, consistency=None, dc=None):
+    def list(self, index=None, wait=None, consistency=None, dc=None, meta=False):
         """
         Returns a tuple of (*index*, *sessions*) of all active sessions in
         the *dc* datacenter. *dc* defaults to the current datacenter of
@@ -92,6 +92,9 @@ class Session:
         not specified *consistency* will the consistency level this client
         was configured with.
 
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
+
         The response looks like this::
 
             (index, [
@@ -118,9 +121,11 @@ class Session:
         consistency = consistency or self.agent.consistency
         if consistency in ("consistent", "stale"):
             params.append((consistency, "1"))
-        return self.agent.http.get(CB.json(index=True), "/v1/session/list", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), "/v1/session/list", params=params
+        )
 
-    def node(self, node, index=None, wait=None, consistency=None, dc=None):
+    def node(self, node, index=None, wait=None, consistency=None, dc=None, meta=False):
         """
         Returns a tuple of (*index*, *sessions*) as per *session.list*, but
         filters the sessions returned to only those active for *node*.
@@ -135,6 +140,9 @@ class Session:
         *consistency* can be either 'default', 'consistent' or 'stale'. if
         not specified *consistency* will the consistency level this client
         was configured with.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         params = []
         dc = dc or self.agent.dc
@@ -147,9 +155,11 @@ class Session:
         consistency = consistency or self.agent.consistency
         if consistency in ("consistent", "stale"):
             params.append((consistency, "1"))
-        return self.agent.http.get(CB.json(index=True), f"/v1/session/node/{node}", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, codec=self.agent.codec, meta=meta), f"/v1/session/node/{node}", params=params
+        )
 
-    def info(self, session_id, index=None, wait=None, consistency=None, dc=None):
+    def info(self, session_id, index=None, wait=None, consistency=None, dc=None, meta=False):
         """
         Returns a tuple of (*index*, *session*) for the session
         *session_id* in the *dc* datacenter. *dc* defaults to the current
@@ -165,6 +175,9 @@ class Session:
         *consistency* can be either 'default', 'consistent' or 'stale'. if
         not specified *consistency* will the consistency level this client
         was configured with.
+
+        *meta* if set, a consul.callback.QueryMeta is returned instead of
+        *index*.
         """
         params = []
         dc = dc or self.agent.dc
@@ -177,7 +190,11 @@ class Session:
         consistency = consistency or self.agent.consistency
         if consistency in ("consistent", "stale"):
             params.append((consistency, "1"))
-        return self.agent.http.get(CB.json(index=True, one=True), f"/v1/session/info/{session_id}", params=params)
+        return self.agent.http.get(
+            CB.json(index=True, one=True, codec=self.agent.codec, meta=meta),
+            f"/v1/session/info/{session_id}",
+            params=params,
+        )
 
     def renew(self, session_id, dc=None):
         """
@@ -193,4 +210,6 @@ class Session:
         dc = dc or self.agent.dc
         if dc:
             params.append(("dc", dc))
-        return self.agent.http.put(CB.json(one=True, allow_404=False), f"/v1/session/renew/{session_id}", params=params)
+        return self.agent.http.put(
+            CB.json(one=True, allow_404=False, codec=self.agent.codec), f"/v1/session/renew/{session_id}", params=params
+        )
@@ -15,11 +15,11 @@ class Status:
         This endpoint is used to get the Raft leader for the datacenter
         in which the agent is running.
         """
-        return self.agent.http.get(CB.json(), "/v1/status/leader")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/status/leader")
 
     def peers(self):
         """
         This endpoint retrieves the Raft peers for the datacenter in which
         the the agent is running.
         """
-        return self.agent.http.get(CB.json(), "/v1/status/peers")
+        return self.agent.http.get(CB.json(codec=self.agent.codec), "/v1/status/peers")
@@ -1,5 +1,3 @@
-import json
-
 from consul.callback import CB
 
 
@@ -34,4 +32,4 @@ class Txn:
                 }
             }
         """
-        return self.agent.http.put(CB.json(), "/v1/txn", data=json.dumps(payload))
+        return self.agent.http.put(CB.json(codec=self.agent.codec), "/v1/txn", data=self.agent.codec.dumps(payload))
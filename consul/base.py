@@ -1,23 +1,24 @@
 import abc
 import collections
+import contextlib
+import gzip
+import importlib
 import logging
 import os
+import re
+import threading
+import time
 import urllib
 
-from consul.api.acl import ACL
-from consul.api.agent import Agent
-from consul.api.catalog import Catalog
-from consul.api.connect import Connect
-from consul.api.coordinates import Coordinate
-from consul.api.event import Event
-from consul.api.health import Health
-from consul.api.kv import KV
-from consul.api.operator import Operator
-from consul.api.query import Query
-from consul.api.session import Session
-from consul.api.status import Status
-from consul.api.txn import Txn
-from consul.exceptions import ConsulException
+from consul.breaker import CircuitBreaker, guard
+from consul.cache import ResponseCache
+from consul.coalesce import SingleFlight
+from consul.codec import get_codec
+from consul.exceptions import CircuitBreakerOpen, ConsulException
+from consul.failover import EndpointSet
+from consul.hedge import HedgePolicy
+from consul.hooks import RequestEvent, observe
+from consul.retry import RetryPolicy
 
 log = logging.getLogger(__name__)
 
@@ -26,26 +27,367 @@ log = logging.getLogger(__name__)
 # Convenience to define checks
 
 
-Response = collections.namedtuple("Response", ["code", "headers", "body"])
+UNIX_SCHEME = "unix://"
+
+# *body* holds the raw bytes of the response, decoding is left to the callbacks. *event* is the
+# consul.hooks.RequestEvent of the request when hooks observe it, for the callbacks to time themselves
+Response = collections.namedtuple("Response", ["code", "headers", "body", "event"], defaults=(None,))
+
+_UNOBSERVED = contextlib.nullcontext()
+
+
+def is_blocking(params):
+    """Whether a request with *params* is a blocking query"""
+    if not params:
+        return False
+    if isinstance(params, dict):
+        return bool(params.get("index"))
+    return any(name == "index" and value for name, value in params)
+
+
+# wait applied by the agents to blocking queries without one, and its upper bound, in seconds
+DEFAULT_WAIT = 300.0
+MAX_WAIT = 600.0
+
+_DURATION = re.compile(r"(\d+(?:\.\d*)?)(ns|us|µs|ms|s|m|h)")
+_DURATION_UNITS = {"ns": 1e-9, "us": 1e-6, "µs": 1e-6, "ms": 1e-3, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value):
+    """Returns the number of seconds of a Go duration such as '5m' or '1m30s', None if invalid"""
+    value = str(value).strip()
+    parts = _DURATION.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def wait_seconds(params):
+    """Returns how long, in seconds, the agent may hold a blocking query with *params*"""
+    wait = params.get("wait") if isinstance(params, dict) else next((v for k, v in params if k == "wait"), None)
+    seconds = parse_duration(wait) if wait else None
+    return min(seconds or DEFAULT_WAIT, MAX_WAIT)
+
+
+def is_stale(params):
+    """Whether a request with *params* is a read with the stale consistency mode"""
+    if not params:
+        return False
+    if isinstance(params, dict):
+        return "stale" in params
+    return any(name == "stale" for name, _ in params)
+
+
+def agent_cache(params, cached=False, max_age=None, stale_if_error=None):
+    """
+    Adds the agent cache options of a read to its *params* and returns its
+    headers.
+
+    *cached* if set, the agent serves the read from its local cache instead
+    of forwarding it to the servers, see Consul's agent caching. *max_age*
+    is the maximum age, in seconds, of a cached response before the agent
+    fetches a fresh one. *stale_if_error* is the number of seconds a stale
+    cached response can still be served when the servers are unreachable.
+    """
+    if not cached:
+        assert max_age is None, "max_age requires cached"
+        assert stale_if_error is None, "stale_if_error requires cached"
+        return None
+    params.append(("cached", ""))
+    directives = []
+    if max_age is not None:
+        directives.append(f"max-age={int(max_age)}")
+    if stale_if_error is not None:
+        directives.append(f"stale-if-error={int(stale_if_error)}")
+    return {"Cache-Control": ", ".join(directives)} if directives else None
 
 
 class HTTPClient(metaclass=abc.ABCMeta):
-    def __init__(self, host="127.0.0.1", port=8500, scheme="http", verify=True, cert=None):
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8500,
+        scheme="http",
+        verify=True,
+        cert=None,
+        compress=False,
+        addresses=None,
+        probe_interval=5.0,
+        retry=None,
+        breaker=None,
+        hedge=None,
+        coalesce=False,
+        cache=None,
+        hooks=None,
+    ):
         self.host = host
         self.port = port
         self.scheme = scheme
         self.verify = verify
-        self.base_uri = f"{self.scheme}://{self.host}:{self.port}"
+        self.socket_path = None
+        if host.startswith(UNIX_SCHEME):
+            # talk HTTP over the local agent's unix domain socket
+            self.socket_path = host[len(UNIX_SCHEME) :]
+            self.scheme = "http"
+            self.base_uri = "http://localhost"
+        else:
+            self.base_uri = f"{self.scheme}://{self.host}:{self.port}"
         self.cert = cert
+        self.compress = compress
+        self.endpoints = None
+        if addresses:
+            base_uris = [address if "://" in address else f"{self.scheme}://{address}" for address in addresses]
+            self.endpoints = EndpointSet(
+                [base_uri.rstrip("/") for base_uri in base_uris], probe_interval=probe_interval
+            )
+            self.base_uri = self.endpoints.endpoints[0].base_uri
+        self.retry = retry
+        # one circuit breaker per agent, *breaker* holds their settings
+        self.breakers = {}
+        if breaker is not None:
+            base_uris = [e.base_uri for e in self.endpoints.endpoints] if self.endpoints else [self.base_uri]
+            self.breakers = {base_uri: CircuitBreaker(name=base_uri, **breaker) for base_uri in base_uris}
+        self.hedge = hedge
+        self.single_flight = SingleFlight() if coalesce else None
+        self.cache = cache
+        # replaced rather than mutated, so that requests in flight iterate over a stable list
+        self.hooks = list(hooks or ())
+        self._stats_lock = threading.Lock()
+        self._transfer_stats = {"responses": 0, "compressed": 0, "wire_bytes": 0, "body_bytes": 0}
+
+    def record_transfer(self, wire_bytes, body_bytes, content_encoding=None):
+        with self._stats_lock:
+            stats = self._transfer_stats
+            stats["responses"] += 1
+            if content_encoding == "gzip":
+                stats["compressed"] += 1
+            stats["wire_bytes"] += wire_bytes
+            stats["body_bytes"] += body_bytes
+
+    def decompress(self, headers, body, record=True):
+        """
+        Decodes a gzip encoded *body* for transports which do not do it
+        themselves and, if *record* is set, records its wire and
+        decompressed sizes.
+        """
+        content_encoding = headers.get("Content-Encoding")
+        wire_bytes = len(body)
+        if content_encoding == "gzip":
+            body = gzip.decompress(body)
+        if record:
+            self.record_transfer(wire_bytes, len(body), content_encoding)
+        return body
+
+    def compression_stats(self):
+        """
+        Returns a dict of the transfer counters kept when *compress* is set:
+
+        *responses* is the number of responses received.
+
+        *compressed* is the number of gzip encoded responses.
+
+        *wire_bytes* is the number of body bytes received over the network.
+
+        *body_bytes* is the number of body bytes once decompressed.
+        """
+        with self._stats_lock:
+            return dict(self._transfer_stats)
+
+    def guard(self, base_uri=None):
+        """
+        Returns the context manager guarding a request to *base_uri* with
+        its circuit breaker, if any, see consul.breaker.guard.
+        """
+        return guard(self.breakers.get(base_uri or self.base_uri))
+
+    @staticmethod
+    def request_key(callback, path, params, headers=None):
+        """
+        Returns the key identifying a GET and the way its response is
+        parsed, None if there is none. The token is one of the params.
+        """
+        callback_key = getattr(callback, "key", None)
+        if callback_key is None:
+            return None
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        key = (path, tuple(params or ()), tuple(sorted((headers or {}).items())), callback_key)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def flight_key(self, callback, path, params, headers=None):
+        """Returns the key under which a GET is coalesced with identical ones in flight, None if it must not be"""
+        if self.single_flight is None:
+            return None
+        return self.request_key(callback, path, params, headers)
+
+    def cache_lookup(self, callback, path, params, headers=None):
+        """
+        Looks a GET up in the response cache and returns (hit, result,
+        callback, params). On a fresh hit *hit* is set and *result* is the
+        cached result. Otherwise the GET is sent with the returned
+        *callback*, which stores the parsed result in the cache, and
+        *params*, which turn it into a revalidation of an expired entry.
+        User blocking queries are never cached.
+        """
+        cacheable = self.cache is not None and not is_blocking(params)
+        key = self.request_key(callback, path, params, headers) if cacheable else None
+        if key is None:
+            return False, None, callback, params
+        # a write clearing the cache while the GET is in flight voids its answer
+        generation = self.cache.generation()
+        entry, fresh = self.cache.get(key)
+        if fresh:
+            return True, entry.result, callback, params
+        if entry is not None:
+            params = [*(params.items() if isinstance(params, dict) else params or ())]
+            params += [("index", entry.index), ("wait", self.cache.revalidate_wait)]
+
+        def store(response):
+            index = response.headers.get("X-Consul-Index")
+            cacheable = response.code in (200, 404) and index
+            revalidated = bool(cacheable and entry is not None and index == entry.index)
+            result = entry.result if revalidated else callback(response)
+            if cacheable:
+                self.cache.put(key, result, index, len(response.body), revalidated=revalidated, generation=generation)
+            return result
 
-    def uri(self, path, params=None):
-        uri = self.base_uri + urllib.parse.quote(path, safe="/:")
+        store.key = callback.key
+        return False, None, store, params
+
+    def invalidate(self, method):
+        """Clears the response cache after a write"""
+        if self.cache is not None and method != "GET":
+            self.cache.clear()
+
+    def cache_stats(self):
+        """Returns the response cache counters, see consul.cache.ResponseCache.stats"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def coalesce_stats(self):
+        """Returns the request coalescing counters, see consul.coalesce.SingleFlight.stats"""
+        return self.single_flight.stats() if self.single_flight is not None else {}
+
+    def _failed_over(self, endpoint, method, error, connect_failed):
+        """Records a transport *error* of *endpoint* and returns whether the next agent can be tried"""
+        self.endpoints.record_failure(endpoint)
+        # only reads are safely resent once the request may have reached the agent
+        return method == "GET" or connect_failed(error)
+
+    def failover(self, method, params, send, errors, connect_failed):
+        """
+        Calls *send* with the agents of *addresses*, in the order of
+        EndpointSet.candidates, until one of them answers, and returns its
+        result.
+
+        *errors* are the transport exceptions of *send* and *connect_failed*
+        tells whether one of them was raised before the request was sent.
+        A read goes to the next agent after any of them, a write only if it
+        wasn't sent. Agents whose circuit breaker is open are skipped. The
+        last error is raised if no agent answered.
+        """
+        blocking = is_blocking(params)
+        error = None
+        for endpoint in self.endpoints.candidates():
+            start = time.monotonic()
+            try:
+                result = send(endpoint)
+            except CircuitBreakerOpen as e:
+                # nothing was sent, the next agent can be tried whatever the method
+                error = e
+                continue
+            except errors as e:
+                if not self._failed_over(endpoint, method, e, connect_failed):
+                    raise
+                error = e
+                continue
+            self.endpoints.record_success(endpoint, None if blocking else time.monotonic() - start)
+            return result
+        raise error
+
+    async def afailover(self, method, params, send, errors, connect_failed):
+        """Same as failover, for a coroutine function *send*"""
+        blocking = is_blocking(params)
+        error = None
+        for endpoint in self.endpoints.candidates():
+            start = time.monotonic()
+            try:
+                result = await send(endpoint)
+            except CircuitBreakerOpen as e:
+                error = e
+                continue
+            except errors as e:
+                if not self._failed_over(endpoint, method, e, connect_failed):
+                    raise
+                error = e
+                continue
+            self.endpoints.record_success(endpoint, None if blocking else time.monotonic() - start)
+            return result
+        raise error
+
+    def hedged(self, method, params):
+        """Whether a request is hedged: a non blocking stale read with several agents to ask"""
+        return (
+            self.hedge is not None
+            and self.endpoints is not None
+            and len(self.endpoints.endpoints) > 1
+            and method == "GET"
+            and is_stale(params)
+            and not is_blocking(params)
+        )
+
+    def breaker_stats(self):
+        """
+        Returns the state of the circuit breaker of every agent, keyed by
+        address: *state* is 'closed', 'open' or 'half-open', *requests* and
+        *failures* are counted over the breaker window, *rejected* is the
+        number of requests failed fast and *opened* the number of times the
+        breaker opened.
+        """
+        return {base_uri: breaker.stats() for base_uri, breaker in self.breakers.items()}
+
+    def observe(self, method, path, params=None, data=None):
+        """
+        Returns the context manager wrapping a request sent to the agent,
+        whose value is the consul.hooks.RequestEvent handed to the hooks as
+        the request starts and ends, None when there are no hooks.
+        """
+        if not self.hooks:
+            return _UNOBSERVED
+        blocking = is_blocking(params)
+        event = RequestEvent(method, path, params, data, blocking, wait_seconds(params) if blocking else None)
+        return observe(self.hooks, event)
+
+    @staticmethod
+    def parse(callback, response, event=None):
+        """
+        Returns the result of *callback* for *response*, timing the network
+        and the parsing of the request on its *event*, if any.
+        """
+        if event is None:
+            return callback(response)
+        parsing = time.perf_counter()
+        event.network_time = parsing - event.start
+        event.status = response.code
+        event.index = response.headers.get("X-Consul-Index")
+        event.bytes_in = len(response.body)
+        result = callback(response._replace(event=event))
+        if event.decode_time is None:
+            # callbacks which don't time themselves
+            event.decode_time = time.perf_counter() - parsing - (event.postprocess_time or 0.0)
+        return result
+
+    def uri(self, path, params=None, base_uri=None):
+        uri = (base_uri or self.base_uri) + urllib.parse.quote(path, safe="/:")
         if params:
             uri = f"{uri}?{urllib.parse.urlencode(params)}"
         return uri
 
     @abc.abstractmethod
-    def get(self, callback, path, params=None):
+    def get(self, callback, path, params=None, headers=None):
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -65,6 +407,29 @@ class HTTPClient(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
 
+class _Endpoint:
+    """
+    Endpoint attribute of Consul, e.g. kv, instantiated from *module*.*name*
+    on first access and then stored on the client.
+    """
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+        self.attr = None
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        # racing threads may both create it, endpoints hold no state but the client
+        endpoint = getattr(importlib.import_module(self.module), self.name)(instance)
+        instance.__dict__[self.attr] = endpoint
+        return endpoint
+
+
 class Consul:
     def __init__(
         self,
@@ -76,6 +441,15 @@ class Consul:
         dc=None,
         verify=True,
         cert=None,
+        codec=None,
+        addresses=None,
+        probe_interval=5.0,
+        retry=None,
+        breaker=None,
+        hedge=None,
+        coalesce=False,
+        cache=None,
+        hooks=None,
     ):
         """
         *token* is an optional `ACL token`_. If supplied it will be used by
@@ -88,22 +462,75 @@ class Consul:
         this by passing explicitly for a given request. *consistency* can be
         either 'default', 'consistent' or 'stale'.
 
+        *host* can also be the path of the agent's unix domain socket
+        prefixed with 'unix://', e.g. 'unix:///var/run/consul.sock', in
+        which case *port* and *scheme* are ignored.
+
         *dc* is the datacenter that this agent will communicate with.
         By default the datacenter of the host is used.
 
         *verify* is whether to verify the SSL certificate for HTTPS requests
 
         *cert* client side certificates for HTTPS requests
+
+        *addresses* is an optional list of agent addresses, either
+        'host:port' or 'scheme://host:port'. When given, *host* and *port*
+        are ignored: requests go to the healthiest and fastest agent and
+        transparently fail over to the others on connection errors.
+
+        *probe_interval* is the number of seconds between two background
+        health probes (GET /v1/status/leader) of the *addresses*. 0
+        disables probing, unreachable agents are then only retried once
+        every other one failed.
+
+        *retry* enables retrying transient failures (connection errors and
+        5xx responses). It is either True, for the default RetryPolicy, or a
+        consul.retry.RetryPolicy. By default nothing is retried.
+
+        *breaker* enables a circuit breaker per agent: once an agent keeps
+        failing, requests to it fail fast with consul.CircuitBreakerOpen
+        instead of waiting for a timeout, which lets callers fall back to
+        cached data. It is either True, for the default settings, or a dict
+        of consul.breaker.CircuitBreaker arguments. Retries are not
+        attempted against an open breaker and, with *addresses*, agents
+        whose breaker is open are skipped.
+
+        *hedge* enables hedged reads with *addresses*: when a read with
+        consistency='stale' is slower than usual, a duplicate is sent to
+        another agent and the first response wins. It is either True, for
+        the default consul.hedge.HedgePolicy, or a HedgePolicy. See
+        hedge_stats for the hedge and win rates.
+
+        *coalesce* if set, identical GETs (same path, params and token)
+        issued while one is in flight wait for it and share its parsed
+        result instead of hitting the agent, see coalesce_stats. Shared
+        results must not be mutated.
+
+        *cache* enables an in-process cache of read results, revalidated
+        against their X-Consul-Index once expired. It is either True, for
+        the default consul.cache.ResponseCache (1 second TTL), or a
+        ResponseCache. See cache_stats.
+
+        *hooks* is a list of objects observing every request sent to the
+        agent, see consul.hooks.Hook and add_hook.
+
+        *codec* is the JSON codec used for request bodies and responses. By
+        default orjson is used when installed, the standard library json
+        module otherwise. It can also be one of 'json', 'orjson' or 'ujson',
+        or any object implementing *loads* and *dumps*, see consul.codec.
         """
 
         # TODO: Status
 
-        if os.getenv("CONSUL_HTTP_ADDR"):
+        if os.getenv("CONSUL_HTTP_ADDR", "").startswith(UNIX_SCHEME):
+            host = os.getenv("CONSUL_HTTP_ADDR")
+        elif os.getenv("CONSUL_HTTP_ADDR"):
             try:
                 host, port = os.getenv("CONSUL_HTTP_ADDR").split(":")
             except ValueError as err:
                 raise ConsulException(
                     f"CONSUL_HTTP_ADDR ({os.getenv('CONSUL_HTTP_ADDR')}) invalid, does not match <host>:<port>"
+                    " or unix://<path>"
                 ) from err
         use_ssl = os.getenv("CONSUL_HTTP_SSL")
         if use_ssl is not None:
@@ -111,6 +538,25 @@ class Consul:
         if os.getenv("CONSUL_HTTP_SSL_VERIFY") is not None:
             verify = os.getenv("CONSUL_HTTP_SSL_VERIFY") == "true"
 
+        if retry is True:
+            retry = RetryPolicy()
+        if breaker is True:
+            breaker = {}
+        if hedge is True:
+            hedge = HedgePolicy()
+        if cache is True:
+            cache = ResponseCache()
+        # transport independent options, forwarded by http_connect to the HTTPClient
+        self.http_options = {
+            "addresses": addresses,
+            "probe_interval": probe_interval,
+            "retry": retry or None,
+            "breaker": None if breaker is False else breaker,
+            "hedge": hedge or None,
+            "coalesce": coalesce,
+            "cache": cache or None,
+            "hooks": hooks,
+        }
         self.http = self.http_connect(host, port, scheme, verify, cert)
         self.token = os.getenv("CONSUL_HTTP_TOKEN", token)
         self.scheme = scheme
@@ -121,20 +567,51 @@ class Consul:
             "stale",
         ), "consistency must be either default, consistent or state"
         self.consistency = consistency
+        self.codec = get_codec(codec)
+
+    # endpoints, their modules are imported and objects created on first use
+    event = _Endpoint("consul.api.event", "Event")
+    kv = _Endpoint("consul.api.kv", "KV")
+    txn = _Endpoint("consul.api.txn", "Txn")
+    agent = _Endpoint("consul.api.agent", "Agent")
+    catalog = _Endpoint("consul.api.catalog", "Catalog")
+    health = _Endpoint("consul.api.health", "Health")
+    session = _Endpoint("consul.api.session", "Session")
+    acl = _Endpoint("consul.api.acl", "ACL")
+    status = _Endpoint("consul.api.status", "Status")
+    query = _Endpoint("consul.api.query", "Query")
+    coordinate = _Endpoint("consul.api.coordinates", "Coordinate")
+    operator = _Endpoint("consul.api.operator", "Operator")
+    connect = _Endpoint("consul.api.connect", "Connect")
+
+    def breaker_stats(self):
+        """Returns the circuit breaker states, see base.HTTPClient.breaker_stats"""
+        return self.http.breaker_stats()
+
+    def hedge_stats(self):
+        """Returns the hedging counters, see consul.hedge.HedgePolicy.stats"""
+        return self.http.hedge.stats() if self.http.hedge is not None else {}
+
+    def coalesce_stats(self):
+        """Returns the request coalescing counters, see consul.coalesce.SingleFlight.stats"""
+        return self.http.coalesce_stats()
+
+    def cache_stats(self):
+        """Returns the response cache counters, see consul.cache.ResponseCache.stats"""
+        return self.http.cache_stats()
+
+    def add_hook(self, hook):
+        """
+        Adds *hook* to the objects observing the requests sent to the
+        agent: its request_start and request_end methods are called with a
+        consul.hooks.RequestEvent. Returns *hook*.
+        """
+        self.http.hooks = [*self.http.hooks, hook]
+        return hook
 
-        self.event = Event(self)
-        self.kv = KV(self)
-        self.txn = Txn(self)
-        self.agent = Agent(self)
-        self.catalog = Catalog(self)
-        self.health = Health(self)
-        self.session = Session(self)
-        self.acl = ACL(self)
-        self.status = Status(self)
-        self.query = Query(self)
-        self.coordinate = Coordinate(self)
-        self.operator = Operator(self)
-        self.connect = Connect(self)
+    def remove_hook(self, hook):
+        """Stops *hook* from observing the requests"""
+        self.http.hooks = [h for h in self.http.hooks if h is not hook]
 
     def __enter__(self):
         return self
@@ -0,0 +1,362 @@
+"""
+Load generator driving a mix of operations through consul.std or consul.aio
+against an agent, and reporting the throughput and latency percentiles of
+every operation:
+
+    python -m consul.bench --port 8500 --mix kv-read=8,kv-write=1,health=1 --concurrency 32 --duration 30
+    python -m consul.bench --client aio --rate 2000 --mix kv-read=1,recurse=1 --watchers 50 --json
+
+Operations are kv-read (a random key), kv-write (a random key), recurse (a
+read of every key under the prefix), health (health.service of the bench
+service, passing only) and heartbeat (a TTL check pass). Watchers run blocking
+queries on the prefix, woken up by the writes.
+
+With --rate, operations are started on a fixed schedule whatever the time
+the previous ones took (open loop) and latencies are measured from when
+they were due, so that a stalled agent shows in the percentiles. Otherwise
+every worker sends its next operation as soon as the previous one
+returned.
+
+Keys and the bench service are set up beforehand, and removed afterwards,
+through consul.std. The agent is the local one on 127.0.0.1:8500 unless
+--host and --port say otherwise.
+
+When developing without an agent, a source checkout of py-consul also
+provides the in-process fake of the test suite, which isn't installed
+with the package: python -m tests.fake_consul --port 8500
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+
+import consul.std
+
+__all__ = ["OPERATIONS", "Recorder", "Schedule", "Workload", "main"]
+
+OPERATIONS = ("kv-read", "kv-write", "recurse", "health", "heartbeat")
+
+PERCENTILES = (50, 95, 99, 99.9)
+
+
+def parse_mix(value):
+    """Returns the (operation, weight) pairs of a mix such as 'kv-read=8,kv-write=2'"""
+    mix = []
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def percentile(values, q):
+    """Returns the nearest-rank *q* percentile of the sorted *values*"""
+    if not values:
+        return None
+    # rounded first, for 99.9% of 1000 values not to be 999.0000000000001 of them
+    rank = math.ceil(round(q * len(values) / 100, 9))
+    return values[max(rank, 1) - 1]
+
+
+class Workload:
+    """
+    The operations of a run. *call* returns the result of an operation for
+    consul.std clients, and its coroutine for consul.aio ones.
+    """
+
+    def __init__(self, mix, prefix="bench/", keys=1000, value_size=128, service="bench", watch_wait="5s"):
+        self.operations = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.prefix = prefix
+        self.keys = keys
+        self.value = b"x" * value_size
+        self.service = service
+        self.check_id = f"service:{service}"
+        self.watch_wait = watch_wait
+
+    def pick(self):
+        return random.choices(self.operations, self.weights)[0]
+
+    def key(self):
+        return f"{self.prefix}{random.randrange(self.keys):08d}"
+
+    def call(self, c, operation):
+        if operation == "kv-read":
+            return c.kv.get(self.key())
+        if operation == "kv-write":
+            return c.kv.put(self.key(), self.value)
+        if operation == "recurse":
+            return c.kv.get(self.prefix, recurse=True)
+        if operation == "health":
+            return c.health.service(self.service, passing=True)
+        return c.agent.check.ttl_pass(self.check_id)
+
+    def watch(self, c, index):
+        return c.kv.get(self.prefix, recurse=True, index=index, wait=self.watch_wait)
+
+    def setup(self, c):
+        for i in range(self.keys):
+            c.kv.put(f"{self.prefix}{i:08d}", self.value)
+        c.agent.service.register(self.service, check=consul.Check.ttl("1h"))
+        c.agent.check.ttl_pass(self.check_id)
+
+    def teardown(self, c):
+        c.kv.delete(self.prefix, recurse=True)
+        c.agent.service.deregister(self.service)
+
+
+class Schedule:
+    """
+    Tells the workers when their next operation is due, at *rate*
+    operations per second or as soon as possible, for *duration* seconds.
+    """
+
+    def __init__(self, duration, rate=None):
+        self.rate = rate
+        self.start = time.perf_counter()
+        self.end = self.start + duration
+        self._sent = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        """Returns the time the next operation is due at, None once the run is over"""
+        if self.rate is None:
+            now = time.perf_counter()
+            return now if now < self.end else None
+        with self._lock:
+            due = self.start + self._sent / self.rate
+            self._sent += 1
+        return due if due < self.end else None
+
+
+class Recorder:
+    """Collects the latency and the errors of every operation, thread-safe"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds, error=None):
+        with self._lock:
+            if error is None:
+                self.latencies.setdefault(operation, []).append(seconds)
+            else:
+                key = (operation, type(error).__name__)
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self, elapsed):
+        """Returns the throughput and latency percentiles, in milliseconds, of every operation"""
+        with self._lock:
+            all_latencies = {operation: sorted(latencies) for operation, latencies in self.latencies.items()}
+            all_errors = dict(self.errors)
+        operations = {}
+        for operation in sorted({*all_latencies, *(name for name, _ in all_errors)}):
+            latencies = all_latencies.get(operation, [])
+            errors = {error: n for (name, error), n in all_errors.items() if name == operation}
+            operations[operation] = {
+                "count": len(latencies),
+                "errors": errors,
+                "throughput": len(latencies) / elapsed,
+                **{f"p{q:g}": _ms(percentile(latencies, q)) for q in PERCENTILES},
+                "max": _ms(latencies[-1] if latencies else None),
+            }
+        requests = sum(op["count"] for name, op in operations.items() if name != "watch")
+        return {"elapsed": elapsed, "throughput": requests / elapsed, "operations": operations}
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _worker(c, workload, schedule, recorder):
+    while True:
+        due = schedule.next()
+        if due is None:
+            return
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        operation = workload.pick()
+        error = None
+        try:
+            workload.call(c, operation)
+        except Exception as e:  # pylint: disable=broad-except
+            error = e
+        recorder.record(operation, time.perf_counter() - due, error)
+
+
+def _watcher(c, workload, schedule, recorder):
+    index = None
+    while time.perf_counter() < schedule.end:
+        start = time.perf_counter()
+        try:
+            index, _ = workload.watch(c, index)
+        except Exception as e:  # pylint: disable=broad-except
+            recorder.record("watch", 0, e)
+            time.sleep(1)
+        else:
+            if start < schedule.end:
+                recorder.record("watch", time.perf_counter() - start)
+
+
+def run_std(c, workload, schedule, recorder, concurrency, watchers):
+    """Runs the workload from *concurrency* threads sharing the thread-safe client *c*"""
+    threads = [
+        threading.Thread(target=_worker, args=(c, workload, schedule, recorder), daemon=True)
+        for _ in range(concurrency)
+    ]
+    # blocking queries may outlive the run by their wait, they aren't waited for
+    for _ in range(watchers):
+        threading.Thread(target=_watcher, args=(c, workload, schedule, recorder), daemon=True).start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+async def _aio_worker(c, workload, schedule, recorder):
+    while True:
+        due = schedule.next()
+        if due is None:
+            return
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        operation = workload.pick()
+        error = None
+        try:
+            await workload.call(c, operation)
+        except Exception as e:  # pylint: disable=broad-except
+            error = e
+        recorder.record(operation, time.perf_counter() - due, error)
+
+
+async def _aio_watcher(c, workload, schedule, recorder):
+    index = None
+    while time.perf_counter() < schedule.end:
+        start = time.perf_counter()
+        try:
+            index, _ = await workload.watch(c, index)
+        except Exception as e:  # pylint: disable=broad-except
+            recorder.record("watch", 0, e)
+            await asyncio.sleep(1)
+        else:
+            if start < schedule.end:
+                recorder.record("watch", time.perf_counter() - start)
+
+
+async def run_aio(c, workload, schedule, recorder, concurrency, watchers):
+    """Runs the workload from *concurrency* tasks sharing the client *c*"""
+    watching = [asyncio.ensure_future(_aio_watcher(c, workload, schedule, recorder)) for _ in range(watchers)]
+    await asyncio.gather(*(_aio_worker(c, workload, schedule, recorder) for _ in range(concurrency)))
+    for task in watching:
+        task.cancel()
+    await asyncio.gather(*watching, return_exceptions=True)
+
+
+def report(summary):
+    """Returns the summary of a run as a table"""
+    header = f"{'operation':<10} {'count':>8} {'errors':>7} {'ops/s':>9}"
+    header += "".join(f" {f'p{q:g} ms':>10}" for q in PERCENTILES) + f" {'max ms':>10}"
+    lines = [header]
+    for name, op in summary["operations"].items():
+        line = f"{name:<10} {op['count']:>8} {sum(op['errors'].values()):>7} {op['throughput']:>9.1f}"
+        for key in [f"p{q:g}" for q in PERCENTILES] + ["max"]:
+            line += f" {'-' if op[key] is None else f'{op[key]:.2f}':>10}"
+        lines.append(line)
+        lines.extend(f"{'':<10} {error}: {n}" for error, n in sorted(op["errors"].items()))
+    lines.append(f"{summary['throughput']:.1f} requests/s over {summary['elapsed']:.1f}s (watches excluded)")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m consul.bench", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--scheme", default="http")
+    parser.add_argument("--token")
+    parser.add_argument("--client", choices=("std", "aio"), default="std")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("kv-read=8,kv-write=1,health=1"))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads or tasks sending the operations")
+    parser.add_argument("--rate", type=float, help="operations per second, as fast as possible if unset")
+    parser.add_argument("--watchers", type=int, default=0, help="blocking queries on the prefix")
+    parser.add_argument("--watch-wait", default="5s")
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--value-size", type=int, default=128, help="bytes")
+    parser.add_argument("--prefix", default="bench/")
+    parser.add_argument("--service", default="bench")
+    parser.add_argument("--compress", action="store_true", help="request gzip encoded responses")
+    parser.add_argument("--retry", action="store_true", help="retry failed requests")
+    parser.add_argument("--coalesce", action="store_true", help="coalesce identical in-flight reads")
+    parser.add_argument("--cache", action="store_true", help="cache the responses in-process")
+    parser.add_argument("--no-setup", dest="setup", action="store_false", help="keep the keys and service as is")
+    parser.add_argument("--json", action="store_true", help="prints the summary as JSON")
+    return parser.parse_args(argv)
+
+
+def client_options(args):
+    options = {"host": args.host, "port": args.port, "scheme": args.scheme, "token": args.token}
+    for name in ("compress", "retry", "coalesce", "cache"):
+        if getattr(args, name):
+            options[name] = True
+    return options
+
+
+def _run_std(args, workload, recorder):
+    c = consul.std.Consul(thread_safe=True, pool_maxsize=args.concurrency + args.watchers, **client_options(args))
+    schedule = Schedule(args.duration, args.rate)
+    try:
+        run_std(c, workload, schedule, recorder, args.concurrency, args.watchers)
+    finally:
+        c.close()
+    return time.perf_counter() - schedule.start
+
+
+async def _run_aio(args, workload, recorder):
+    import consul.aio  # noqa: PLC0415 pylint: disable=import-outside-toplevel
+
+    c = consul.aio.Consul(**client_options(args))
+    schedule = Schedule(args.duration, args.rate)
+    try:
+        await run_aio(c, workload, schedule, recorder, args.concurrency, args.watchers)
+    finally:
+        await c.close()
+    return time.perf_counter() - schedule.start
+
+
+def run(args):
+    """Runs the benchmark described by the parsed command line *args*, returns its summary"""
+    workload = Workload(args.mix, args.prefix, args.keys, args.value_size, args.service, args.watch_wait)
+    admin = consul.std.Consul(host=args.host, port=args.port, scheme=args.scheme, token=args.token)
+    recorder = Recorder()
+    try:
+        if args.setup:
+            workload.setup(admin)
+        if args.client == "std":
+            elapsed = _run_std(args, workload, recorder)
+        else:
+            elapsed = asyncio.run(_run_aio(args, workload, recorder))
+    finally:
+        if args.setup:
+            workload.teardown(admin)
+        admin.close()
+    return recorder.summary(elapsed)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    summary = run(args)
+    print(json.dumps(summary, indent=2) if args.json else report(summary))
+
+
+if __name__ == "__main__":
+    main()
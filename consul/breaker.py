@@ -0,0 +1,156 @@
+import collections
+import logging
+import threading
+import time
+
+from consul.exceptions import CircuitBreakerOpen
+
+log = logging.getLogger(__name__)
+
+__all__ = ["CircuitBreaker", "guard"]
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an agent which keeps failing.
+
+    While *closed*, the outcome of every request is recorded over a sliding
+    window of *window* seconds. Once at least *minimum_requests* were made
+    and the ratio of failures reaches *failure_rate*, the breaker *opens*:
+    requests fail immediately with CircuitBreakerOpen instead of waiting for
+    a timeout. After *reset_timeout* seconds it becomes *half-open* and lets
+    up to *half_open_requests* requests through; it closes again if they
+    succeed and re-opens otherwise.
+
+    Transport errors and 5xx responses count as failures. A breaker is
+    thread-safe. *name* identifies the agent in logs and errors.
+    """
+
+    def __init__(
+        self, failure_rate=0.5, minimum_requests=5, window=10, reset_timeout=30.0, half_open_requests=1, name=None
+    ):
+        assert 0 < failure_rate <= 1, "failure_rate must be in ]0, 1]"
+        self.failure_rate = failure_rate
+        self.minimum_requests = minimum_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_requests = half_open_requests
+        self.name = name
+        self._state = CLOSED
+        self._opened_at = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        # [second, successes, failures]
+        self._buckets = collections.deque()
+        self._counters = {"rejected": 0, "opened": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._in_flight = 0
+        return self._state
+
+    def _bucket(self):
+        second = int(time.monotonic())
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        return self._buckets[-1]
+
+    def _open(self):
+        if self._state != OPEN:
+            log.warning("circuit breaker for %s opened", self.name or "consul")
+            self._counters["opened"] += 1
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._buckets.clear()
+
+    def acquire(self):
+        """Raises CircuitBreakerOpen unless a request may be sent now"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._in_flight < self.half_open_requests:
+                self._in_flight += 1
+                return
+            self._counters["rejected"] += 1
+            retry_after = max(0.0, self._opened_at + self.reset_timeout - time.monotonic()) if state == OPEN else 0.0
+        raise CircuitBreakerOpen(f"circuit breaker for {self.name or 'consul'} is {state}", retry_after=retry_after)
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                log.info("circuit breaker for %s closed", self.name or "consul")
+                self._state = CLOSED
+                self._buckets.clear()
+            self._bucket()[1] += 1
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._bucket()[2] += 1
+            requests = sum(b[1] + b[2] for b in self._buckets)
+            failures = sum(b[2] for b in self._buckets)
+            if requests >= self.minimum_requests and failures >= self.failure_rate * requests:
+                self._open()
+
+    def release(self):
+        """Gives back a half-open slot when a request ended without an outcome, e.g. cancelled"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._in_flight:
+                self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            self._bucket()
+            return {
+                "state": state,
+                "requests": sum(b[1] + b[2] for b in self._buckets),
+                "failures": sum(b[2] for b in self._buckets),
+                **self._counters,
+            }
+
+
+class _Call:
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self.status = None
+
+    def __enter__(self):
+        if self.breaker is not None:
+            self.breaker.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.breaker is None:
+            return
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            self.breaker.release()
+        elif exc_type is not None or (self.status is not None and self.status >= 500):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+
+def guard(breaker):
+    """
+    Returns a context manager guarding one request with *breaker*, which
+    may be None. It raises CircuitBreakerOpen when entered if the request
+    is not allowed and records the outcome when left: an exception or a
+    5xx *status*, set on it by the caller, is a failure.
+    """
+    return _Call(breaker)
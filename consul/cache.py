@@ -0,0 +1,95 @@
+import collections
+import threading
+import time
+
+__all__ = ["ResponseCache"]
+
+Entry = collections.namedtuple("Entry", ["result", "index", "size", "stored_at"])
+
+
+class ResponseCache:
+    """
+    In-process cache of parsed read results, kept along with their
+    X-Consul-Index.
+
+    A result is served from the cache for *ttl* seconds. Past that, the read
+    is revalidated with a blocking query on the cached index lasting at most
+    *revalidate_wait*: when the index did not move, the agent's answer is
+    not parsed again and the cached result is reused.
+
+    At most *max_entries* results are kept, whose bodies sum to at most
+    *max_bytes*, the least recently used ones being evicted first. Any
+    write sent through the client clears the cache, so that a client reads
+    its own writes: a read in flight while the cache is cleared isn't
+    stored, as its answer may predate the write.
+
+    Cached results are shared between callers, they must not be mutated. A
+    cache is thread-safe.
+    """
+
+    def __init__(self, ttl=1.0, max_entries=1024, max_bytes=32 * 1024 * 1024, revalidate_wait="10ms"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.revalidate_wait = revalidate_wait
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        # bumped on every clear
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+
+    def get(self, key):
+        """Returns the entry of *key* and whether it is still fresh, (None, False) if there is none"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = time.monotonic() - entry.stored_at < self.ttl
+            self._counters["hits" if fresh else "misses"] += 1
+            return entry, fresh
+
+    def generation(self):
+        """Returns the number of times the cache was cleared, to be passed to put"""
+        with self._lock:
+            return self._generation
+
+    def put(self, key, result, index, size, revalidated=False, generation=None):
+        """
+        Stores *result*, of a read sent when generation() returned
+        *generation*. It's dropped if the cache was cleared since.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+            if revalidated:
+                self._counters["revalidated"] += 1
+            if size > self.max_bytes:
+                return
+            self._entries[key] = Entry(result, index, size, time.monotonic())
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._generation += 1
+
+    def stats(self):
+        """
+        Returns a dict of counters: *hits* are reads served from the cache,
+        *misses* reads sent to the agent, *revalidated* the misses answered
+        by an unchanged index, *evictions* the entries dropped to stay
+        within bounds, *entries* and *bytes* the current size.
+        """
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "bytes": self._size}
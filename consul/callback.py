@@ -1,30 +1,108 @@
 import base64
-import json
+import collections
+import time
 
+from consul.codec import JSONCodec
 from consul.exceptions import ACLDisabled, ACLPermissionDenied, BadRequest, ClientError, ConsulException, NotFound
 
 #
 # Conveniences to create consistent callback handlers for endpoints
 
 
+def _text(body):
+    # response bodies are raw bytes, only decode them to build error messages
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return bytes(body).decode("utf-8", errors="replace")
+    return body
+
+
+_default_codec = JSONCodec()
+
+
+def _shape(data, decode, is_id, one):
+    # the decode, is_id and one options of CB.json
+    if decode:
+        for item in data:
+            if item.get(decode) is not None:
+                item[decode] = base64.b64decode(item[decode])
+    if is_id:
+        data = data["ID"]
+    if one:
+        if data == []:
+            data = None
+        if data is not None:
+            data = data[0]
+    return data
+
+
+class QueryMeta(
+    collections.namedtuple(
+        "QueryMeta",
+        ["index", "last_contact", "known_leader", "effective_consistency", "cache_hit", "age"],
+        defaults=(None,) * 6,
+    )
+):
+    """
+    Metadata of a read, returned along with the data by the endpoints
+    called with *meta* set.
+
+    *index* is the X-Consul-Index of the response.
+
+    *last_contact* is the number of seconds since the server answering the
+    read last heard from the leader, 0 when it is the leader. It tells how
+    stale a read with consistency='stale' may be.
+
+    *known_leader* is whether that server knew of a leader.
+
+    *effective_consistency* is the consistency mode the read was actually
+    served with, which may differ from the requested one, e.g. 'leader' or
+    'stale'.
+
+    *cache_hit* is whether the agent served the read from its cache, None
+    if the read didn't use the agent cache (see *cached*).
+
+    *age* is the number of seconds the agent cached the response for, None
+    if it wasn't served from its cache.
+
+    Each field is None when the agent didn't send the matching header.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_headers(cls, headers):
+        last_contact = headers.get("X-Consul-LastContact")
+        known_leader = headers.get("X-Consul-KnownLeader")
+        x_cache = headers.get("X-Cache")
+        age = headers.get("Age")
+        return cls(
+            index=headers.get("X-Consul-Index"),
+            last_contact=int(last_contact) / 1000 if last_contact is not None else None,
+            known_leader=known_leader == "true" if known_leader is not None else None,
+            effective_consistency=headers.get("X-Consul-Effective-Consistency"),
+            cache_hit=x_cache == "HIT" if x_cache is not None else None,
+            age=int(age) if age is not None else None,
+        )
+
+
 class CB:
     @classmethod
     def _status(cls, response, allow_404=True):
         # status checking
         if 400 <= response.code < 500:
             if response.code == 400:
-                raise BadRequest(f"{response.code} {response.body}")
+                raise BadRequest(f"{response.code} {_text(response.body)}")
             if response.code == 401:
-                raise ACLDisabled(response.body)
+                raise ACLDisabled(_text(response.body))
             if response.code == 403:
-                raise ACLPermissionDenied(response.body)
+                raise ACLPermissionDenied(_text(response.body))
             if response.code == 404:
                 if not allow_404:
-                    raise NotFound(response.body)
+                    raise NotFound(_text(response.body))
             else:
-                raise ClientError(f"{response.code} {response.body}")
+                raise ClientError(f"{response.code} {_text(response.body)}")
         elif 500 <= response.code < 600:
-            raise ConsulException(f"{response.code} {response.body}")
+            raise ConsulException(f"{response.code} {_text(response.body)}")
 
     @classmethod
     def bool(cls):
@@ -33,10 +111,21 @@ class CB:
             CB._status(response)
             return response.code == 200
 
+        cb.key = ("bool",)
         return cb
 
     @classmethod
-    def json(cls, postprocess=None, allow_404=True, one=False, decode=False, is_id=False, index=False):
+    def json(
+        cls,
+        postprocess=None,
+        allow_404=True,
+        one=False,
+        decode=False,
+        is_id=False,
+        index=False,
+        codec=None,
+        meta=False,
+    ):
         """
         *postprocess* is a function to apply to the final result.
 
@@ -51,29 +140,37 @@ class CB:
         *decode* if specified this key will be base64 decoded.
 
         *is_id* only the 'ID' field of the json object will be returned.
+
+        *codec* is the JSON codec used to parse the body, see consul.codec.
+        Defaults to the standard library json module.
+
+        *meta* if set, a tuple of QueryMeta, data will be returned. It
+        takes precedence over *index*.
         """
+        loads = (codec or _default_codec).loads
 
         def cb(response):
             CB._status(response, allow_404=allow_404)
             if response.code == 404:
                 data = None
             else:
-                data = json.loads(response.body)
-                if decode:
-                    for item in data:
-                        if item.get(decode) is not None:
-                            item[decode] = base64.b64decode(item[decode])
-                if is_id:
-                    data = data["ID"]
-                if one:
-                    if data == []:
-                        data = None
-                    if data is not None:
-                        data = data[0]
+                # time the decoding for the hooks observing the request
+                event = response.event
+                start = time.perf_counter() if event is not None else None
+                data = _shape(loads(response.body), decode, is_id, one)
+                if event is not None:
+                    decoded = time.perf_counter()
+                    event.decode_time = decoded - start
                 if postprocess:
                     data = postprocess(data)
+                    if event is not None:
+                        event.postprocess_time = time.perf_counter() - decoded
+            if meta:
+                return QueryMeta.from_headers(response.headers), data
             if index:
                 return response.headers["X-Consul-Index"], data
             return data
 
+        # callbacks with the same key parse a response the same way
+        cb.key = ("json", postprocess, allow_404, one, decode, is_id, index, codec, meta)
         return cb
@@ -0,0 +1,71 @@
+import asyncio
+import concurrent.futures
+import threading
+
+__all__ = ["SingleFlight"]
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in
+    flight, further calls for the same key wait for it and share its result,
+    or its exception, instead of doing the work again.
+
+    Shared results are the very same objects, callers must not mutate them.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "saved": 0}
+
+    def do(self, key, fn):
+        """Returns the result of *fn*, shared with the concurrent calls for *key*"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+                self._counters["calls"] += 1
+            else:
+                self._counters["saved"] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+        self._forget(key)
+        future.set_result(result)
+        return result
+
+    def _forget(self, key):
+        with self._lock:
+            del self._calls[key]
+
+    async def ado(self, key, fn):
+        """
+        Same as do, for a coroutine function *fn*. The call runs in its own
+        task so that cancelling one of the waiting callers does not cancel it
+        for the others.
+        """
+        with self._lock:
+            task = self._calls.get(key)
+            if task is None:
+                task = self._calls[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget(key))
+                self._counters["calls"] += 1
+            else:
+                self._counters["saved"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """
+        Returns a dict of counters: *calls* is the number of calls actually
+        made and *saved* the number of calls which shared the result of a
+        call in flight.
+        """
+        with self._lock:
+            return dict(self._counters)
@@ -0,0 +1,91 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+__all__ = ["JSONCodec", "OrjsonCodec", "UjsonCodec", "get_codec"]
+
+
+class JSONCodec:
+    """
+    JSON encoder/decoder used for request bodies and responses. The default
+    implementation relies on the standard library json module.
+
+    A custom codec only needs to provide *loads*, accepting the raw response
+    body (bytes, bytearray or memoryview), and *dumps*, returning a str or
+    bytes request body.
+    """
+
+    name = "json"
+
+    def loads(self, body):
+        # unlike bytes and bytearray, memoryview is not accepted by json.loads
+        if isinstance(body, memoryview):
+            body = body.tobytes()
+        return json.loads(body)
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec based on `orjson <https://github.com/ijl/orjson>`_, which parses
+    bytes and memoryview without decoding them to str first.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("the orjson codec requires the orjson package")
+
+    def loads(self, body):
+        return orjson.loads(body)
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+class UjsonCodec(JSONCodec):
+    """Codec based on `ujson <https://github.com/ultrajson/ultrajson>`_"""
+
+    name = "ujson"
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError("the ujson codec requires the ujson package")
+
+    def loads(self, body):
+        if isinstance(body, memoryview):
+            body = body.tobytes()
+        return ujson.loads(body)
+
+    def dumps(self, obj):
+        return ujson.dumps(obj, escape_forward_slashes=False)
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec, UjsonCodec)}
+
+
+def get_codec(codec=None):
+    """
+    Returns a codec instance.
+
+    *codec* is either None, to pick orjson when it is installed and the
+    standard library json module otherwise, one of 'json', 'orjson' or
+    'ujson', or an object implementing *loads* and *dumps*.
+    """
+    if codec is None:
+        return OrjsonCodec() if orjson is not None else JSONCodec()
+    if isinstance(codec, str):
+        assert codec in CODECS, f"codec must be one of {', '.join(CODECS)}"
+        return CODECS[codec]()
+    return codec
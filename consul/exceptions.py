@@ -24,3 +24,15 @@ class BadRequest(ConsulException):
 
 class ClientError(ConsulException):
     """Encapsulates 4xx Http error code"""
+
+
+class CircuitBreakerOpen(ConsulException):
+    """
+    Raised without contacting the agent when its circuit breaker is open.
+    *retry_after* is the number of seconds before a request is let through
+    again. Callers can catch it to fall back to cached data.
+    """
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
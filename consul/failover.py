@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+__all__ = ["Endpoint", "EndpointSet"]
+
+
+class Endpoint:
+    """An agent address along with what has been observed about it"""
+
+    def __init__(self, base_uri):
+        self.base_uri = base_uri
+        self.healthy = True
+        # exponentially weighted moving average of the response time, in seconds
+        self.latency = None
+        self.failures = 0
+
+    def __repr__(self):
+        return f"Endpoint({self.base_uri!r}, healthy={self.healthy}, latency={self.latency})"
+
+
+class EndpointSet:
+    """
+    Spreads requests over several agents and fails over between them.
+
+    Healthy endpoints are preferred, ordered by latency. The first one is
+    picked with the power of two random choices so that load is spread over
+    the agents while favouring the fastest. Endpoints which failed are only
+    tried last. They become healthy again as soon as a request or a
+    background probe of *probe_path* succeeds.
+    """
+
+    def __init__(self, base_uris, probe_interval=5.0, probe_timeout=2.0, probe_path="/v1/status/leader", alpha=0.3):
+        assert base_uris, "at least one address is required"
+        self.endpoints = [Endpoint(base_uri) for base_uri in base_uris]
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.probe_path = probe_path
+        self.alpha = alpha
+        self._stop = threading.Event()
+        self._thread = None
+        self._task = None
+
+    def candidates(self):
+        """Returns the endpoints in the order they should be tried"""
+        healthy = sorted((e for e in self.endpoints if e.healthy), key=lambda e: e.latency or 0.0)
+        unhealthy = sorted((e for e in self.endpoints if not e.healthy), key=lambda e: e.failures)
+        if len(healthy) > 1:
+            first = min(random.sample(range(len(healthy)), 2))
+            healthy.insert(0, healthy.pop(first))
+        return healthy + unhealthy
+
+    def record_success(self, endpoint, elapsed=None):
+        """
+        Marks *endpoint* healthy. *elapsed* is the response time to account
+        for, it should be None for blocking queries.
+        """
+        if not endpoint.healthy:
+            log.info("consul agent %s is back", endpoint.base_uri)
+        endpoint.healthy = True
+        endpoint.failures = 0
+        if elapsed is not None:
+            if endpoint.latency is None:
+                endpoint.latency = elapsed
+            else:
+                endpoint.latency += self.alpha * (elapsed - endpoint.latency)
+
+    def record_failure(self, endpoint):
+        if endpoint.healthy:
+            log.warning("consul agent %s is unreachable", endpoint.base_uri)
+        endpoint.healthy = False
+        endpoint.failures += 1
+
+    @staticmethod
+    def probe_succeeded(code, body):
+        # an agent without a known leader answers "" and can't serve reads
+        return code == 200 and bytes(body).strip() not in (b"", b'""')
+
+    def _record_probe(self, endpoint, start, ok):
+        if ok:
+            self.record_success(endpoint, time.monotonic() - start)
+        else:
+            self.record_failure(endpoint)
+
+    def probe(self, send):
+        """Probes every endpoint with *send*, a callable returning whether it is up"""
+        for endpoint in self.endpoints:
+            start = time.monotonic()
+            try:
+                ok = send(endpoint)
+            except Exception:  # pylint: disable=broad-except
+                ok = False
+            self._record_probe(endpoint, start, ok)
+
+    async def aprobe(self, send):
+        """Same as probe, for a coroutine function *send*"""
+        for endpoint in self.endpoints:
+            start = time.monotonic()
+            try:
+                ok = await send(endpoint)
+            except Exception:  # pylint: disable=broad-except
+                ok = False
+            self._record_probe(endpoint, start, ok)
+
+    def start(self, send):
+        """Probes the endpoints every *probe_interval* seconds from a daemon thread"""
+        if self._thread is None and self.probe_interval:
+            self._thread = threading.Thread(target=self._run, args=(send,), name="consul-probe", daemon=True)
+            self._thread.start()
+
+    def _run(self, send):
+        while not self._stop.wait(self.probe_interval):
+            self.probe(send)
+
+    def astart(self, send):
+        """Probes the endpoints every *probe_interval* seconds from an asyncio task"""
+        if self._task is None and self.probe_interval:
+            self._task = asyncio.ensure_future(self._arun(send))
+
+    async def _arun(self, send):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.aprobe(send)
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def stats(self):
+        """Returns the state of every endpoint, in configuration order"""
+        return [
+            {"address": e.base_uri, "healthy": e.healthy, "latency": e.latency, "failures": e.failures}
+            for e in self.endpoints
+        ]
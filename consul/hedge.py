@@ -0,0 +1,215 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import logging
+import math
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+__all__ = ["HedgePolicy"]
+
+
+class HedgePolicy:
+    """
+    Hedges stale reads against several agents to cut tail latency.
+
+    A read is first sent to the preferred agent. If no response arrived
+    after the *percentile* of the recently observed response times, a
+    duplicate is sent to the next agent and whichever answers first wins.
+    The delay is bounded by *min_delay* and *max_delay*, in seconds, and
+    *initial_delay* is used until *min_samples* response times were
+    observed. The last *samples* response times are kept.
+
+    Only non blocking reads with consistency='stale' are hedged, as any
+    server can answer them. Blocking clients send the first request of up
+    to *max_concurrency* reads, and up to *max_workers* hedges, from two
+    pools of threads. Beyond that, reads aren't hedged (see the *skipped*
+    counter) rather than queued, since an overloaded client would
+    otherwise take its own queueing for agent latency and double the
+    traffic it sends: a read is then sent from the caller's thread, or its
+    first request waited for.
+
+    A policy is thread-safe and can be shared between clients.
+    """
+
+    def __init__(
+        self,
+        percentile=95,
+        min_delay=0.005,
+        max_delay=1.0,
+        initial_delay=0.05,
+        samples=200,
+        min_samples=20,
+        max_workers=8,
+        max_concurrency=32,
+    ):
+        assert 0 < percentile <= 100, "percentile must be in ]0, 100]"
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self._latencies = collections.deque(maxlen=samples)
+        self._counters = {"requests": 0, "hedged": 0, "hedge_wins": 0, "skipped": 0}
+        self._lock = threading.Lock()
+        self._hedges = threading.BoundedSemaphore(max_workers)
+        self._primaries = threading.BoundedSemaphore(max_concurrency)
+        # (primaries, hedges) thread pools, created on first use
+        self._executors = None
+
+    def delay(self):
+        """Returns the number of seconds to wait before hedging"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            latencies = sorted(self._latencies)
+        delay = latencies[math.ceil(self.percentile / 100 * len(latencies)) - 1]
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def record_latency(self, elapsed):
+        with self._lock:
+            self._latencies.append(elapsed)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        """
+        Returns a dict of the hedging counters: *requests* is the number of
+        hedgeable reads, *hedged* the number of them for which a duplicate
+        was sent, *hedge_wins* the number of times the duplicate answered
+        first and *skipped* the number of reads not hedged because
+        *max_concurrency* reads or *max_workers* hedges already were.
+        *hedge_rate* and *win_rate* are the matching ratios and *delay* the
+        current hedging delay.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats["hedge_rate"] = stats["hedged"] / stats["requests"] if stats["requests"] else 0.0
+        stats["win_rate"] = stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
+        stats["delay"] = self.delay()
+        return stats
+
+    def _timed(self, send, endpoint):
+        start = time.monotonic()
+        result = send(endpoint)
+        self.record_latency(time.monotonic() - start)
+        return result
+
+    async def _atimed(self, send, endpoint):
+        start = time.monotonic()
+        result = await send(endpoint)
+        self.record_latency(time.monotonic() - start)
+        return result
+
+    def _get_executors(self):
+        with self._lock:
+            if self._executors is None:
+                self._executors = (
+                    concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.max_concurrency, thread_name_prefix="consul-hedge-primary"
+                    ),
+                    concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="consul-hedge"
+                    ),
+                )
+            return self._executors
+
+    def _reserve(self, slots):
+        """Returns whether one of *slots* was taken, releasing it is up to the caller"""
+        if slots.acquire(blocking=False):  # pylint: disable=consider-using-with
+            return True
+        self._count("skipped")
+        return False
+
+    @staticmethod
+    def _submit(executor, slots, fn, *args):
+        """
+        Runs *fn* from *executor*, which has a thread free since one of its
+        *slots* was taken, with the context of the caller: e.g. the span of
+        consul.tracing stays current while the request is sent.
+        """
+        future = executor.submit(contextvars.copy_context().run, fn, *args)
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def run(self, send, endpoints):
+        """
+        Calls *send* with the first of *endpoints* and, if it didn't answer
+        within delay() or failed, with the second one. Returns the first
+        result, or raises the last error if both failed.
+        """
+        primary, secondary = endpoints[:2]
+        self._count("requests")
+        if not self._reserve(self._primaries):
+            return self._timed(send, primary)
+        primaries, hedges = self._get_executors()
+        sent = threading.Event()
+
+        def send_primary():
+            sent.set()
+            return self._timed(send, primary)
+
+        first = self._submit(primaries, self._primaries, send_primary)
+        # the delay only counts the time the agent takes
+        sent.wait()
+        done, _ = concurrent.futures.wait([first], timeout=self.delay())
+        if (done and first.exception() is None) or not self._reserve(self._hedges):
+            return first.result()
+        log.debug("hedging request to %s with %s", primary.base_uri, secondary.base_uri)
+        self._count("hedged")
+        second = self._submit(hedges, self._hedges, self._timed, send, secondary)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            # the primary wins ties
+            for future in sorted(done, key=lambda f: f is second):
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def arun(self, send, endpoints):
+        """Same as run, for a coroutine function *send*. The losing request is cancelled."""
+        primary, secondary = endpoints[:2]
+        self._count("requests")
+        first = asyncio.ensure_future(self._atimed(send, primary))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.delay())
+            if (done and first.exception() is None) or not self._reserve(self._hedges):
+                return await first
+            log.debug("hedging request to %s with %s", primary.base_uri, secondary.base_uri)
+            self._count("hedged")
+            second = asyncio.ensure_future(self._atimed(send, secondary))
+            second.add_done_callback(lambda _: self._hedges.release())
+            pending.add(second)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t is second):
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        """Stops the threads of the blocking clients, they are started again when needed"""
+        with self._lock:
+            executors, self._executors = self._executors, None
+        for executor in executors or ():
+            executor.shutdown(wait=False)
@@ -0,0 +1,193 @@
+import functools
+import logging
+import re
+import time
+
+log = logging.getLogger(__name__)
+
+__all__ = ["Hook", "RequestEvent", "endpoint_template"]
+
+# the paths of the HTTP API called by the endpoints, to report requests by
+# template rather than by path, the most specific first. {key} spans
+# several segments.
+ENDPOINTS = (
+    "/v1/kv/{key}",
+    "/v1/health/service/{service}",
+    "/v1/health/connect/{service}",
+    "/v1/health/checks/{service}",
+    "/v1/health/node/{node}",
+    "/v1/health/state/{name}",
+    "/v1/catalog/service/{service}",
+    "/v1/catalog/connect/{service}",
+    "/v1/catalog/node/{node}",
+    "/v1/session/info/{session_id}",
+    "/v1/session/node/{node}",
+    "/v1/session/renew/{session_id}",
+    "/v1/session/destroy/{session_id}",
+    "/v1/agent/check/pass/{check_id}",
+    "/v1/agent/check/warn/{check_id}",
+    "/v1/agent/check/fail/{check_id}",
+    "/v1/agent/check/deregister/{check_id}",
+    "/v1/agent/service/deregister/{service_id}",
+    "/v1/agent/service/maintenance/{service_id}",
+    "/v1/agent/service/register",
+    "/v1/agent/service/{service_id}",
+    "/v1/agent/connect/ca/leaf/{service}",
+    "/v1/agent/force-leave/{node}",
+    "/v1/agent/join/{address}",
+    "/v1/event/fire/{name}",
+    "/v1/query/{query}/execute",
+    "/v1/query/{query}/explain",
+    "/v1/query/{query_id}",
+    "/v1/acl/token/{accessor_id}/clone",
+    "/v1/acl/token/{accessor_id}",
+    "/v1/acl/policy/{uuid}",
+)
+
+_TEMPLATES = [
+    (
+        re.compile(re.sub(r"\\{(\w+)\\}", lambda m: ".*" if m.group(1) == "key" else "[^/]+", re.escape(endpoint))),
+        endpoint,
+    )
+    for endpoint in ENDPOINTS
+]
+
+
+@functools.lru_cache(maxsize=4096)
+def endpoint_template(path):
+    """
+    Returns the template of the API endpoint of *path*, e.g.
+    '/v1/health/service/{service}' for '/v1/health/service/web'. Paths
+    without variable segments are their own template.
+    """
+    for pattern, template in _TEMPLATES:
+        if pattern.fullmatch(path):
+            return template
+    return path
+
+
+class RequestEvent:
+    """
+    A request sent to the agent, handed to the hooks as it starts and again
+    as it ends. Hooks may keep their own state in *context*.
+
+    *method*, *path* and *params* are those of the request and *endpoint*
+    the template of its path, see endpoint_template. *blocking* is whether
+    it is a blocking query and *wait* the longest time, in seconds, the
+    agent may hold it. *bytes_out* is the size of the request body.
+
+    Once the request ended, *status*, *index* (its X-Consul-Index) and
+    *bytes_in* describe the response, or *error* is the exception it
+    raised, which may also be raised by the callback for an error status.
+    *attempts* is the number of times it was sent, more than 1 when it was
+    retried.
+
+    Times are in seconds: *duration* is the whole request, *network_time*
+    the part spent until the response was received, including retries,
+    *decode_time* the parsing of the body and *postprocess_time* the
+    shaping of the result by the endpoint.
+    """
+
+    __slots__ = (
+        "method",
+        "path",
+        "endpoint",
+        "params",
+        "blocking",
+        "wait",
+        "bytes_out",
+        "status",
+        "index",
+        "bytes_in",
+        "error",
+        "attempts",
+        "start",
+        "duration",
+        "network_time",
+        "decode_time",
+        "postprocess_time",
+        "context",
+    )
+
+    def __init__(self, method, path, params=None, data=None, blocking=False, wait=None):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint_template(path)
+        self.params = params
+        self.blocking = blocking
+        self.wait = wait
+        self.bytes_out = len(data.encode() if isinstance(data, str) else data) if data else 0
+        self.status = None
+        self.index = None
+        self.bytes_in = None
+        self.error = None
+        self.attempts = 0
+        self.start = time.perf_counter()
+        self.duration = None
+        self.network_time = None
+        self.decode_time = None
+        self.postprocess_time = None
+        self.context = {}
+
+    def param(self, name, default=None):
+        """Returns the value of the query parameter *name* of the request"""
+        if isinstance(self.params, dict):
+            return self.params.get(name, default)
+        return next((value for key, value in self.params or () if key == name), default)
+
+    def counted(self, send):
+        """Wraps *send*, a function sending the request, to count the attempts"""
+
+        def attempt():
+            self.attempts += 1
+            return send()
+
+        return attempt
+
+    def __repr__(self):
+        return f"<RequestEvent {self.method} {self.path} status={self.status} duration={self.duration}>"
+
+
+class Hook:
+    """
+    Base class of the request hooks, whose methods do nothing. Any object
+    with these methods can be used as a hook.
+
+    Hooks are called synchronously on the path of every request, from the
+    thread or event loop sending it, so they must be quick and must not
+    block. An exception raised by a hook is logged and otherwise ignored.
+    """
+
+    def request_start(self, event):
+        """Called with the consul.hooks.RequestEvent of a request about to be sent"""
+
+    def request_end(self, event):
+        """Called with the same event once the request ended, successfully or not"""
+
+
+def _notify(hooks, name, event):
+    for hook in hooks:
+        try:
+            getattr(hook, name)(event)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("consul hook %r failed on %s", hook, name)
+
+
+class _Observation:
+    def __init__(self, hooks, event):
+        self.hooks = hooks
+        self.event = event
+
+    def __enter__(self):
+        _notify(self.hooks, "request_start", self.event)
+        return self.event
+
+    def __exit__(self, exc_type, exc, tb):
+        self.event.duration = time.perf_counter() - self.event.start
+        self.event.error = exc
+        _notify(self.hooks, "request_end", self.event)
+
+
+def observe(hooks, event):
+    """Returns a context manager notifying *hooks* of the start and end of the request of *event*"""
+    return _Observation(hooks, event)
@@ -0,0 +1,343 @@
+import functools
+import ssl
+import time
+
+import httpx
+
+from consul import Timeout, base
+
+__all__ = ["AsyncConsul", "Consul"]
+
+
+def _ssl_context(verify, cert):
+    """Builds the SSLContext httpx expects from requests-like verify and cert"""
+    if isinstance(verify, str):
+        context = ssl.create_default_context(cafile=verify)
+    else:
+        context = ssl.create_default_context()
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+    if cert:
+        if isinstance(cert, (tuple, list)):
+            context.load_cert_chain(*cert)
+        else:
+            context.load_cert_chain(cert)
+    return context
+
+
+# errors raised before the request was sent, it can be safely resent anywhere
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+def _connect_failed(error):
+    """Whether a transport *error* was raised before the request was sent"""
+    return isinstance(error, _CONNECT_ERRORS)
+
+
+class _HTTPXMixin:
+    """
+    Shared setup of the sync and async httpx clients. Blocking queries may
+    last several minutes so, like the other transports, no timeout is set
+    unless a request is given a *connections_timeout*.
+    """
+
+    def _client_kwargs(self):
+        headers = {"Accept-Encoding": "gzip"} if self.compress else {}
+        return {"headers": headers, "timeout": None}
+
+    def _tls(self):
+        """Whether any agent is spoken to over https, with *addresses* the client's scheme may not tell"""
+        if self.endpoints is None:
+            return self.scheme == "https"
+        return any(endpoint.base_uri.startswith("https://") for endpoint in self.endpoints.endpoints)
+
+    def _transport_kwargs(self, http2, max_connections, max_keepalive_connections):
+        return {
+            "verify": _ssl_context(self.verify, self.cert) if self._tls() else True,
+            "http2": http2,
+            "limits": httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_keepalive_connections
+            ),
+            "uds": self.socket_path,
+        }
+
+    @staticmethod
+    def _options(headers, connections_timeout):
+        """
+        Returns the keyword arguments of every send of a request,
+        *connections_timeout* bounds each of its connect, write and read.
+        """
+        timeout = httpx.Timeout(connections_timeout) if connections_timeout else httpx.USE_CLIENT_DEFAULT
+        return {"headers": headers, "timeout": timeout}
+
+    def response(self, response):
+        body = response.content
+        if self.compress:
+            # httpx decodes gzip itself and counts the bytes read from the wire
+            self.record_transfer(response.num_bytes_downloaded, len(body), response.headers.get("Content-Encoding"))
+        return base.Response(response.status_code, response.headers, body)
+
+    @staticmethod
+    def _retry_kwargs():
+        return {
+            "status": lambda response: response.status_code,
+            "errors": httpx.TransportError,
+            "connect_failed": _connect_failed,
+        }
+
+
+class HTTPClient(_HTTPXMixin, base.HTTPClient):
+    """Blocking adapter for python consul using the httpx library"""
+
+    def __init__(self, *args, http2=True, max_connections=100, max_keepalive_connections=20, **kwargs):
+        super().__init__(*args, **kwargs)
+        transport = httpx.HTTPTransport(**self._transport_kwargs(http2, max_connections, max_keepalive_connections))
+        self.client = httpx.Client(transport=transport, **self._client_kwargs())
+        if self.endpoints is not None:
+            self.endpoints.start(self._probe)
+
+    def _request(self, callback, method, path, params=None, data=None, headers=None, connections_timeout=None):
+        with self.observe(method, path, params, data) as event:
+            options = self._options(headers, connections_timeout)
+            attempt = functools.partial(self._attempt, method, path, params, data, options)
+            if event is not None:
+                attempt = event.counted(attempt)
+            try:
+                response = attempt() if self.retry is None else self.retry.run(method, attempt, **self._retry_kwargs())
+            except httpx.ReadTimeout as e:
+                raise Timeout(f"no response to {method} {path} within {connections_timeout}s") from e
+            self.invalidate(method)
+            return self.parse(callback, self.response(response), event)
+
+    def _attempt(self, method, path, params, data, options):
+        if self.endpoints is None:
+            return self._guarded_request(None, method, self.uri(path, params), data, options)
+        if self.hedged(method, params):
+            return self.hedge.run(
+                lambda endpoint: self._endpoint_get(endpoint, path, params, options), self.endpoints.candidates()
+            )
+        return self.failover(
+            method,
+            params,
+            lambda endpoint: self._guarded_request(
+                endpoint.base_uri, method, self.uri(path, params, endpoint.base_uri), data, options
+            ),
+            httpx.TransportError,
+            _connect_failed,
+        )
+
+    def _endpoint_get(self, endpoint, path, params, options):
+        start = time.monotonic()
+        try:
+            response = self._guarded_request(
+                endpoint.base_uri, "GET", self.uri(path, params, endpoint.base_uri), None, options
+            )
+        except httpx.TransportError:
+            self.endpoints.record_failure(endpoint)
+            raise
+        self.endpoints.record_success(endpoint, time.monotonic() - start)
+        return response
+
+    def _guarded_request(self, base_uri, method, uri, data, options):
+        with self.guard(base_uri) as call:
+            response = self.client.request(method, uri, content=data, **options)
+            call.status = response.status_code
+        return response
+
+    def _probe(self, endpoint):
+        uri = self.uri(self.endpoints.probe_path, base_uri=endpoint.base_uri)
+        response = self.client.get(uri, timeout=self.endpoints.probe_timeout)
+        return self.endpoints.probe_succeeded(response.status_code, response.content)
+
+    def get(self, callback, path, params=None, headers=None, connections_timeout=None):
+        hit, result, callback, params = self.cache_lookup(callback, path, params, headers)
+        if hit:
+            return result
+        key = self.flight_key(callback, path, params, headers)
+        if key is None:
+            return self._request(
+                callback, "GET", path, params, headers=headers, connections_timeout=connections_timeout
+            )
+        return self.single_flight.do(
+            key,
+            functools.partial(
+                self._request, callback, "GET", path, params, headers=headers, connections_timeout=connections_timeout
+            ),
+        )
+
+    def put(self, callback, path, params=None, data="", connections_timeout=None):
+        return self._request(callback, "PUT", path, params, data=data, connections_timeout=connections_timeout)
+
+    def delete(self, callback, path, params=None, connections_timeout=None):
+        return self._request(callback, "DELETE", path, params, connections_timeout=connections_timeout)
+
+    def post(self, callback, path, params=None, data="", connections_timeout=None):
+        return self._request(callback, "POST", path, params, data=data, connections_timeout=connections_timeout)
+
+    def close(self):
+        if self.endpoints is not None:
+            self.endpoints.stop()
+        if self.hedge is not None:
+            self.hedge.close()
+        self.client.close()
+
+
+class AsyncHTTPClient(_HTTPXMixin, base.HTTPClient):
+    """Asyncio adapter for python consul using the httpx library"""
+
+    def __init__(self, *args, http2=True, max_connections=100, max_keepalive_connections=20, **kwargs):
+        super().__init__(*args, **kwargs)
+        transport = httpx.AsyncHTTPTransport(
+            **self._transport_kwargs(http2, max_connections, max_keepalive_connections)
+        )
+        self.client = httpx.AsyncClient(transport=transport, **self._client_kwargs())
+
+    async def _request(self, callback, method, path, params=None, data=None, headers=None, connections_timeout=None):
+        with self.observe(method, path, params, data) as event:
+            options = self._options(headers, connections_timeout)
+            attempt = functools.partial(self._attempt, method, path, params, data, options)
+            if event is not None:
+                attempt = event.counted(attempt)
+            try:
+                if self.retry is None:
+                    response = await attempt()
+                else:
+                    response = await self.retry.arun(method, attempt, **self._retry_kwargs())
+            except httpx.ReadTimeout as e:
+                raise Timeout(f"no response to {method} {path} within {connections_timeout}s") from e
+            self.invalidate(method)
+            return self.parse(callback, self.response(response), event)
+
+    def _attempt(self, method, path, params, data, options):
+        if self.endpoints is None:
+            return self._guarded_request(None, method, self.uri(path, params), data, options)
+        if self.hedged(method, params):
+            self.endpoints.astart(self._probe)
+            return self.hedge.arun(
+                lambda endpoint: self._endpoint_get(endpoint, path, params, options), self.endpoints.candidates()
+            )
+        self.endpoints.astart(self._probe)
+        return self.afailover(
+            method,
+            params,
+            lambda endpoint: self._guarded_request(
+                endpoint.base_uri, method, self.uri(path, params, endpoint.base_uri), data, options
+            ),
+            httpx.TransportError,
+            _connect_failed,
+        )
+
+    async def _endpoint_get(self, endpoint, path, params, options):
+        start = time.monotonic()
+        try:
+            response = await self._guarded_request(
+                endpoint.base_uri, "GET", self.uri(path, params, endpoint.base_uri), None, options
+            )
+        except httpx.TransportError:
+            self.endpoints.record_failure(endpoint)
+            raise
+        self.endpoints.record_success(endpoint, time.monotonic() - start)
+        return response
+
+    async def _guarded_request(self, base_uri, method, uri, data, options):
+        with self.guard(base_uri) as call:
+            response = await self.client.request(method, uri, content=data, **options)
+            call.status = response.status_code
+        return response
+
+    async def _probe(self, endpoint):
+        uri = self.uri(self.endpoints.probe_path, base_uri=endpoint.base_uri)
+        response = await self.client.get(uri, timeout=self.endpoints.probe_timeout)
+        return self.endpoints.probe_succeeded(response.status_code, response.content)
+
+    async def get(  # pylint: disable=invalid-overridden-method
+        self, callback, path, params=None, headers=None, connections_timeout=None
+    ):
+        hit, result, callback, params = self.cache_lookup(callback, path, params, headers)
+        if hit:
+            return result
+        key = self.flight_key(callback, path, params, headers)
+        if key is None:
+            return await self._request(
+                callback, "GET", path, params, headers=headers, connections_timeout=connections_timeout
+            )
+        return await self.single_flight.ado(
+            key,
+            functools.partial(
+                self._request, callback, "GET", path, params, headers=headers, connections_timeout=connections_timeout
+            ),
+        )
+
+    def put(self, callback, path, params=None, data="", connections_timeout=None):
+        return self._request(callback, "PUT", path, params, data=data, connections_timeout=connections_timeout)
+
+    def delete(self, callback, path, params=None, connections_timeout=None):
+        return self._request(callback, "DELETE", path, params, connections_timeout=connections_timeout)
+
+    def post(self, callback, path, params=None, data="", connections_timeout=None):
+        return self._request(callback, "POST", path, params, data=data, connections_timeout=connections_timeout)
+
+    def close(self):
+        if self.endpoints is not None:
+            self.endpoints.stop()
+        return self.client.aclose()
+
+
+class Consul(base.Consul):
+    http_client_class = HTTPClient
+
+    def __init__(self, *args, http2=True, max_connections=100, max_keepalive_connections=20, compress=False, **kwargs):
+        """
+        *http2* if set, HTTP/2 is negotiated with TLS-enabled agents so that
+        many concurrent requests, including long-polling blocking queries,
+        are multiplexed over a single connection. It requires the h2
+        package (pip install py-consul[httpx]). Plain http agents are
+        always spoken to in HTTP/1.1.
+
+        *max_connections* is the maximum number of concurrent connections.
+
+        *max_keepalive_connections* is the number of idle connections kept
+        open for reuse.
+
+        *compress* if set, gzip encoded responses are explicitly requested
+        and the transferred sizes are tracked, see compression_stats.
+
+        See base.Consul for the remaining arguments.
+        """
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.compress = compress
+        super().__init__(*args, **kwargs)
+
+    def http_connect(self, host, port, scheme, verify=True, cert=None):
+        return self.http_client_class(
+            host,
+            port,
+            scheme,
+            verify=verify,
+            cert=cert,
+            compress=self.compress,
+            http2=self.http2,
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            **self.http_options,
+        )
+
+    def compression_stats(self):
+        """Returns the transfer counters, see base.HTTPClient.compression_stats"""
+        return self.http.compression_stats()
+
+    def close(self):
+        """Close all opened http connections"""
+        return self.http.close()
+
+
+class AsyncConsul(Consul):
+    """
+    Same as Consul, except that every API call returns a coroutine, as with
+    consul.aio.
+    """
+
+    http_client_class = AsyncHTTPClient
@@ -0,0 +1,136 @@
+import bisect
+import threading
+
+from consul.hooks import Hook
+
+__all__ = ["MetricsCollector"]
+
+# in seconds, those of the Prometheus client libraries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsCollector(Hook):
+    """
+    Request hook keeping Prometheus style metrics of the requests sent to
+    the agents, labelled by endpoint template and method:
+
+    *<namespace>_requests_total* counts the requests by response status,
+    'error' when no response was received.
+
+    *<namespace>_request_duration_seconds* is the histogram of the request
+    durations, over *buckets*. Blocking queries are left out, as they last
+    until the data changes or their wait expires.
+
+    *<namespace>_errors_total* counts the exceptions raised, by class, e.g.
+    NotFound, CircuitBreakerOpen or ConnectionError.
+
+    *<namespace>_requests_in_flight* is the number of requests waiting for
+    a response.
+
+    *<namespace>_blocking_wakeups_total* counts the blocking queries which
+    returned, *changed* tells whether the index moved or the wait expired.
+
+    A collector is thread-safe and may be added to several clients, whose
+    requests it then aggregates::
+
+        metrics = consul.metrics.MetricsCollector()
+        c = consul.Consul(hooks=[metrics])
+        ...
+        text = metrics.expose()
+
+    expose returns the metrics in the Prometheus text format, to be served
+    on a /metrics endpoint.
+    """
+
+    def __init__(self, namespace="consul_client", buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # (endpoint, method, status) -> count
+        self._requests = {}
+        # (endpoint, method) -> [count per bucket (the last one is +Inf), sum]
+        self._durations = {}
+        # (endpoint, method, error) -> count
+        self._errors = {}
+        # (endpoint, method) -> count
+        self._in_flight = {}
+        # (endpoint, changed) -> count
+        self._wakeups = {}
+
+    def request_start(self, event):
+        key = (event.endpoint, event.method)
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+
+    def request_end(self, event):
+        key = (event.endpoint, event.method)
+        status = "error" if event.status is None else str(event.status)
+        with self._lock:
+            self._in_flight[key] -= 1
+            self._requests[(*key, status)] = self._requests.get((*key, status), 0) + 1
+            if event.error is not None:
+                error = (*key, type(event.error).__name__)
+                self._errors[error] = self._errors.get(error, 0) + 1
+            if not event.blocking:
+                histogram = self._durations.get(key)
+                if histogram is None:
+                    histogram = self._durations[key] = [[0] * (len(self.buckets) + 1), 0.0]
+                histogram[0][bisect.bisect_left(self.buckets, event.duration)] += 1
+                histogram[1] += event.duration
+            elif event.status is not None:
+                changed = "true" if event.index != str(event.param("index")) else "false"
+                self._wakeups[(event.endpoint, changed)] = self._wakeups.get((event.endpoint, changed), 0) + 1
+
+    def expose(self):
+        """Returns the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            requests = dict(self._requests)
+            durations = {key: (list(counts), total) for key, (counts, total) in self._durations.items()}
+            errors = dict(self._errors)
+            in_flight = dict(self._in_flight)
+            wakeups = dict(self._wakeups)
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {self.namespace}_{name} {help_text}")
+            lines.append(f"# TYPE {self.namespace}_{name} {kind}")
+
+        def sample(name, names, values, value, **extra):
+            lines.append(f"{self.namespace}_{name}{_labels(names, values, **extra)} {_number(value)}")
+
+        family("requests_total", "counter", "Requests sent to the Consul agent.")
+        for key, count in sorted(requests.items()):
+            sample("requests_total", ("endpoint", "method", "status"), key, count)
+        family("request_duration_seconds", "histogram", "Duration of the non blocking requests.")
+        for key, (counts, total) in sorted(durations.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                sample("request_duration_seconds_bucket", ("endpoint", "method"), key, cumulative, le=_number(bound))
+            sample("request_duration_seconds_sum", ("endpoint", "method"), key, total)
+            sample("request_duration_seconds_count", ("endpoint", "method"), key, cumulative)
+        family("errors_total", "counter", "Requests which raised an exception, by exception class.")
+        for key, count in sorted(errors.items()):
+            sample("errors_total", ("endpoint", "method", "error"), key, count)
+        family("requests_in_flight", "gauge", "Requests waiting for a response.")
+        for key, count in sorted(in_flight.items()):
+            sample("requests_in_flight", ("endpoint", "method"), key, count)
+        family("blocking_wakeups_total", "counter", "Blocking queries which returned, whether the index changed.")
+        for key, count in sorted(wakeups.items()):
+            sample("blocking_wakeups_total", ("endpoint", "changed"), key, count)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,174 @@
+import asyncio
+import collections
+import logging
+import random
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+__all__ = ["RetryBudget", "RetryPolicy"]
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of the requests made over a sliding window,
+    so that an unavailable agent doesn't get hit by a storm of retries.
+
+    Retries are allowed while, over the last *window* seconds, they stay
+    below *ratio* times the number of requests plus a reserve of
+    *min_retries_per_second* retries per second for low traffic processes.
+
+    A budget is thread-safe and meant to be shared: every RetryPolicy
+    created without an explicit budget uses the same process-wide one.
+    """
+
+    def __init__(self, ratio=0.1, min_retries_per_second=10, window=10):
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window = window
+        self.rejected = 0
+        self._lock = threading.Lock()
+        # [second, requests, retries]
+        self._buckets = collections.deque()
+
+    def _bucket(self):
+        second = int(time.monotonic())
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        return self._buckets[-1]
+
+    def record_request(self):
+        with self._lock:
+            self._bucket()[1] += 1
+
+    def withdraw(self):
+        """Returns whether a retry is allowed, accounting for it if so"""
+        with self._lock:
+            bucket = self._bucket()
+            requests = sum(b[1] for b in self._buckets)
+            retries = sum(b[2] for b in self._buckets)
+            if retries < self.ratio * requests + self.min_retries_per_second * self.window:
+                bucket[2] += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            self._bucket()
+            return {
+                "requests": sum(b[1] for b in self._buckets),
+                "retries": sum(b[2] for b in self._buckets),
+                "rejected": self.rejected,
+            }
+
+
+_default_budget = RetryBudget()
+
+
+class RetryPolicy:
+    """
+    Retries transient failures with exponential backoff and full jitter.
+
+    *max_attempts* is the total number of attempts, including the first.
+
+    *backoff* is the base delay, in seconds, doubled on every attempt up to
+    *max_backoff*. With *jitter* the actual delay is drawn uniformly
+    between 0 and that value, which prevents synchronized retries when an
+    agent restarts.
+
+    *methods* are the HTTP methods that are safe to resend once the request
+    may have reached the agent. Writes such as a KV check-and-set or a
+    session creation are not idempotent and are only retried when the
+    connection could not be established.
+
+    *statuses* are the response codes considered transient.
+
+    *budget* is the RetryBudget shared with other policies, the
+    process-wide one by default.
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        backoff=0.1,
+        max_backoff=2.0,
+        jitter=True,
+        methods=("GET",),
+        statuses=(500, 502, 503, 504),
+        budget=None,
+    ):
+        assert max_attempts >= 1, "max_attempts must be at least 1"
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.methods = frozenset(methods)
+        self.statuses = frozenset(statuses)
+        self.budget = budget or _default_budget
+
+    def delay(self, attempt):
+        """Returns the number of seconds to wait after the *attempt*-th failure"""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def should_retry(self, method, attempt, status=None, error=None, connect_failed=False):
+        if attempt >= self.max_attempts:
+            return False
+        if error is not None:
+            retryable = connect_failed or method in self.methods
+        else:
+            retryable = status in self.statuses and method in self.methods
+        return retryable and self.budget.withdraw()
+
+    def run(self, method, send, status, errors=(), connect_failed=None):
+        """
+        Calls *send* until it succeeds or retrying isn't allowed anymore.
+
+        *status* extracts the response code from the result of *send*.
+        *errors* are the transient transport exceptions and
+        *connect_failed* tells whether one of them was raised before the
+        request was sent.
+        """
+        self.budget.record_request()
+        attempt = 1
+        while True:
+            try:
+                result = send()
+            except errors as e:
+                if not self.should_retry(
+                    method, attempt, error=e, connect_failed=bool(connect_failed and connect_failed(e))
+                ):
+                    raise
+                log.debug("retrying %s after %r (attempt %d)", method, e, attempt)
+            else:
+                if not self.should_retry(method, attempt, status=status(result)):
+                    return result
+                log.debug("retrying %s after a %d response (attempt %d)", method, status(result), attempt)
+            time.sleep(self.delay(attempt))
+            attempt += 1
+
+    async def arun(self, method, send, status, errors=(), connect_failed=None):
+        """Same as run, for a coroutine function *send*"""
+        self.budget.record_request()
+        attempt = 1
+        while True:
+            try:
+                result = await send()
+            except errors as e:
+                if not self.should_retry(
+                    method, attempt, error=e, connect_failed=bool(connect_failed and connect_failed(e))
+                ):
+                    raise
+                log.debug("retrying %s after %r (attempt %d)", method, e, attempt)
+            else:
+                if not self.should_retry(method, attempt, status=status(result)):
+                    return result
+                log.debug("retrying %s after a %d response (attempt %d)", method, status(result), attempt)
+            await asyncio.sleep(self.delay(attempt))
+            attempt += 1
@@ -1,39 +1,409 @@
+import functools
+import socket
+import threading
+import time
+
 import requests
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import NewConnectionError
 
-from consul import base
+from consul import Timeout, base
 
 __all__ = ["Consul"]
 
 
-class HTTPClient(base.HTTPClient):
+class _PoolStatsMixin:
+    """
+    Keeps track of the connections checked out of an urllib3 pool and of the
+    ones discarded because the pool was already full when they were released.
+    """
+
+    num_in_use = 0
+    num_discarded = 0
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.session = requests.session()
+        self._stats_lock = threading.Lock()
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        with self._stats_lock:
+            self.num_in_use += 1
+        return conn
+
+    def _put_conn(self, conn):
+        with self._stats_lock:
+            self.num_in_use = max(self.num_in_use - 1, 0)
+            if conn is not None and self.pool is not None and self.pool.full():
+                self.num_discarded += 1
+        super()._put_conn(conn)
+
+
+class _StatsHTTPConnectionPool(_PoolStatsMixin, HTTPConnectionPool):
+    pass
+
+
+class _StatsHTTPSConnectionPool(_PoolStatsMixin, HTTPSConnectionPool):
+    pass
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    socket_path = None
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise NewConnectionError(self, f"Failed to connect to {self.socket_path}: {e}") from e
+        return sock
+
+
+class _UnixHTTPConnectionPool(_PoolStatsMixin, HTTPConnectionPool):
+    ConnectionCls = _UnixHTTPConnection
+
+    def __init__(self, host, port=None, socket_path=None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn.socket_path = self.socket_path
+        return conn
+
+
+class PoolStatsAdapter(HTTPAdapter):
+    """requests adapter whose connection pools report usage statistics"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _StatsHTTPConnectionPool,
+            "https": _StatsHTTPSConnectionPool,
+        }
+
+    def pool_stats(self):
+        stats = {"pools": 0, "in_use": 0, "idle": 0, "discarded": 0}
+        # RecentlyUsedContainer does not support iteration, only keys()
+        for key in self.poolmanager.pools.keys():  # noqa: SIM118
+            pool = self.poolmanager.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            stats["pools"] += 1
+            stats["in_use"] += getattr(pool, "num_in_use", 0)
+            stats["idle"] += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            stats["discarded"] += getattr(pool, "num_discarded", 0)
+        return stats
+
+
+class UnixSocketAdapter(PoolStatsAdapter):
+    """requests adapter sending every request to a unix domain socket"""
+
+    def __init__(self, socket_path, **kwargs):
+        self.socket_path = socket_path
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": functools.partial(_UnixHTTPConnectionPool, socket_path=self.socket_path),
+        }
+
+
+def _connect_failed(exc):
+    """Whether the request failed before anything was sent, so that it can be resent anywhere"""
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(exc, requests.exceptions.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+class HTTPClient(base.HTTPClient):
+    def __init__(
+        self,
+        *args,
+        pool_connections=DEFAULT_POOLSIZE,
+        pool_maxsize=DEFAULT_POOLSIZE,
+        pool_block=DEFAULT_POOLBLOCK,
+        keep_alive=True,
+        connect_timeout=None,
+        read_timeout=None,
+        wait_margin=5.0,
+        thread_safe=False,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.wait_margin = wait_margin
+        self.keep_alive = keep_alive
+        self.thread_safe = thread_safe
+        adapter_kwargs = {"pool_connections": pool_connections, "pool_maxsize": pool_maxsize, "pool_block": pool_block}
+        if self.socket_path:
+            self.adapter = UnixSocketAdapter(self.socket_path, **adapter_kwargs)
+        else:
+            self.adapter = PoolStatsAdapter(**adapter_kwargs)
+        # sessions aren't tracked: each thread's goes away with it, and they
+        # only hold the shared adapter, which close() closes
+        self._local = threading.local()
+        self._session = None if thread_safe else self._new_session()
+        if self.endpoints is not None:
+            self.endpoints.start(self._probe)
+
+    def _new_session(self):
+        session = requests.session()
+        # sessions share the adapter, hence the connection pools which are thread-safe
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        if self.compress:
+            session.headers["Accept-Encoding"] = "gzip"
+        return session
+
+    @property
+    def session(self):
+        """
+        The requests session to send requests with. In *thread_safe* mode
+        every thread gets its own session, checked out without locking.
+        """
+        if self._session is not None:
+            return self._session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._new_session()
+        return session
 
     def response(self, response):
-        response.encoding = "utf-8"
-        return base.Response(response.status_code, response.headers, response.text)
+        # hand the raw body over, CB.json parses it without decoding to str
+        body = response.content
+        if self.compress:
+            # requests decodes gzip itself, tell() is the size read from the wire
+            self.record_transfer(response.raw.tell(), len(body), response.headers.get("Content-Encoding"))
+        return base.Response(response.status_code, response.headers, body)
+
+    def _send(self, method, uri, data=None, **kwargs):
+        return self.session.request(method, uri, data=data, verify=self.verify, cert=self.cert, **kwargs)
+
+    def timeout(self, params, connections_timeout=None):
+        """
+        Returns the (connect, read) timeout of a request with *params*.
+
+        *connections_timeout* overrides the read timeout. Otherwise the read
+        timeout of a blocking query is derived from its wait: the agent
+        holds it up to wait plus wait/16 of jitter, *wait_margin* is added
+        on top for the network. Other requests use *read_timeout*.
+        """
+        if connections_timeout:
+            read_timeout = connections_timeout
+        elif base.is_blocking(params):
+            wait = base.wait_seconds(params)
+            read_timeout = wait + wait / 16 + self.wait_margin
+        else:
+            read_timeout = self.read_timeout
+        return (self.connect_timeout, read_timeout)
+
+    def _request(self, callback, method, path, params=None, data=None, headers=None, connections_timeout=None):
+        with self.observe(method, path, params, data) as event:
+            timeout = self.timeout(params, connections_timeout)
+            # keyword arguments of every send of this request
+            options = {"timeout": timeout, "headers": headers}
+            attempt = functools.partial(self._attempt, method, path, params, data, options)
+            if event is not None:
+                attempt = event.counted(attempt)
+            try:
+                if self.retry is None:
+                    response = attempt()
+                else:
+                    response = self.retry.run(
+                        method,
+                        attempt,
+                        status=lambda response: response.status_code,
+                        errors=requests.exceptions.ConnectionError,
+                        connect_failed=_connect_failed,
+                    )
+            except requests.exceptions.ReadTimeout as e:
+                raise Timeout(f"no response to {method} {path} within {timeout[1]}s") from e
+            self.invalidate(method)
+            return self.parse(callback, self.response(response), event)
+
+    def _attempt(self, method, path, params, data, options):
+        if self.endpoints is None:
+            return self._guarded_send(None, method, self.uri(path, params), data, options)
+        if self.hedged(method, params):
+            return self.hedge.run(
+                lambda endpoint: self._endpoint_get(endpoint, path, params, options), self.endpoints.candidates()
+            )
+        return self.failover(
+            method,
+            params,
+            lambda endpoint: self._guarded_send(
+                endpoint.base_uri, method, self.uri(path, params, endpoint.base_uri), data, options
+            ),
+            requests.exceptions.ConnectionError,
+            _connect_failed,
+        )
+
+    def _endpoint_get(self, endpoint, path, params, options):
+        start = time.monotonic()
+        try:
+            response = self._guarded_send(
+                endpoint.base_uri, "GET", self.uri(path, params, endpoint.base_uri), None, options
+            )
+        except requests.exceptions.ConnectionError:
+            self.endpoints.record_failure(endpoint)
+            raise
+        self.endpoints.record_success(endpoint, time.monotonic() - start)
+        return response
+
+    def _guarded_send(self, base_uri, method, uri, data, options):
+        with self.guard(base_uri) as call:
+            response = self._send(method, uri, data=data, **options)
+            call.status = response.status_code
+        return response
+
+    def _probe(self, endpoint):
+        uri = self.uri(self.endpoints.probe_path, base_uri=endpoint.base_uri)
+        response = self._send("GET", uri, timeout=self.endpoints.probe_timeout)
+        return self.endpoints.probe_succeeded(response.status_code, response.content)
+
+    def get(self, callback, path, params=None, headers=None, connections_timeout=None):
+        hit, result, callback, params = self.cache_lookup(callback, path, params, headers)
+        if hit:
+            return result
+        request = functools.partial(
+            self._request, callback, "GET", path, params, headers=headers, connections_timeout=connections_timeout
+        )
+        key = self.flight_key(callback, path, params, headers)
+        return request() if key is None else self.single_flight.do(key, request)
+
+    def put(self, callback, path, params=None, data="", connections_timeout=None):
+        return self._request(callback, "PUT", path, params, data=data, connections_timeout=connections_timeout)
+
+    def delete(self, callback, path, params=None, connections_timeout=None):
+        return self._request(callback, "DELETE", path, params, connections_timeout=connections_timeout)
+
+    def post(self, callback, path, params=None, data="", connections_timeout=None):
+        return self._request(callback, "POST", path, params, data=data, connections_timeout=connections_timeout)
+
+    def pool_stats(self):
+        """
+        Returns a dict describing the state of the connection pools:
 
-    def get(self, callback, path, params=None):
-        uri = self.uri(path, params)
-        return callback(self.response(self.session.get(uri, verify=self.verify, cert=self.cert)))
+        *pools* is the number of per-host pools currently cached.
 
-    def put(self, callback, path, params=None, data=""):
-        uri = self.uri(path, params)
-        return callback(self.response(self.session.put(uri, data=data, verify=self.verify, cert=self.cert)))
+        *in_use* is the number of connections currently checked out.
 
-    def delete(self, callback, path, params=None):
-        uri = self.uri(path, params)
-        return callback(self.response(self.session.delete(uri, verify=self.verify, cert=self.cert)))
+        *idle* is the number of open connections waiting to be reused.
 
-    def post(self, callback, path, params=None, data=""):
-        uri = self.uri(path, params)
-        return callback(self.response(self.session.post(uri, data=data, verify=self.verify, cert=self.cert)))
+        *discarded* is the number of connections closed because the pool
+        was full when they were released. A growing value means
+        *pool_maxsize* is too small for the concurrency of the process.
+        """
+        return self.adapter.pool_stats()
 
     def close(self):
-        pass
+        if self.endpoints is not None:
+            self.endpoints.stop()
+        if self.hedge is not None:
+            self.hedge.close()
+        # every session, of every thread, sends through the adapter and its pools
+        self.adapter.close()
 
 
 class Consul(base.Consul):
+    def __init__(
+        self,
+        *args,
+        pool_connections=DEFAULT_POOLSIZE,
+        pool_maxsize=DEFAULT_POOLSIZE,
+        pool_block=DEFAULT_POOLBLOCK,
+        keep_alive=True,
+        compress=False,
+        connect_timeout=None,
+        read_timeout=None,
+        wait_margin=5.0,
+        thread_safe=False,
+        **kwargs,
+    ):
+        """
+        *pool_connections* is the number of per-host connection pools to
+        cache.
+
+        *pool_maxsize* is the maximum number of connections kept open per
+        host. It should be at least the number of threads sharing this
+        client.
+
+        *pool_block* if set, requests wait for a free connection once
+        *pool_maxsize* connections are in use instead of opening (and later
+        discarding) extra ones.
+
+        *keep_alive* if unset, connections are closed after each request.
+
+        *compress* if set, gzip encoded responses are explicitly requested
+        and the transferred sizes are tracked, see compression_stats. This
+        trades a little CPU for much less network on remote agents.
+
+        *connect_timeout* is the number of seconds to wait for a connection
+        to the agent, None to wait forever.
+
+        *read_timeout* is the number of seconds to wait for a response to a
+        non blocking request, None to wait forever. consul.Timeout is raised
+        when it expires.
+
+        *wait_margin* is added to the longest time the agent may hold a
+        blocking query, wait + wait/16, to get its read timeout. Blocking
+        queries thus never hang on a dead connection, whatever
+        *read_timeout*.
+
+        *thread_safe* if set, every thread sends its requests with its own
+        requests session, as sessions are not documented as thread-safe.
+        The connection pools remain shared, set *pool_maxsize* to the
+        number of threads. Use it when a client is shared by many threads.
+
+        See base.Consul for the remaining arguments.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.compress = compress
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.wait_margin = wait_margin
+        self.thread_safe = thread_safe
+        super().__init__(*args, **kwargs)
+
     def http_connect(self, host, port, scheme, verify=True, cert=None):
-        return HTTPClient(host, port, scheme, verify, cert)
+        return HTTPClient(
+            host,
+            port,
+            scheme,
+            verify=verify,
+            cert=cert,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            keep_alive=self.keep_alive,
+            compress=self.compress,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            wait_margin=self.wait_margin,
+            thread_safe=self.thread_safe,
+            **self.http_options,
+        )
+
+    def pool_stats(self):
+        """Returns the connection pool statistics, see HTTPClient.pool_stats"""
+        return self.http.pool_stats()
+
+    def compression_stats(self):
+        """Returns the transfer counters, see base.HTTPClient.compression_stats"""
+        return self.http.compression_stats()
+
+    def close(self):
+        """Close all opened http connections"""
+        return self.http.close()
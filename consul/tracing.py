@@ -0,0 +1,81 @@
+from consul.hooks import Hook
+
+try:
+    from opentelemetry import context, trace
+except ImportError:  # pragma: no cover
+    context = trace = None
+
+__all__ = ["TracingHook"]
+
+
+def _consistency(event):
+    for mode in ("stale", "consistent"):
+        if event.param(mode) is not None:
+            return mode
+    return "default"
+
+
+class TracingHook(Hook):
+    """
+    Request hook creating an `OpenTelemetry <https://opentelemetry.io>`_
+    client span around every request sent to the agent, so that traces
+    tell the time spent in Consul from the time spent in the application.
+    It requires the opentelemetry-api package (pip install
+    py-consul[opentelemetry])::
+
+        c = consul.Consul(hooks=[consul.tracing.TracingHook()])
+
+    Spans are named after the method and endpoint template, e.g. 'consul
+    GET /v1/health/service/{service}', and carry the datacenter, the
+    consistency mode, the requested and returned index, the response size
+    and the number of retries. Blocking queries, which last until the data
+    changes, are named 'consul GET /v1/kv/{key} blocking' and flagged with
+    the consul.blocking attribute, so they stay out of the latency
+    percentiles of the other requests.
+
+    The span is made current while the request is sent, for the spans of
+    an instrumented HTTP library to nest under it. *tracer* defaults to the
+    tracer of the global tracer provider.
+    """
+
+    def __init__(self, tracer=None):
+        if trace is None:
+            raise ImportError("tracing requires the opentelemetry-api package")
+        self.tracer = tracer or trace.get_tracer("consul")
+
+    def request_start(self, event):
+        name = f"consul {event.method} {event.endpoint}"
+        attributes = {
+            "http.request.method": event.method,
+            "url.path": event.path,
+            "consul.endpoint": event.endpoint,
+            "consul.consistency": _consistency(event),
+            "consul.blocking": event.blocking,
+        }
+        dc = event.param("dc")
+        if dc is not None:
+            attributes["consul.dc"] = dc
+        if event.blocking:
+            name += " blocking"
+            attributes["consul.index"] = str(event.param("index"))
+            attributes["consul.wait"] = event.wait
+        if event.bytes_out:
+            attributes["http.request.body.size"] = event.bytes_out
+        span = self.tracer.start_span(name, kind=trace.SpanKind.CLIENT, attributes=attributes)
+        event.context["span"] = span
+        event.context["token"] = context.attach(trace.set_span_in_context(span))
+
+    def request_end(self, event):
+        span = event.context.pop("span")
+        context.detach(event.context.pop("token"))
+        if event.status is not None:
+            span.set_attribute("http.response.status_code", event.status)
+        if event.index is not None:
+            span.set_attribute("consul.response.index", event.index)
+        if event.bytes_in is not None:
+            span.set_attribute("http.response.body.size", event.bytes_in)
+        span.set_attribute("consul.retry_count", max(0, event.attempts - 1))
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(trace.Status(trace.StatusCode.ERROR, type(event.error).__name__))
+        span.end()
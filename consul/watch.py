@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import threading
+import time
+
+from consul.callback import QueryMeta
+from consul.retry import RetryPolicy
+
+log = logging.getLogger(__name__)
+
+__all__ = ["Watch"]
+
+
+class Watch:
+    """
+    Runs the blocking query of an endpoint over and over, and delivers its
+    result every time the data changed::
+
+        watch = consul.watch.Watch(c.health.service, "web", passing=True)
+        watch.start(lambda index, nodes: update(nodes))
+        ...
+        watch.stop()
+
+    or with consul.aio::
+
+        async for index, nodes in consul.watch.Watch(c.health.service, "web", passing=True):
+            update(nodes)
+
+    *fn* is any endpoint method accepting *index* and *wait* and returning
+    a tuple of index (or consul.callback.QueryMeta) and data, e.g.
+    c.kv.get, c.health.service or c.catalog.nodes. *args* and *kwargs* are
+    passed along on every call. The first query doesn't block, so the
+    current data is delivered right away.
+
+    The index is handled as recommended by Consul: when it goes backwards,
+    e.g. once a snapshot was restored, the next query is sent without one
+    to start over, and an index which isn't above 0 is replaced by 1, so
+    that queries keep blocking. Results whose index didn't change, when
+    the *wait* expired, aren't delivered.
+
+    *min_interval* is the minimum number of seconds between two queries,
+    which caps the rate of updates of frequently changing data.
+
+    Failed queries are logged and retried after an exponential backoff,
+    with jitter, from *backoff* up to *max_backoff* seconds.
+    """
+
+    def __init__(self, fn, *args, wait="5m", min_interval=1.0, backoff=1.0, max_backoff=60.0, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.wait = wait
+        self.min_interval = min_interval
+        self.retry = RetryPolicy(backoff=backoff, max_backoff=max_backoff)
+        # index of the data last delivered, None to query without blocking
+        self.index = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def _name(self):
+        return getattr(self.fn, "__qualname__", repr(self.fn))
+
+    def _call(self):
+        return self.fn(*self.args, index=self.index, wait=self.wait, **self.kwargs)
+
+    def _delay(self, last):
+        """Returns how long to wait before the next query, the previous one being sent at *last*"""
+        return 0.0 if last is None else max(0.0, self.min_interval - (time.monotonic() - last))
+
+    def _update(self, result):
+        """Records the index of *result*, returns whether it is to be delivered"""
+        index = result[0]
+        if isinstance(index, QueryMeta):
+            index = index.index
+        index = int(index or 0)
+        if self.index is not None and index < self.index:
+            log.info("index of %s went backwards (%d < %d), resetting it", self._name, index, self.index)
+            self.index = None
+            return False
+        index = max(index, 1)
+        changed = index != self.index
+        self.index = index
+        return changed
+
+    def _failed(self, attempt, error):
+        delay = self.retry.delay(attempt)
+        log.warning("watch of %s failed (%r), retrying in %.1fs", self._name, error, delay)
+        return delay
+
+    def __iter__(self):
+        """Yields the results of the query as they change, until stop is called"""
+        last = None
+        attempt = 0
+        while not self._stopped.wait(self._delay(last)):
+            last = time.monotonic()
+            try:
+                result = self._call()
+            except Exception as e:  # pylint: disable=broad-except
+                attempt += 1
+                self._stopped.wait(self._failed(attempt, e))
+                continue
+            attempt = 0
+            if self._update(result):
+                yield result
+
+    async def __aiter__(self):
+        """Same as __iter__, for the endpoints of consul.aio"""
+        last = None
+        attempt = 0
+        while not self._stopped.is_set():
+            await asyncio.sleep(self._delay(last))
+            last = time.monotonic()
+            try:
+                result = await self._call()
+            except Exception as e:  # pylint: disable=broad-except
+                attempt += 1
+                await asyncio.sleep(self._failed(attempt, e))
+                continue
+            attempt = 0
+            if self._update(result):
+                yield result
+
+    def run(self, callback):
+        """Calls *callback* with the index and data of every update, until stop is called"""
+        for index, data in self:
+            try:
+                callback(index, data)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("watch callback %r failed", callback)
+
+    def start(self, callback):
+        """Runs the watch from a daemon thread, see run. Returns the watch."""
+        assert self._thread is None, "watch already started"
+        self._thread = threading.Thread(target=self.run, args=(callback,), name="consul-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stops the watch. With a thread, waits for it up to *timeout*
+        seconds, a blocking query in flight lasts until it returns.
+        """
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
@@ -60,6 +60,10 @@ setup(
     install_requires=_read_reqs("requirements.txt"),
     extras_require={
         "asyncio": ["aiohttp"],
+        "httpx": ["httpx[http2]"],
+        "opentelemetry": ["opentelemetry-api"],
+        "orjson": ["orjson"],
+        "ujson": ["ujson"],
     },
     data_files=[(".", ["requirements.txt", "tests-requirements.txt"])],
     packages=find_packages(exclude=["tests*"]),
@@ -1,17 +1,23 @@
 import collections
+import gzip
+import http.server
 import json
 import os
 import shlex
 import socket
+import socketserver
 import subprocess
 import tempfile
+import threading
 import time
+import urllib.parse
 import uuid
 
 import pytest
 import requests
 
 from consul import Consul
+from tests.fake_consul import FakeConsul
 
 collect_ignore = []
 
@@ -113,8 +119,49 @@ def get_consul_version(port):
     return response.json()["Config"]["Version"].strip()
 
 
+# tests of what tests.fake_consul doesn't implement: operator, coordinates,
+# maintenance and members endpoints, agent stats, checks actually run and
+# sessions checked against the node health
+FAKE_CONSUL_UNSUPPORTED = (
+    "tests/api/test_agent.py::TestAgent::test_agent_checks",
+    "tests/api/test_agent.py::TestAgent::test_agent_members",
+    "tests/api/test_agent.py::TestAgent::test_agent_node_maintenance",
+    "tests/api/test_agent.py::TestAgent::test_agent_register_check_no_service_id",
+    "tests/api/test_agent.py::TestAgent::test_agent_register_enable_tag_override",
+    "tests/api/test_agent.py::TestAgent::test_agent_self",
+    "tests/api/test_agent.py::TestAgent::test_agent_service_maintenance",
+    "tests/api/test_coordinates.py",
+    "tests/api/test_health.py::TestHealth::test_health_service",
+    "tests/api/test_health.py::TestHealth::test_health_state",
+    "tests/api/test_operator.py",
+    "tests/api/test_session.py::TestSession::test_session[",
+    "tests/api/test_status.py",
+)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--fake-consul",
+        action="store_true",
+        help="runs the tests needing a Consul agent against tests.fake_consul, for the endpoints it implements",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption("--fake-consul"):
+        return
+    skip = pytest.mark.skip(reason="not implemented by tests.fake_consul")
+    for item in items:
+        if item.nodeid.startswith(FAKE_CONSUL_UNSUPPORTED):
+            item.add_marker(skip)
+
+
 @pytest.fixture(params=CONSUL_BINARIES.keys())
 def consul_instance(request):
+    if request.config.getoption("--fake-consul"):
+        with FakeConsul(version=request.param) as fake:
+            yield fake.port, fake.version
+        return
     p, port = start_consul_instance(binary_name=CONSUL_BINARIES[request.param])
     version = get_consul_version(port)
     yield port, version
@@ -123,6 +170,8 @@ def consul_instance(request):
 
 @pytest.fixture(params=CONSUL_BINARIES.keys())
 def acl_consul_instance(request):
+    if request.config.getoption("--fake-consul"):
+        pytest.skip("ACLs aren't implemented by tests.fake_consul")
     acl_master_token = uuid.uuid4().hex
     p, port = start_consul_instance(binary_name=CONSUL_BINARIES[request.param], acl_master_token=acl_master_token)
     version = get_consul_version(port)
@@ -147,3 +196,141 @@ def consul_obj(consul_port):
     consul_port, consul_version = consul_port
     c = Consul(port=consul_port)
     return c, consul_version
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers any request after *delay* seconds: 503 to the first *failures*
+    ones, then a list of *nodes* nodes, gzip encoded when *gzip* is set and
+    the client accepts it. With *agent_cache*, it answers like an agent
+    serving reads from its cache, echoing the path and Cache-Control.
+    *requests* collects the methods received.
+    """
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    failures = 0
+    nodes = 0
+    gzip = False
+    agent_cache = False
+    requests: list = []
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.requests.append(self.command)
+        time.sleep(self.delay)
+        headers = {"X-Consul-Index": "1"}
+        if len(self.requests) <= self.failures:
+            code, body = 503, b"No cluster leader"
+        elif self.agent_cache:
+            code, body = 200, json.dumps({"path": self.path, "cache_control": self.headers.get("Cache-Control")})
+            headers = self._agent_cache_headers()
+        else:
+            code, body = 200, json.dumps([{"Node": f"node-{i}", "Address": "10.0.0.1"} for i in range(self.nodes)])
+        body = body if isinstance(body, bytes) else body.encode()
+        if self.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_DELETE = do_POST = _reply
+
+    def _agent_cache_headers(self):
+        headers = {
+            "X-Consul-Index": "3",
+            "X-Consul-LastContact": "12",
+            "X-Consul-KnownLeader": "true",
+            "X-Consul-Effective-Consistency": "stale",
+        }
+        if "cached" in urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query, keep_blank_values=True):
+            headers.update({"X-Cache": "HIT", "Age": "7"})
+        return headers
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def _stub_handler(**behaviour):
+    """Returns a _StubHandler with *behaviour* and its own list of requests"""
+    return type("StubHandler", (_StubHandler,), {"requests": [], **behaviour})
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Returns a function serving a _StubHandler with the behaviour given as
+    keyword arguments, which returns its port and the methods it received.
+    """
+    servers = []
+
+    def serve(**behaviour):
+        handler = _stub_handler(**behaviour)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_address[1], handler.requests
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def local_server(stub_server):
+    """The port of a server answering an empty list after 200ms"""
+    return stub_server(delay=0.2)[0]
+
+
+@pytest.fixture
+def gzip_server(stub_server):
+    """The port of a server answering 100 nodes, gzip encoded when accepted"""
+    return stub_server(nodes=100, gzip=True)[0]
+
+
+@pytest.fixture
+def dead_address():
+    """An address nothing listens on"""
+    return f"127.0.0.1:{get_free_ports(1)[0]}"
+
+
+@pytest.fixture
+def flaky_server(stub_server):
+    """The port of a server failing twice before succeeding, and the methods it received"""
+    return stub_server(failures=2)
+
+
+@pytest.fixture
+def agent_cache_server(stub_server):
+    """The port of a server answering like an agent cache, see _StubHandler"""
+    return stub_server(agent_cache=True)[0]
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def unix_server():
+    path = os.path.join(tempfile.mkdtemp(), "consul.sock")
+    server = _UnixHTTPServer(path, _stub_handler(nodes=100, gzip=True))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"unix://{path}"
+    server.shutdown()
+    server.server_close()
+    os.unlink(path)
+
+
+@pytest.fixture
+def fake_consul():
+    """Yields an in-process fake Consul agent, see tests.fake_consul"""
+    fake = FakeConsul()
+    fake.start()
+    yield fake
+    fake.stop()
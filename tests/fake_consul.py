@@ -0,0 +1,836 @@
+"""
+In-process stand-in for a Consul agent, for the tests and the benchmarks to
+run without a Consul binary. It keeps everything in memory and implements
+the subset of the HTTP API the clients use: KV with check-and-set, sessions,
+locks, recurse and keys listings, blocking queries on X-Consul-Index, agent
+services and checks, catalog, health, transactions and events.
+
+Latency can be injected into every response and the store populated with
+synthetic nodes and keys of a given size. To serve it standalone:
+
+    python -m tests.fake_consul --port 8500 --latency 0.001 --nodes 1000
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import json
+import logging
+import threading
+import time
+import uuid
+
+from aiohttp import web
+
+from consul.base import parse_duration, wait_seconds
+
+log = logging.getLogger(__name__)
+
+__all__ = ["FakeConsul"]
+
+
+def _field(obj, name, default=None):
+    """Looks *name* up in a request body, Consul accepts any case for its keys"""
+    name = name.lower()
+    return next((value for key, value in obj.items() if key.lower() == name), default)
+
+
+def _b64(value):
+    return base64.b64encode(value).decode() if value else None
+
+
+def _flag(query, name):
+    return name in query and query[name] not in ("0", "false")
+
+
+class FakeConsul:
+    """
+    A fake Consul agent, which is also the only server of its datacenter.
+
+    *latency* is the number of seconds every response is delayed by.
+    *datacenter*, *node* and *version* are reported by the agent endpoints.
+
+    start serves it from a background thread, so that blocking and asyncio
+    clients can use it alike, and returns its port. The state is then only
+    accessed from that thread: the helpers seeding the store run there,
+    whatever thread calls them, and other changes are to be made with
+    call, e.g. fake.call(fake.kv.clear).
+    """
+
+    def __init__(self, latency=0.0, datacenter="dc1", node="fake-node", version="1.17.3"):
+        self.latency = latency
+        self.datacenter = datacenter
+        self.node = node
+        self.version = version
+        self.index = 1
+        # index of the last write of every table, what blocking queries wait on
+        self.tables = {"kv": 1, "catalog": 1, "sessions": 1, "events": 1}
+        self.kv = {}
+        # deleted keys and the index they were deleted at, for recurse reads to never go backwards
+        self.tombstones = {}
+        self.nodes = {}
+        # (node, service id) -> service
+        self.services = {}
+        # (node, check id) -> check
+        self.checks = {}
+        self.sessions = {}
+        self.events = []
+        self.requests = 0
+        self.app = web.Application(middlewares=[self._middleware])
+        self._routes()
+        self._changed = None
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self.port = None
+        self.add_node(node, "127.0.0.1")
+
+    # serving
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serves the agent from a background thread and returns its port"""
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._start(host, port))
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="fake-consul", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.port
+
+    async def _start(self, host, port):
+        self._changed = asyncio.Event()
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def _routes(self):
+        self.app.add_routes([
+            web.get("/v1/kv/{key:.*}", self.kv_get),
+            web.put("/v1/kv/{key:.*}", self.kv_put),
+            web.delete("/v1/kv/{key:.*}", self.kv_delete),
+            web.put("/v1/txn", self.txn),
+            web.put("/v1/session/create", self.session_create),
+            web.put("/v1/session/destroy/{id}", self.session_destroy),
+            web.put("/v1/session/renew/{id}", self.session_renew),
+            web.get("/v1/session/info/{id}", self.session_info),
+            web.get("/v1/session/node/{node}", self.session_node),
+            web.get("/v1/session/list", self.session_list),
+            web.get("/v1/agent/self", self.agent_self),
+            web.get("/v1/agent/services", self.agent_services),
+            web.get("/v1/agent/service/{id}", self.agent_service),
+            web.get("/v1/agent/checks", self.agent_checks),
+            web.put("/v1/agent/service/register", self.agent_service_register),
+            web.put("/v1/agent/service/deregister/{id}", self.agent_service_deregister),
+            web.put("/v1/agent/check/register", self.agent_check_register),
+            web.put("/v1/agent/check/deregister/{id}", self.agent_check_deregister),
+            web.put("/v1/agent/check/{status:pass|warn|fail}/{id}", self.agent_check_update),
+            web.get("/v1/catalog/datacenters", self.catalog_datacenters),
+            web.get("/v1/catalog/nodes", self.catalog_nodes),
+            web.get("/v1/catalog/node/{node}", self.catalog_node),
+            web.get("/v1/catalog/services", self.catalog_services),
+            web.get("/v1/catalog/service/{service}", self.catalog_service),
+            web.put("/v1/catalog/register", self.catalog_register),
+            web.put("/v1/catalog/deregister", self.catalog_deregister),
+            web.get("/v1/health/service/{service}", self.health_service),
+            web.get("/v1/health/checks/{service}", self.health_checks),
+            web.get("/v1/health/node/{node}", self.health_node),
+            web.get("/v1/health/state/{state}", self.health_state),
+            web.put("/v1/event/fire/{name}", self.event_fire),
+            web.get("/v1/event/list", self.event_list),
+            web.get("/v1/status/leader", self.status_leader),
+            web.get("/v1/status/peers", self.status_peers),
+        ])
+
+    # state
+
+    def call(self, fn, *args):
+        """
+        Calls *fn* with *args* from the thread serving the agent, if it is
+        served, and returns its result.
+        """
+        if self._thread is None or threading.current_thread() is self._thread:
+            return fn(*args)
+
+        async def run():
+            return fn(*args)
+
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+    def _write(self, *tables):
+        """Returns the index of a write to *tables* and wakes the blocking queries up"""
+        self.index += 1
+        for table in tables:
+            self.tables[table] = self.index
+        self._notify()
+        return self.index
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    def add_node(self, name, address, meta=None):
+        self.call(self._add_node, name, address, meta)
+
+    def _add_node(self, name, address, meta):
+        index = self._write("catalog")
+        self.nodes[name] = {
+            "ID": str(uuid.uuid5(uuid.NAMESPACE_DNS, name)),
+            "Node": name,
+            "Address": address,
+            "Datacenter": self.datacenter,
+            "TaggedAddresses": {"lan": address, "wan": address},
+            "Meta": meta or {},
+            "CreateIndex": index,
+            "ModifyIndex": index,
+        }
+        self.checks[(name, "serfHealth")] = self._check(name, "serfHealth", "Serf Health Status", "passing", index)
+
+    def add_service(self, node, name, service_id=None, tags=None, address="", port=0, meta=None):
+        return self.call(self._add_service, node, name, service_id, tags, address, port, meta)
+
+    def _add_service(self, node, name, service_id, tags, address, port, meta):
+        index = self._write("catalog")
+        service_id = service_id or name
+        self.services[(node, service_id)] = {
+            "ID": service_id,
+            "Service": name,
+            "Tags": list(tags or []),
+            "Address": address,
+            "Port": port,
+            "Meta": meta or {},
+            "Weights": {"Passing": 1, "Warning": 1},
+            "EnableTagOverride": False,
+            "Datacenter": self.datacenter,
+            "CreateIndex": index,
+            "ModifyIndex": index,
+        }
+        return service_id
+
+    def _check(self, node, check_id, name, status, index, service=None):
+        return {
+            "Node": node,
+            "CheckID": check_id,
+            "Name": name,
+            "Status": status,
+            "Notes": "",
+            "Output": "",
+            "ServiceID": service["ID"] if service else "",
+            "ServiceName": service["Service"] if service else "",
+            "ServiceTags": service["Tags"] if service else [],
+            "CreateIndex": index,
+            "ModifyIndex": index,
+        }
+
+    def put_key(self, key, value=b"", flags=0):
+        return self.call(self._put_key, key, value, flags)
+
+    def _put_key(self, key, value, flags):
+        index = self._write("kv")
+        old = self.kv.get(key)
+        self.kv[key] = {
+            "LockIndex": old["LockIndex"] if old else 0,
+            "Key": key,
+            "Flags": flags,
+            "Value": value or None,
+            "CreateIndex": old["CreateIndex"] if old else index,
+            "ModifyIndex": index,
+            **({"Session": old["Session"]} if old and "Session" in old else {}),
+        }
+        self.tombstones.pop(key, None)
+        return self.kv[key]
+
+    def populate(self, nodes=0, services_per_node=1, keys=0, value_size=32, prefix="bench/"):
+        """
+        Adds *nodes* synthetic nodes, each providing *services_per_node*
+        services named service-0, service-1..., and *keys* keys under
+        *prefix* holding *value_size* bytes each.
+        """
+        self.call(self._populate, nodes, services_per_node, keys, value_size, prefix)
+
+    def _populate(self, nodes, services_per_node, keys, value_size, prefix):
+        for i in range(nodes):
+            name = f"node-{i}"
+            self.add_node(name, f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", meta={"rack": f"r{i % 40}"})
+            for j in range(services_per_node):
+                self.add_service(name, f"service-{j}", f"service-{j}-{i}", tags=["v1"], port=8000 + j)
+        value = b"x" * value_size
+        for i in range(keys):
+            self.put_key(f"{prefix}{i:08d}", value)
+
+    # responses
+
+    def _json(self, data, index=None, status=200):
+        headers = {"X-Consul-KnownLeader": "true", "X-Consul-LastContact": "0"}
+        if index is not None:
+            headers["X-Consul-Index"] = str(index)
+        body = b"" if data is None else json.dumps(data).encode()
+        return web.Response(body=body, status=status, headers=headers, content_type="application/json")
+
+    async def _blocking(self, request, table, read):
+        """
+        Answers a read, blocking until the index of *table* passes the
+        requested one or the wait expired. *read* returns the data and its
+        index, None to use the table's.
+        """
+        requested = int(request.query.get("index") or 0)
+        deadline = time.monotonic() + wait_seconds(dict(request.query)) if requested else None
+        while True:
+            data, index = read()
+            index = index or self.tables[table]
+            remaining = deadline - time.monotonic() if requested else 0
+            if index > requested or remaining <= 0:
+                return data, index
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._changed.wait(), remaining)
+
+    # kv
+
+    def _kv_read(self, key, query):
+        if not (_flag(query, "recurse") or "keys" in query):
+            entry = self.kv.get(key)
+            return ([entry] if entry else None), (entry["ModifyIndex"] if entry else None)
+        entries = [self.kv[k] for k in sorted(self.kv) if k.startswith(key)]
+        index = max(
+            [e["ModifyIndex"] for e in entries] + [i for k, i in self.tombstones.items() if k.startswith(key)],
+            default=None,
+        )
+        if not entries:
+            return None, index
+        if "keys" not in query:
+            return entries, index
+        separator = query.get("separator")
+        keys = []
+        for entry in entries:
+            k = entry["Key"]
+            if separator and separator in k[len(key) :]:
+                k = k[: k.index(separator, len(key)) + len(separator)]
+            if not keys or keys[-1] != k:
+                keys.append(k)
+        return keys, index
+
+    async def kv_get(self, request):
+        key = request.match_info["key"]
+        data, index = await self._blocking(request, "kv", lambda: self._kv_read(key, request.query))
+        if data is None:
+            return self._json(None, index, status=404)
+        if "keys" not in request.query:
+            data = [{**entry, "Value": _b64(entry["Value"])} for entry in data]
+        return self._json(data, index)
+
+    @staticmethod
+    def _kv_refused(entry, query):
+        """Whether a write with *query* must be refused, given the current *entry* of the key"""
+        if "cas" in query and (entry["ModifyIndex"] if entry else 0) != int(query["cas"]):
+            return True
+        if "acquire" in query:
+            return entry is not None and entry.get("Session") not in (None, query["acquire"])
+        if "release" in query:
+            return entry is None or entry.get("Session") != query["release"]
+        return False
+
+    async def kv_put(self, request):
+        key = request.match_info["key"]
+        query = request.query
+        value = await request.read()
+        entry = self.kv.get(key)
+        session = query.get("acquire")
+        if session is not None and session not in self.sessions:
+            return web.Response(status=500, text=f"invalid session {session!r}")
+        if self._kv_refused(entry, query):
+            return self._json(False)
+        entry = self.put_key(key, value, int(query.get("flags", entry["Flags"] if entry else 0)))
+        if session is not None and entry.get("Session") != session:
+            entry["LockIndex"] += 1
+            entry["Session"] = session
+        elif "release" in query:
+            del entry["Session"]
+        return self._json(True)
+
+    def _delete_key(self, key, index):
+        del self.kv[key]
+        self.tombstones[key] = index
+
+    async def kv_delete(self, request):
+        key = request.match_info["key"]
+        query = request.query
+        if _flag(query, "recurse"):
+            keys = [k for k in self.kv if k.startswith(key)]
+        else:
+            keys = [key] if key in self.kv else []
+            if "cas" in query and (not keys or self.kv[key]["ModifyIndex"] != int(query["cas"])):
+                return self._json(False)
+        index = self._write("kv")
+        for k in keys:
+            self._delete_key(k, index)
+        return self._json(True)
+
+    # txn
+
+    def _txn_op(self, op, kv):
+        """
+        Applies a KV operation of a transaction to *kv*, at the index of the
+        next write. Returns its result, raises ValueError if it failed.
+        """
+        verb = _field(op, "Verb")
+        key = _field(op, "Key", "")
+        if verb in ("set", "cas", "lock", "unlock"):
+            return self._txn_set(verb, op, key, kv)
+        if verb in ("get", "check-index", "check-session", "check-not-exists"):
+            return self._txn_check(verb, op, key, kv)
+        if verb == "get-tree":
+            return [e for k, e in sorted(kv.items()) if k.startswith(key)]
+        if verb in ("delete", "delete-cas", "delete-tree"):
+            return self._txn_delete(verb, op, key, kv)
+        raise ValueError(f"unknown KV verb {verb!r}")
+
+    def _txn_set(self, verb, op, key, kv):
+        entry = kv.get(key)
+        if verb == "cas" and (entry["ModifyIndex"] if entry else 0) != int(_field(op, "Index", 0)):
+            raise ValueError(f'failed to set key "{key}", index is stale')
+        session = _field(op, "Session")
+        held = entry.get("Session") if entry else None
+        if verb in ("lock", "unlock"):
+            if session not in self.sessions:
+                raise ValueError(f'invalid session "{session}"')
+            if (verb == "lock" and held not in (None, session)) or (verb == "unlock" and held != session):
+                raise ValueError(f'failed to {verb} key "{key}", lock is held by another session')
+        new = {
+            "LockIndex": (entry["LockIndex"] if entry else 0) + (verb == "lock" and held != session),
+            "Key": key,
+            "Flags": _field(op, "Flags", 0),
+            "Value": base64.b64decode(_field(op, "Value") or "") or None,
+            "CreateIndex": entry["CreateIndex"] if entry else self.index + 1,
+            "ModifyIndex": self.index + 1,
+        }
+        if verb == "lock" or (held and verb != "unlock"):
+            new["Session"] = session if verb == "lock" else held
+        kv[key] = new
+        return new
+
+    @staticmethod
+    def _txn_check(verb, op, key, kv):
+        entry = kv.get(key)
+        if verb == "check-not-exists":
+            if entry is not None:
+                raise ValueError(f'key "{key}" exists')
+            return None
+        if entry is None:
+            raise ValueError(f'key "{key}" does not exist')
+        if verb == "check-index" and entry["ModifyIndex"] != int(_field(op, "Index", 0)):
+            raise ValueError(f"current modify index {entry['ModifyIndex']} != {_field(op, 'Index')}")
+        if verb == "check-session" and entry.get("Session") != _field(op, "Session"):
+            raise ValueError(f'key "{key}" is not locked by session "{_field(op, "Session")}"')
+        return entry
+
+    @staticmethod
+    def _txn_delete(verb, op, key, kv):
+        entry = kv.get(key)
+        if verb == "delete-cas" and (entry is None or entry["ModifyIndex"] != int(_field(op, "Index", 0))):
+            raise ValueError(f'failed to delete key "{key}", index is stale')
+        keys = [k for k in kv if k.startswith(key)] if verb == "delete-tree" else [key]
+        for k in keys:
+            kv.pop(k, None)
+
+    async def txn(self, request):
+        ops = json.loads(await request.read() or b"[]")
+        # operations apply to a copy, swapped in only if all of them succeed
+        kv = dict(self.kv)
+        results, errors = [], []
+        for i, op in enumerate(ops):
+            try:
+                result = self._txn_op(_field(op, "KV"), kv)
+            except ValueError as e:
+                errors.append({"OpIndex": i, "What": str(e)})
+                continue
+            for entry in result if isinstance(result, list) else [result] if result else []:
+                results.append({"KV": {**entry, "Value": _b64(entry["Value"])}})
+        if errors:
+            return self._json({"Results": None, "Errors": errors}, status=409)
+        index = self._write("kv")
+        for key in set(self.kv) - set(kv):
+            self.tombstones[key] = index
+        self.kv = kv
+        return self._json({"Results": results or None, "Errors": None}, index)
+
+    # sessions
+
+    async def session_create(self, request):
+        body = await request.read()
+        spec = json.loads(body) if body.strip() else {}
+        index = self._write("sessions")
+        lock_delay = parse_duration(_field(spec, "LockDelay", "15s"))
+        session = {
+            "ID": str(uuid.uuid4()),
+            "Name": _field(spec, "Name", ""),
+            "Node": _field(spec, "Node", self.node),
+            "NodeChecks": _field(spec, "Checks", ["serfHealth"]),
+            "LockDelay": int(lock_delay * 1e9),
+            "Behavior": _field(spec, "Behavior", "release"),
+            "TTL": _field(spec, "TTL", ""),
+            "CreateIndex": index,
+            "ModifyIndex": index,
+        }
+        self.sessions[session["ID"]] = session
+        return self._json({"ID": session["ID"]}, index)
+
+    async def session_destroy(self, request):
+        session = self.sessions.pop(request.match_info["id"], None)
+        index = self._write("sessions", "kv")
+        if session is not None:
+            for key, entry in list(self.kv.items()):
+                if entry.get("Session") == session["ID"]:
+                    if session["Behavior"] == "delete":
+                        self._delete_key(key, index)
+                    else:
+                        self.kv[key] = {k: v for k, v in entry.items() if k != "Session"}
+                        self.kv[key]["ModifyIndex"] = index
+        return self._json(True)
+
+    async def session_renew(self, request):
+        session = self.sessions.get(request.match_info["id"])
+        if session is None:
+            return web.Response(status=404, text=f"Session id '{request.match_info['id']}' not found")
+        return self._json([session], self.tables["sessions"])
+
+    async def _sessions(self, request, selected):
+        data, index = await self._blocking(
+            request, "sessions", lambda: ([s for s in self.sessions.values() if selected(s)], None)
+        )
+        return self._json(data, index)
+
+    async def session_info(self, request):
+        return await self._sessions(request, lambda s: s["ID"] == request.match_info["id"])
+
+    async def session_node(self, request):
+        return await self._sessions(request, lambda s: s["Node"] == request.match_info["node"])
+
+    async def session_list(self, request):
+        return await self._sessions(request, lambda s: True)
+
+    # agent
+
+    async def agent_self(self, _request):
+        member = {"Name": self.node, "Addr": "127.0.0.1", "Port": 8301, "Status": 1}
+        config = {"Datacenter": self.datacenter, "NodeName": self.node, "Version": self.version}
+        return self._json({"Config": config, "Member": member})
+
+    def _agent_service(self, service):
+        return {k: v for k, v in service.items() if k not in ("CreateIndex", "ModifyIndex")}
+
+    async def agent_services(self, _request):
+        services = {sid: self._agent_service(s) for (node, sid), s in self.services.items() if node == self.node}
+        return self._json(services)
+
+    async def agent_service(self, request):
+        service = self.services.get((self.node, request.match_info["id"]))
+        if service is None:
+            return web.Response(status=404, text="unknown service ID")
+        return self._json(self._agent_service(service), service["ModifyIndex"])
+
+    async def agent_checks(self, _request):
+        checks = {cid: c for (node, cid), c in self.checks.items() if node == self.node and cid != "serfHealth"}
+        return self._json(checks)
+
+    def _register_check(self, node, spec, service=None):
+        check_id = _field(spec, "CheckID") or _field(spec, "ID") or _field(spec, "Name")
+        if service and not check_id:
+            check_id = f"service:{service['ID']}"
+        # checks aren't run, TTL checks start critical like the real ones
+        status = _field(spec, "Status") or ("critical" if _field(spec, "TTL") else "passing")
+        name = _field(spec, "Name") or (f"Service '{service['Service']}' check" if service else check_id)
+        check = self._check(node, check_id, name, status, self._write("catalog"), service)
+        check["Notes"] = _field(spec, "Notes", "")
+        self.checks[(node, check_id)] = check
+
+    async def agent_service_register(self, request):
+        spec = json.loads(await request.read())
+        service_id = self.add_service(
+            self.node,
+            _field(spec, "Name"),
+            _field(spec, "ID"),
+            _field(spec, "Tags"),
+            _field(spec, "Address", ""),
+            _field(spec, "Port", 0),
+            _field(spec, "Meta"),
+        )
+        service = self.services[(self.node, service_id)]
+        checks = _field(spec, "Checks") or ([_field(spec, "Check")] if _field(spec, "Check") else [])
+        for i, check in enumerate(checks):
+            if len(checks) > 1 and not (_field(check, "CheckID") or _field(check, "ID")):
+                check["CheckID"] = f"service:{service_id}:{i + 1}"
+            self._register_check(self.node, check, service)
+        return self._json(None)
+
+    async def agent_service_deregister(self, request):
+        service_id = request.match_info["id"]
+        if self.services.pop((self.node, service_id), None) is None:
+            return web.Response(status=404, text=f"Unknown service ID {service_id!r}")
+        for key in [key for key, check in self.checks.items() if check["ServiceID"] == service_id]:
+            del self.checks[key]
+        self._write("catalog")
+        return self._json(None)
+
+    async def agent_check_register(self, request):
+        spec = json.loads(await request.read())
+        service = self.services.get((self.node, _field(spec, "ServiceID")))
+        self._register_check(self.node, spec, service)
+        return self._json(None)
+
+    async def agent_check_deregister(self, request):
+        if self.checks.pop((self.node, request.match_info["id"]), None) is None:
+            return web.Response(status=404, text="Unknown check ID")
+        self._write("catalog")
+        return self._json(None)
+
+    async def agent_check_update(self, request):
+        check = self.checks.get((self.node, request.match_info["id"]))
+        if check is None:
+            return web.Response(status=404, text="Unknown check ID")
+        statuses = {"pass": "passing", "warn": "warning", "fail": "critical"}
+        check.update(
+            Status=statuses[request.match_info["status"]],
+            Output=request.query.get("note", ""),
+            ModifyIndex=self._write("catalog"),
+        )
+        return self._json(None)
+
+    # catalog
+
+    async def catalog_datacenters(self, _request):
+        return self._json([self.datacenter])
+
+    async def catalog_nodes(self, request):
+        data, index = await self._blocking(request, "catalog", lambda: (list(self.nodes.values()), None))
+        return self._json(data, index)
+
+    def _catalog_service(self, node, service):
+        node = self.nodes[node]
+        return {
+            "ID": node["ID"],
+            "Node": node["Node"],
+            "Address": node["Address"],
+            "Datacenter": self.datacenter,
+            "TaggedAddresses": node["TaggedAddresses"],
+            "NodeMeta": node["Meta"],
+            "ServiceID": service["ID"],
+            "ServiceName": service["Service"],
+            "ServiceTags": service["Tags"],
+            "ServiceAddress": service["Address"],
+            "ServicePort": service["Port"],
+            "ServiceMeta": service["Meta"],
+            "ServiceEnableTagOverride": False,
+            "CreateIndex": service["CreateIndex"],
+            "ModifyIndex": service["ModifyIndex"],
+        }
+
+    async def catalog_node(self, request):
+        def read():
+            node = self.nodes.get(request.match_info["node"])
+            if node is None:
+                return None, None
+            services = {sid: s for (n, sid), s in self.services.items() if n == node["Node"]}
+            return {"Node": node, "Services": services}, None
+
+        data, index = await self._blocking(request, "catalog", read)
+        return self._json(data, index)
+
+    async def catalog_services(self, request):
+        def read():
+            services = {}
+            for service in self.services.values():
+                tags = services.setdefault(service["Service"], [])
+                tags.extend(tag for tag in service["Tags"] if tag not in tags)
+            return services, None
+
+        data, index = await self._blocking(request, "catalog", read)
+        return self._json(data, index)
+
+    async def catalog_service(self, request):
+        name = request.match_info["service"]
+        tags = request.query.getall("tag", [])
+
+        def read():
+            return [
+                self._catalog_service(node, s)
+                for (node, _), s in self.services.items()
+                if s["Service"] == name and all(tag in s["Tags"] for tag in tags)
+            ], None
+
+        data, index = await self._blocking(request, "catalog", read)
+        return self._json(data, index)
+
+    async def catalog_register(self, request):
+        spec = json.loads(await request.read())
+        node = _field(spec, "Node")
+        if node not in self.nodes:
+            self.add_node(node, _field(spec, "Address"), _field(spec, "NodeMeta"))
+        service = _field(spec, "Service")
+        if service:
+            self.add_service(
+                node,
+                _field(service, "Service"),
+                _field(service, "ID"),
+                _field(service, "Tags"),
+                _field(service, "Address", ""),
+                _field(service, "Port", 0),
+                _field(service, "Meta"),
+            )
+        check = _field(spec, "Check")
+        if check:
+            self._register_check(node, check, self.services.get((node, _field(check, "ServiceID"))))
+        return self._json(True)
+
+    async def catalog_deregister(self, request):
+        spec = json.loads(await request.read())
+        node = _field(spec, "Node")
+        service_id = _field(spec, "ServiceID")
+        check_id = _field(spec, "CheckID")
+        if service_id:
+            self.services.pop((node, service_id), None)
+        elif check_id:
+            self.checks.pop((node, check_id), None)
+        else:
+            self.nodes.pop(node, None)
+            for key in [key for key in self.services if key[0] == node]:
+                del self.services[key]
+            for key in [key for key in self.checks if key[0] == node]:
+                del self.checks[key]
+        self._write("catalog")
+        return self._json(True)
+
+    # health
+
+    def _node_checks(self, node, service_id):
+        return [c for (n, _), c in self.checks.items() if n == node and c["ServiceID"] in ("", service_id)]
+
+    async def health_service(self, request):
+        name = request.match_info["service"]
+        tags = request.query.getall("tag", [])
+        passing = _flag(request.query, "passing")
+
+        def read():
+            entries = []
+            for (node, service_id), service in self.services.items():
+                if service["Service"] != name or not all(tag in service["Tags"] for tag in tags):
+                    continue
+                checks = self._node_checks(node, service_id)
+                if passing and any(check["Status"] != "passing" for check in checks):
+                    continue
+                entries.append({"Node": self.nodes[node], "Service": service, "Checks": checks})
+            return entries, None
+
+        data, index = await self._blocking(request, "catalog", read)
+        return self._json(data, index)
+
+    async def health_checks(self, request):
+        name = request.match_info["service"]
+        data, index = await self._blocking(
+            request, "catalog", lambda: ([c for c in self.checks.values() if c["ServiceName"] == name], None)
+        )
+        return self._json(data, index)
+
+    async def health_node(self, request):
+        node = request.match_info["node"]
+        data, index = await self._blocking(
+            request, "catalog", lambda: ([c for (n, _), c in self.checks.items() if n == node], None)
+        )
+        return self._json(data, index)
+
+    async def health_state(self, request):
+        state = request.match_info["state"]
+        data, index = await self._blocking(
+            request,
+            "catalog",
+            lambda: ([c for c in self.checks.values() if state in ("any", c["Status"])], None),
+        )
+        return self._json(data, index)
+
+    # events
+
+    async def event_fire(self, request):
+        payload = await request.read()
+        query = request.query
+        event = {
+            "ID": str(uuid.uuid4()),
+            "Name": request.match_info["name"],
+            "Payload": _b64(payload),
+            "NodeFilter": query.get("node", ""),
+            "ServiceFilter": query.get("service", ""),
+            "TagFilter": query.get("tag", ""),
+            "Version": 1,
+            "LTime": len(self.events) + 1,
+        }
+        self.events.append(event)
+        self._write("events")
+        return self._json(event)
+
+    async def event_list(self, request):
+        name = request.query.get("name")
+        data, index = await self._blocking(
+            request, "events", lambda: ([e for e in self.events if name is None or e["Name"] == name], None)
+        )
+        return self._json(data, index)
+
+    # status
+
+    async def status_leader(self, _request):
+        return self._json("127.0.0.1:8300")
+
+    async def status_peers(self, _request):
+        return self._json(["127.0.0.1:8300"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves a fake Consul agent")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--nodes", type=int, default=0, help="synthetic nodes to register")
+    parser.add_argument("--services-per-node", type=int, default=1)
+    parser.add_argument("--keys", type=int, default=0, help="synthetic keys to store under bench/")
+    parser.add_argument("--value-size", type=int, default=32, help="size of the synthetic values, in bytes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    fake = FakeConsul(latency=args.latency)
+    fake.populate(args.nodes, args.services_per_node, args.keys, args.value_size)
+    port = fake.start(args.host, args.port)
+    log.info("fake consul agent listening on %s:%d", args.host, port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,40 @@ async def consul_acl_obj(acl_consul):
     await consul.close()
 
 
+class TestAsyncioHTTPClient:
+    async def test_compression(self, gzip_server):
+        c = consul.aio.Consul(port=gzip_server, compress=True)
+        _index, nodes = await c.catalog.nodes()
+        assert len(nodes) == 100
+        stats = c.compression_stats()
+        assert stats["compressed"] == 1
+        assert 0 < stats["wire_bytes"] < stats["body_bytes"]
+        await c.close()
+
+    async def test_compression_skips_probes(self, gzip_server):
+        c = consul.aio.Consul(addresses=[f"127.0.0.1:{gzip_server}"] * 2, probe_interval=0, compress=True)
+        for endpoint in c.http.endpoints.endpoints:
+            await c.http._probe(endpoint)  # pylint: disable=protected-access
+        await c.catalog.nodes()
+        assert c.compression_stats()["responses"] == 1
+        await c.close()
+
+    async def test_unix_socket(self, unix_server):
+        c = consul.aio.Consul(host=unix_server)
+        index, nodes = await c.catalog.nodes()
+        assert index == "1"
+        assert len(nodes) == 100
+        await c.close()
+
+    async def test_agent_cache(self, agent_cache_server):
+        c = consul.aio.Consul(port=agent_cache_server)
+        meta, body = await c.catalog.services(cached=True, max_age=5, meta=True)
+        assert meta.cache_hit is True
+        assert meta.age == 7
+        assert body["cache_control"] == "max-age=5"
+        await c.close()
+
+
 class TestAsyncioConsul:
     async def test_kv(self, consul_obj):
         c, _consul_version = consul_obj
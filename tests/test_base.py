@@ -5,6 +5,7 @@ import pytest
 
 import consul
 import consul.check
+import consul.std
 
 Request = collections.namedtuple("Request", ["method", "path", "params", "data"])
 
@@ -66,6 +67,29 @@ def _should_support_meta(c):
     )
 
 
+class TestAddress:
+    def test_unix_socket(self):
+        http = consul.std.HTTPClient(host="unix:///var/run/consul.sock", port=None)
+        assert http.socket_path == "/var/run/consul.sock"
+        assert http.uri("/v1/kv/foo", params={"index": 1}) == "http://localhost/v1/kv/foo?index=1"
+
+    def test_env_unix_socket(self, monkeypatch):
+        monkeypatch.setenv("CONSUL_HTTP_ADDR", "unix:///var/run/consul.sock")
+        c = consul.std.Consul()
+        assert c.http.socket_path == "/var/run/consul.sock"
+
+    def test_env_host_port(self, monkeypatch):
+        monkeypatch.setenv("CONSUL_HTTP_ADDR", "10.0.0.1:8501")
+        c = consul.std.Consul()
+        assert c.http.base_uri == "http://10.0.0.1:8501"
+        assert c.http.socket_path is None
+
+    def test_env_invalid(self, monkeypatch):
+        monkeypatch.setenv("CONSUL_HTTP_ADDR", "http://10.0.0.1:8501")
+        with pytest.raises(consul.ConsulException):
+            consul.std.Consul()
+
+
 class TestIndex:
     """
     Tests read requests that should support blocking on an index
@@ -299,3 +323,22 @@ class TestChecks:
     def test_ttl_check(self):
         ch = consul.check.Check.ttl("1m")
         assert ch == {"ttl": "1m"}
+
+
+class TestAgentCache:
+    def test_disabled(self):
+        params = []
+        assert consul.base.agent_cache(params) is None
+        assert not params
+
+    def test_cached(self):
+        params = []
+        assert consul.base.agent_cache(params, cached=True) is None
+        assert params == [("cached", "")]
+        assert consul.base.agent_cache([], True, max_age=30, stale_if_error=60) == {
+            "Cache-Control": "max-age=30, stale-if-error=60"
+        }
+
+    def test_options_require_cached(self):
+        with pytest.raises(AssertionError):
+            consul.base.agent_cache([], max_age=30)
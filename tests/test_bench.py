@@ -0,0 +1,67 @@
+import argparse
+import json
+
+import pytest
+
+from consul import bench
+
+
+def test_parse_mix():
+    assert bench.parse_mix("kv-read=8, kv-write=2,health") == [("kv-read", 8.0), ("kv-write", 2.0), ("health", 1.0)]
+    with pytest.raises(argparse.ArgumentTypeError):
+        bench.parse_mix("kv-scan=1")
+
+
+def test_percentile():
+    values = list(range(1, 1001))
+    assert [bench.percentile(values, q) for q in bench.PERCENTILES] == [500, 950, 990, 999]
+    assert bench.percentile([7], 99.9) == 7
+    assert bench.percentile([], 50) is None
+
+
+def test_schedule():
+    schedule = bench.Schedule(1.0, rate=10)
+    due = [schedule.next() for _ in range(11)]
+    assert due[-1] is None
+    assert due[9] - due[0] == pytest.approx(0.9)
+
+
+def test_recorder():
+    recorder = bench.Recorder()
+    for ms in range(1, 101):
+        recorder.record("kv-read", ms / 1000)
+    recorder.record("kv-read", 0.5, ConnectionError())
+    recorder.record("watch", 5.0)
+    summary = recorder.summary(elapsed=2.0)
+    assert summary["throughput"] == 50
+    read = summary["operations"]["kv-read"]
+    assert (read["count"], read["errors"], read["p50"], read["p99"], read["max"]) == (
+        100,
+        {"ConnectionError": 1},
+        50,
+        99,
+        100,
+    )
+    assert "kv-read" in bench.report(summary)
+
+
+@pytest.mark.parametrize("client", ["std", "aio"])
+def test_run(fake_consul, capsys, client):
+    bench.main([
+        f"--port={fake_consul.port}",
+        f"--client={client}",
+        "--mix=kv-read=4,kv-write=1,recurse=1,health=1,heartbeat=1",
+        "--duration=0.5",
+        "--rate=200",
+        "--concurrency=4",
+        "--watchers=1",
+        "--watch-wait=100ms",
+        "--keys=20",
+        "--json",
+    ])
+    summary = json.loads(capsys.readouterr().out)
+    operations = summary["operations"]
+    assert set(operations) >= {"kv-read", "kv-write"}
+    assert not any(op["errors"] for op in operations.values())
+    assert sum(op["count"] for name, op in operations.items() if name != "watch") == pytest.approx(100, abs=2)
+    assert not fake_consul.call(lambda: [key for key in fake_consul.kv if key.startswith("bench/")])
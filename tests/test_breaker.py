@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+import consul
+import consul.aio
+import consul.std
+from consul.breaker import CircuitBreaker, guard
+
+
+class TestCircuitBreaker:
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker(failure_rate=0.5, minimum_requests=4)
+        for ok in (True, False, True):
+            with guard(breaker) as call:
+                call.status = 200 if ok else 503
+        assert breaker.state == "closed"
+        with pytest.raises(ConnectionError), guard(breaker):
+            raise ConnectionError
+        assert breaker.state == "open"
+        with pytest.raises(consul.CircuitBreakerOpen) as excinfo, guard(breaker):
+            pass
+        assert 0 < excinfo.value.retry_after <= 30
+        assert breaker.stats() == {"state": "open", "requests": 0, "failures": 0, "rejected": 1, "opened": 1}
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(minimum_requests=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.state == "half-open"
+        breaker.acquire()
+        # only one trial request at a time
+        with pytest.raises(consul.CircuitBreakerOpen):
+            breaker.acquire()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        time.sleep(0.06)
+        with guard(breaker) as call:
+            call.status = 200
+        assert breaker.state == "closed"
+
+    def test_release(self):
+        breaker = CircuitBreaker(minimum_requests=1, reset_timeout=0)
+        breaker.record_failure()
+        with pytest.raises(KeyboardInterrupt), guard(breaker):
+            raise KeyboardInterrupt
+        assert breaker.state == "half-open"
+        breaker.acquire()
+
+    def test_no_breaker(self):
+        with guard(None) as call:
+            call.status = 500
+
+
+class TestTransports:
+    def test_std_fails_fast(self, dead_address):
+        host, port = dead_address.split(":")
+        c = consul.std.Consul(host=host, port=port, breaker={"minimum_requests": 2})
+        for _ in range(2):
+            with pytest.raises(consul.std.requests.exceptions.ConnectionError):
+                c.catalog.nodes()
+        with pytest.raises(consul.CircuitBreakerOpen):
+            c.catalog.nodes()
+        assert c.breaker_stats()[f"http://{dead_address}"]["state"] == "open"
+
+    def test_std_recovers(self, flaky_server):
+        port, seen = flaky_server
+        c = consul.std.Consul(port=port, breaker={"minimum_requests": 2, "reset_timeout": 0.05})
+        for _ in range(2):
+            with pytest.raises(consul.ConsulException):
+                c.catalog.nodes()
+        with pytest.raises(consul.CircuitBreakerOpen):
+            c.catalog.nodes()
+        assert len(seen) == 2
+        time.sleep(0.06)
+        assert c.catalog.nodes() == ("1", [])
+        assert c.breaker_stats()[f"http://127.0.0.1:{port}"]["state"] == "closed"
+
+    def test_failover_skips_open_agents(self, dead_address, gzip_server):
+        c = consul.std.Consul(
+            addresses=[dead_address, f"127.0.0.1:{gzip_server}"], probe_interval=0, breaker={"minimum_requests": 1}
+        )
+        for _ in range(3):
+            _, nodes = c.catalog.nodes()
+            assert len(nodes) == 100
+        stats = c.breaker_stats()
+        assert stats[f"http://{dead_address}"]["state"] == "open"
+        assert stats[f"http://127.0.0.1:{gzip_server}"]["state"] == "closed"
+        c.close()
+
+    async def test_aio_fails_fast(self, dead_address):
+        host, port = dead_address.split(":")
+        c = consul.aio.Consul(host=host, port=port, breaker=True)
+        for _ in range(5):
+            with pytest.raises(consul.aio.aiohttp.ClientConnectionError):
+                await c.catalog.nodes()
+        with pytest.raises(consul.CircuitBreakerOpen):
+            await c.catalog.nodes()
+        await c.close()
@@ -0,0 +1,112 @@
+import concurrent.futures
+import time
+
+import consul.aio
+import consul.std
+from consul.cache import ResponseCache
+
+
+class TestResponseCache:
+    def test_ttl(self):
+        cache = ResponseCache(ttl=0.05)
+        assert cache.get("a") == (None, False)
+        cache.put("a", "result", "1", 10)
+        entry, fresh = cache.get("a")
+        assert fresh
+        assert entry.result == "result"
+        time.sleep(0.06)
+        assert cache.get("a")[1] is False
+        assert cache.stats() == {
+            "hits": 1,
+            "misses": 2,
+            "revalidated": 0,
+            "evictions": 0,
+            "entries": 1,
+            "bytes": 10,
+        }
+
+    def test_clear_voids_reads_in_flight(self):
+        cache = ResponseCache()
+        generation = cache.generation()
+        cache.clear()
+        cache.put("a", 1, "1", 10, generation=generation)
+        assert cache.get("a") == (None, False)
+        cache.put("a", 1, "1", 10, generation=cache.generation())
+        assert cache.get("a")[1]
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2, max_bytes=100)
+        cache.put("a", 1, "1", 10)
+        cache.put("b", 2, "1", 10)
+        cache.get("a")
+        cache.put("c", 3, "1", 10)
+        assert cache.get("b") == (None, False)
+        cache.put("d", 4, "1", 95)
+        assert cache.get("a") == (None, False)
+        assert cache.get("c") == (None, False)
+        assert cache.stats()["entries"] == 1
+        assert cache.stats()["evictions"] == 3
+        # too big to be cached at all
+        cache.put("e", 5, "1", 101)
+        assert cache.get("e") == (None, False)
+
+
+class TestTransports:
+    def test_std(self, fake_consul):
+        fake_consul.put_key("foo", b"bar")
+        c = consul.std.Consul(port=fake_consul.port, cache=ResponseCache(ttl=0.05))
+        index, value = c.kv.get("foo")
+        assert index == str(fake_consul.index)
+        sent = fake_consul.requests
+        assert c.kv.get("foo")[1] is value
+        assert fake_consul.requests == sent
+
+        time.sleep(0.06)
+        # revalidated with a short blocking query, the cached result is reused
+        assert c.kv.get("foo")[1] is value
+        assert fake_consul.requests == sent + 1
+        assert c.cache_stats()["revalidated"] == 1
+
+        # writes clear the cache
+        c.kv.put("foo", "baz")
+        index, value = c.kv.get("foo")
+        assert index == str(fake_consul.index)
+        assert value["Value"] == b"baz"
+
+        # user blocking queries bypass the cache
+        sent = fake_consul.requests
+        c.kv.get("foo", index=1)
+        assert fake_consul.requests == sent + 1
+        assert c.cache_stats()["hits"] == 1
+
+    def test_write_during_read(self, fake_consul):
+        c = consul.std.Consul(port=fake_consul.port, cache=True)
+        fake_consul.latency = 0.3
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            read = executor.submit(c.kv.get, "foo")
+            while not fake_consul.requests:
+                time.sleep(0.001)
+            # the write completes, and clears the cache, while the read is in flight
+            fake_consul.latency = 0
+            c.kv.put("foo", "bar")
+            read.result()
+        # the answer of the read wasn't cached, it may predate the write
+        sent = fake_consul.requests
+        assert c.kv.get("foo")[1]["Value"] == b"bar"
+        assert fake_consul.requests == sent + 1
+
+    def test_tokens_are_cached_apart(self, fake_consul):
+        c = consul.std.Consul(port=fake_consul.port, cache=True)
+        c.kv.get("foo", token="a")
+        c.kv.get("foo", token="b")
+        c.kv.get("foo", token="a")
+        assert fake_consul.requests == 2
+
+    async def test_aio(self, fake_consul):
+        c = consul.aio.Consul(port=fake_consul.port, cache=True)
+        fake_consul.put_key("foo", b"bar")
+        _, value = await c.kv.get("foo")
+        assert (await c.kv.get("foo"))[1] is value
+        assert fake_consul.requests == 1
+        assert c.cache_stats()["hits"] == 1
+        await c.close()
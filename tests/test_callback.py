@@ -2,7 +2,7 @@ import pytest
 
 import consul
 from consul.base import Response
-from consul.callback import CB
+from consul.callback import CB, QueryMeta
 from consul.exceptions import ACLDisabled, ACLPermissionDenied, BadRequest, ClientError, NotFound
 
 
@@ -48,3 +48,33 @@ class TestCB:
     def test_status_5xx_raises_error(self, response):
         with pytest.raises(consul.base.ConsulException):
             CB._status(response)
+
+    @pytest.mark.parametrize(
+        "body", [b'[{"Key": "foo"}]', bytearray(b'[{"Key": "foo"}]'), memoryview(b'[{"Key": "foo"}]')]
+    )
+    def test_json_parses_raw_body(self, body):
+        response = Response(200, {"X-Consul-Index": "5"}, body)
+        assert CB.json(index=True)(response) == ("5", [{"Key": "foo"}])
+
+    def test_status_error_message_is_decoded(self):
+        response = Response(500, None, b"rpc error")
+        with pytest.raises(consul.base.ConsulException, match="^500 rpc error$"):
+            CB._status(response)
+
+    def test_json_meta(self):
+        response = Response(200, {"X-Consul-Index": "5", "X-Cache": "MISS"}, b"[]")
+        assert CB.json(index=True, meta=True)(response) == (QueryMeta("5", cache_hit=False), [])
+        response = Response(200, {"X-Consul-Index": "5", "X-Cache": "HIT", "Age": "12"}, b"[]")
+        assert CB.json(meta=True)(response) == (QueryMeta("5", cache_hit=True, age=12), [])
+        response = Response(
+            200,
+            {
+                "X-Consul-Index": "7",
+                "X-Consul-LastContact": "250",
+                "X-Consul-KnownLeader": "false",
+                "X-Consul-Effective-Consistency": "stale",
+            },
+            b"[]",
+        )
+        assert CB.json(meta=True)(response)[0] == QueryMeta("7", 0.25, False, "stale")
+        assert CB.json(meta=True)(Response(200, {}, b"[]"))[0] == QueryMeta()
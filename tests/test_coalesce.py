@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import consul.aio
+import consul.std
+from consul.callback import CB
+from consul.coalesce import SingleFlight
+
+
+class TestSingleFlight:
+    def test_do(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def work():
+            started.set()
+            release.wait()
+            return object()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(flight.do, "key", work)
+            started.wait()
+            followers = [executor.submit(flight.do, "key", work) for _ in range(3)]
+            while flight.stats()["saved"] < 3:
+                time.sleep(0.001)
+            release.set()
+            results = {id(f.result()) for f in [leader, *followers]}
+        assert len(results) == 1
+        assert flight.stats() == {"calls": 1, "saved": 3}
+        # nothing is cached once the call is done
+        flight.do("key", lambda: None)
+        assert flight.stats()["calls"] == 2
+
+    def test_do_shares_exceptions(self):
+        flight = SingleFlight()
+        with pytest.raises(KeyError):
+            flight.do("key", lambda: {}["missing"])
+        assert flight.do("key", lambda: 1) == 1
+
+    async def test_ado(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return []
+
+        waiters = [asyncio.ensure_future(flight.ado("key", work)) for _ in range(4)]
+        await asyncio.sleep(0)
+        # cancelling a waiter leaves the call running for the others
+        waiters[0].cancel()
+        results = await asyncio.gather(*waiters[1:])
+        assert all(result is results[0] for result in results)
+        assert len(calls) == 1
+        assert flight.stats() == {"calls": 1, "saved": 3}
+
+    def test_callback_keys(self):
+        assert CB.json(index=True).key == CB.json(index=True).key
+        assert CB.json(index=True).key != CB.json(index=True, one=True).key
+
+
+class TestTransports:
+    def test_std(self, local_server):
+        c = consul.std.Consul(port=local_server, coalesce=True)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: c.catalog.nodes(), range(8)))
+            assert results == [("1", [])] * 8
+            stats = c.coalesce_stats()
+            assert stats["calls"] + stats["saved"] == 8
+            assert stats["saved"] > 0
+            # different tokens are different requests
+            list(executor.map(lambda i: c.catalog.nodes(token=str(i)), range(2)))
+        assert c.coalesce_stats()["calls"] == stats["calls"] + 2
+        # no stats without coalescing
+        assert not consul.std.Consul(port=local_server).coalesce_stats()
+
+    async def test_aio(self, local_server):
+        c = consul.aio.Consul(port=local_server, coalesce=True)
+        results = await asyncio.gather(*[c.catalog.nodes() for _ in range(8)])
+        assert results == [("1", [])] * 8
+        assert c.coalesce_stats() == {"calls": 1, "saved": 7}
+        await c.close()
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import consul.codec
+from consul.base import Response
+from consul.callback import CB
+from tests.test_base import Consul
+
+
+def _available_codecs():
+    codecs = []
+    for codec_class in consul.codec.CODECS.values():
+        try:
+            codecs.append(codec_class())
+        except ImportError:
+            continue
+    return codecs
+
+
+class TestCodec:
+    def test_get_codec_default(self):
+        codec = consul.codec.get_codec()
+        expected = consul.codec.OrjsonCodec if consul.codec.orjson is not None else consul.codec.JSONCodec
+        assert isinstance(codec, expected)
+
+    def test_get_codec_by_name(self):
+        assert isinstance(consul.codec.get_codec("json"), consul.codec.JSONCodec)
+        with pytest.raises(AssertionError):
+            consul.codec.get_codec("yaml")
+
+    def test_get_codec_custom(self):
+        custom = consul.codec.JSONCodec()
+        assert consul.codec.get_codec(custom) is custom
+
+    @pytest.mark.parametrize("codec", _available_codecs(), ids=lambda codec: codec.name)
+    @pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview])
+    def test_loads_raw_body(self, codec, wrap):
+        body = wrap(b'[{"Key": "foo/bar", "Flags": 18446744073709551615}]')
+        assert codec.loads(body) == [{"Key": "foo/bar", "Flags": 18446744073709551615}]
+
+    @pytest.mark.parametrize("codec", _available_codecs(), ids=lambda codec: codec.name)
+    def test_dumps_roundtrip(self, codec):
+        payload = {"Name": "foo", "Meta": {"net": 1}, "Tags": ["a/b"], "Port": 8000}
+        assert json.loads(codec.dumps(payload)) == payload
+
+    @pytest.mark.parametrize("codec", _available_codecs(), ids=lambda codec: codec.name)
+    def test_callback_uses_codec(self, codec):
+        response = Response(200, {"X-Consul-Index": "3"}, b'[{"Value": "YmFy"}]')
+        assert CB.json(index=True, one=True, decode="Value", codec=codec)(response) == ("3", {"Value": b"bar"})
+
+    def test_consul_codec_used_for_request_bodies(self):
+        class Codec(consul.codec.JSONCodec):
+            def dumps(self, obj):
+                return b"custom:" + super().dumps(obj).encode()
+
+        c = Consul(codec=Codec())
+        assert (
+            c.txn.put([{"KV": {"Verb": "get", "Key": "foo"}}]).data == b'custom:[{"KV": {"Verb": "get", "Key": "foo"}}]'
+        )
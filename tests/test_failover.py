@@ -0,0 +1,102 @@
+import pytest
+
+import consul.aio
+import consul.std
+from consul.failover import EndpointSet
+
+
+class TestEndpointSet:
+    def test_candidates_prefer_healthy_and_fast(self):
+        endpoints = EndpointSet(["http://a", "http://b", "http://c"])
+        a, b, c = endpoints.endpoints
+        endpoints.record_success(a, 0.3)
+        endpoints.record_success(b, 0.1)
+        endpoints.record_failure(c)
+        for _ in range(20):
+            candidates = endpoints.candidates()
+            assert set(candidates[:2]) == {a, b}
+            assert candidates[2] is c
+
+    def test_power_of_two_choices_spreads_load(self):
+        endpoints = EndpointSet([f"http://{i}" for i in range(4)])
+        for i, endpoint in enumerate(endpoints.endpoints):
+            endpoints.record_success(endpoint, 0.1 * (i + 1))
+        firsts = {endpoints.candidates()[0].base_uri for _ in range(200)}
+        # the slowest endpoint never wins a pair, every other one does
+        assert firsts == {"http://0", "http://1", "http://2"}
+
+    def test_latency_ewma(self):
+        endpoints = EndpointSet(["http://a"], alpha=0.5)
+        endpoint = endpoints.endpoints[0]
+        endpoints.record_success(endpoint, 1.0)
+        endpoints.record_success(endpoint, 0.0)
+        endpoints.record_success(endpoint, None)
+        assert endpoint.latency == 0.5
+
+    def test_probe(self):
+        endpoints = EndpointSet(["http://a", "http://b", "http://c"])
+        results = {"http://a": True, "http://b": False}
+
+        def send(endpoint):
+            return results[endpoint.base_uri]
+
+        endpoints.probe(send)
+        assert [e["healthy"] for e in endpoints.stats()] == [True, False, False]
+        assert endpoints.endpoints[0].latency is not None
+
+    @pytest.mark.parametrize(
+        ("code", "body", "expected"),
+        [(200, b'"10.0.0.1:8300"', True), (200, b'""', False), (500, b"boom", False)],
+    )
+    def test_probe_succeeded(self, code, body, expected):
+        assert EndpointSet.probe_succeeded(code, body) is expected
+
+
+class TestFailover:
+    def test_std(self, dead_address, gzip_server):
+        c = consul.std.Consul(addresses=[dead_address, f"127.0.0.1:{gzip_server}"], probe_interval=0)
+        for _ in range(3):
+            _, nodes = c.catalog.nodes()
+            assert len(nodes) == 100
+        dead, alive = c.http.endpoints.endpoints
+        assert not dead.healthy
+        assert alive.healthy
+        assert alive.latency is not None
+        c.close()
+
+    def test_std_all_down(self, dead_address):
+        c = consul.std.Consul(addresses=[dead_address], probe_interval=0)
+        with pytest.raises(consul.std.requests.exceptions.ConnectionError):
+            c.catalog.nodes()
+
+    async def test_aio(self, dead_address, gzip_server):
+        c = consul.aio.Consul(addresses=[dead_address, f"127.0.0.1:{gzip_server}"], probe_interval=0)
+        for _ in range(3):
+            _, nodes = await c.catalog.nodes()
+            assert len(nodes) == 100
+        assert [e["healthy"] for e in c.http.endpoints.stats()] == [False, True]
+        await c.close()
+
+    def test_write_safety(self):
+        c = consul.std.Consul(addresses=["127.0.0.1:1", "127.0.0.1:2"], probe_interval=0)
+        sent = []
+
+        def send(endpoint):
+            # the first agent asked fails
+            sent.append(endpoint.base_uri)
+            if len(sent) == 1:
+                raise ConnectionResetError
+            return endpoint.base_uri
+
+        def failover(method, connect_failed):
+            sent.clear()
+            return c.http.failover(method, None, send, ConnectionError, connect_failed)
+
+        # reads go to the next agent whatever the error
+        assert failover("GET", lambda e: False) == sent[1] != sent[0]
+        # writes only if they weren't sent
+        with pytest.raises(ConnectionResetError):
+            failover("PUT", lambda e: False)
+        assert len(sent) == 1
+        assert failover("PUT", lambda e: True) == sent[1]
+        c.close()
@@ -0,0 +1,139 @@
+import base64
+import threading
+import time
+
+import pytest
+
+import consul
+import consul.aio
+import consul.check
+import consul.std
+
+
+@pytest.fixture
+def c(fake_consul):
+    return consul.std.Consul(port=fake_consul.port)
+
+
+class TestKV:
+    def test_get_put_delete(self, c):
+        _, data = c.kv.get("foo")
+        assert data is None
+        assert c.kv.put("foo", "bar") is True
+        _, data = c.kv.get("foo")
+        assert data["Value"] == b"bar"
+        assert c.kv.put("empty", "") is True
+        assert c.kv.get("empty")[1]["Value"] is None
+        assert c.kv.delete("foo") is True
+        assert c.kv.get("foo")[1] is None
+
+    def test_cas_and_flags(self, c):
+        assert c.kv.put("foo", "bar", cas=50) is False
+        assert c.kv.put("foo", "bar", cas=0, flags=50) is True
+        assert c.kv.put("foo", "bar2", cas=0) is False
+        _, data = c.kv.get("foo")
+        assert data["Flags"] == 50
+        assert c.kv.put("foo", "bar2", cas=data["ModifyIndex"] - 1) is False
+        assert c.kv.put("foo", "bar2", cas=data["ModifyIndex"]) is True
+        assert c.kv.delete("foo", cas=data["ModifyIndex"]) is False
+        assert c.kv.get("foo")[1]["Value"] == b"bar2"
+
+    def test_recurse_and_keys(self, c):
+        for key in ("foo/", "foo/bar1", "foo/bar2", "foo/bar3/baz", "other"):
+            c.kv.put(key, None)
+        _, data = c.kv.get("foo/", recurse=True)
+        assert [d["Key"] for d in data] == ["foo/", "foo/bar1", "foo/bar2", "foo/bar3/baz"]
+        _, keys = c.kv.get("foo/", keys=True, separator="/")
+        assert keys == ["foo/", "foo/bar1", "foo/bar2", "foo/bar3/"]
+        index, _ = c.kv.get("foo/", recurse=True)
+        c.kv.delete("foo/", recurse=True)
+        deleted_index, data = c.kv.get("foo/", recurse=True)
+        assert data is None
+        assert int(deleted_index) > int(index)
+
+    def test_blocking(self, fake_consul, c):
+        index, _ = c.kv.get("foo")
+        threading.Timer(0.1, c.kv.put, ("foo", "bar")).start()
+        start = time.monotonic()
+        new_index, data = c.kv.get("foo", index=index)
+        assert data["Value"] == b"bar"
+        assert int(new_index) > int(index)
+        assert time.monotonic() - start >= 0.1
+        assert c.kv.get("foo", index=new_index, wait="100ms")[0] == new_index
+        assert fake_consul.requests == 4
+
+    def test_locks(self, c):
+        s1 = c.session.create()
+        s2 = c.session.create(behavior="delete")
+        assert c.kv.put("lock", "1", acquire=s1) is True
+        assert c.kv.put("lock", "2", acquire=s2) is False
+        assert c.kv.put("lock", "2", release=s2) is False
+        _, data = c.kv.get("lock")
+        assert (data["Session"], data["LockIndex"]) == (s1, 1)
+        assert c.kv.put("lock", "2", release=s1) is True
+        assert c.kv.put("lock", "3", acquire=s2) is True
+        c.session.destroy(s2)
+        assert c.kv.get("lock")[1] is None
+        c.session.destroy(s1)
+        assert c.session.list()[1] == []
+
+
+class TestTxn:
+    def test_txn(self, c):
+        def op(verb, key, value="", index=0):
+            return {
+                "KV": {"Verb": verb, "Key": key, "Value": base64.b64encode(value.encode()).decode(), "Index": index}
+            }
+
+        result = c.txn.put([op("set", "a", "1"), op("set", "b", "2"), op("get", "a")])
+        assert [r["KV"]["Key"] for r in result["Results"]] == ["a", "b", "a"]
+        with pytest.raises(consul.ConsulException):
+            c.txn.put([op("set", "c", "3"), op("cas", "a", "4", index=1)])
+        assert c.kv.get("c")[1] is None
+        assert c.kv.get("a")[1]["Value"] == b"1"
+
+
+class TestServices:
+    def test_register_and_health(self, c):
+        c.agent.service.register("web", service_id="web1", tags=["v1"], port=80, check=consul.check.Check.ttl("10s"))
+        assert c.agent.services()["web1"]["Port"] == 80
+        assert c.catalog.services()[1] == {"web": ["v1"]}
+        assert c.health.service("web", passing=True)[1] == []
+        assert c.agent.check.ttl_pass("service:web1") is True
+        _, nodes = c.health.service("web", passing=True, tag="v1")
+        assert [check["CheckID"] for check in nodes[0]["Checks"]] == ["serfHealth", "service:web1"]
+        assert c.health.state("passing")[1][1]["Status"] == "passing"
+        assert c.agent.service.deregister("web1") is True
+        assert c.catalog.service("web")[1] == []
+
+    def test_populate(self, fake_consul, c):
+        fake_consul.populate(nodes=10, services_per_node=2, keys=5, value_size=100)
+        assert len(c.catalog.nodes()[1]) == 11
+        assert len(c.health.service("service-1")[1]) == 10
+        _, data = c.kv.get("bench/", recurse=True)
+        assert [len(d["Value"]) for d in data] == [100] * 5
+
+
+class TestEvents:
+    def test_events(self, c):
+        assert c.event.fire("deploy", "v2", service="web")
+        _, events = c.event.list(name="deploy")
+        assert events[0]["Payload"] == b"v2"
+        assert events[0]["ServiceFilter"] == "web"
+        assert c.event.list(name="other")[1] == []
+
+
+async def test_aio(fake_consul):
+    c = consul.aio.Consul(port=fake_consul.port)
+    assert await c.kv.put("foo", "bar") is True
+    _, data = await c.kv.get("foo")
+    assert data["Value"] == b"bar"
+    assert await c.status.leader() == "127.0.0.1:8300"
+    await c.close()
+
+
+def test_latency(fake_consul, c):
+    fake_consul.latency = 0.05
+    start = time.monotonic()
+    c.status.peers()
+    assert time.monotonic() - start >= 0.05
@@ -0,0 +1,183 @@
+import concurrent.futures
+import contextvars
+import gc
+import threading
+import time
+
+import pytest
+import requests
+
+import consul.aio
+import consul.std
+from consul.failover import Endpoint
+from consul.hedge import HedgePolicy
+from tests.fake_consul import FakeConsul
+
+
+def prefer(c, address):
+    # the lowest latency agent is always asked first
+    for endpoint in c.http.endpoints.endpoints:
+        endpoint.latency = 0.001 if endpoint.base_uri.endswith(address) else 0.01
+
+
+class TestHedgePolicy:
+    def test_delay(self):
+        policy = HedgePolicy(
+            percentile=90, min_delay=0.002, max_delay=0.5, initial_delay=0.1, samples=10, min_samples=10
+        )
+        assert policy.delay() == 0.1
+        for i in range(1, 11):
+            policy.record_latency(i / 100)
+        assert policy.delay() == pytest.approx(0.09)
+        for _ in range(10):
+            policy.record_latency(0.001)
+        assert policy.delay() == 0.002
+        policy.record_latency(10)
+        policy.percentile = 100
+        assert policy.delay() == 0.5
+
+    def test_run(self):
+        policy = HedgePolicy(initial_delay=0.01)
+        slow, fast = Endpoint("http://slow"), Endpoint("http://fast")
+
+        def send(endpoint):
+            if endpoint is slow:
+                time.sleep(0.1)
+            return endpoint.base_uri
+
+        assert policy.run(send, [fast, slow]) == "http://fast"
+        assert policy.run(send, [slow, fast]) == "http://fast"
+        stats = policy.stats()
+        assert stats["requests"] == 2
+        assert stats["hedged"] == 1
+        assert stats["hedge_rate"] == 0.5
+        assert stats["win_rate"] == 1.0
+        policy.close()
+
+    def test_run_saturated(self):
+        policy = HedgePolicy(initial_delay=0.01, max_workers=1)
+        slow, fast = Endpoint("http://slow"), Endpoint("http://fast")
+        assert policy._hedges.acquire(blocking=False)  # pylint: disable=protected-access,consider-using-with
+
+        def send(endpoint):
+            if endpoint is slow:
+                time.sleep(0.05)
+            return endpoint.base_uri
+
+        # no hedge slot left, the primary is waited for
+        assert policy.run(send, [slow, fast]) == "http://slow"
+        stats = policy.stats()
+        assert (stats["hedged"], stats["skipped"]) == (0, 1)
+        policy.close()
+
+    def test_run_from_caller(self):
+        policy = HedgePolicy(initial_delay=0, max_concurrency=0)
+        # no thread left for the first request, the read is sent as is
+        assert policy.run(lambda _: threading.current_thread(), [Endpoint("http://a"), Endpoint("http://b")]) is (
+            threading.current_thread()
+        )
+        stats = policy.stats()
+        assert (stats["hedged"], stats["skipped"]) == (0, 1)
+
+    def test_run_context(self):
+        policy = HedgePolicy(initial_delay=0.01)
+        slow, fast = Endpoint("http://slow"), Endpoint("http://fast")
+        var = contextvars.ContextVar("var")
+        var.set("caller")
+        seen = []
+
+        def send(endpoint):
+            seen.append(var.get(None))
+            if endpoint is slow:
+                time.sleep(0.05)
+            return endpoint.base_uri
+
+        assert policy.run(send, [slow, fast]) == "http://fast"
+        assert seen == ["caller", "caller"]
+        policy.close()
+
+    def test_run_primary_fails(self):
+        policy = HedgePolicy(initial_delay=10)
+        broken, ok = Endpoint("http://broken"), Endpoint("http://ok")
+
+        def send(endpoint):
+            if endpoint is broken:
+                raise ConnectionError
+            return endpoint.base_uri
+
+        # the hedge goes out right away, without waiting for the delay
+        assert policy.run(send, [broken, ok]) == "http://ok"
+        with pytest.raises(ConnectionError):
+            policy.run(send, [broken, broken])
+        policy.close()
+
+
+class TestTransports:
+    def test_std_concurrent(self):
+        # with agents equally fast, many threads reading at once mustn't
+        # take their own queueing for latency and hedge everything
+        with FakeConsul(latency=0.02) as a, FakeConsul(latency=0.02) as b:
+            c = consul.std.Consul(
+                addresses=[f"127.0.0.1:{a.port}", f"127.0.0.1:{b.port}"],
+                probe_interval=0,
+                hedge=HedgePolicy(),
+            )
+            with concurrent.futures.ThreadPoolExecutor(max_workers=32) as pool:
+                for _ in pool.map(lambda _: c.catalog.nodes(consistency="stale"), range(640)):
+                    pass
+            stats = c.hedge_stats()
+            c.close()
+        assert stats["requests"] == 640
+        assert stats["hedge_rate"] < 0.2
+
+    def test_std(self, local_server, gzip_server):
+        c = consul.std.Consul(
+            addresses=[f"127.0.0.1:{local_server}", f"127.0.0.1:{gzip_server}"],
+            probe_interval=0,
+            hedge=HedgePolicy(initial_delay=0.02),
+        )
+        prefer(c, str(local_server))
+        _, nodes = c.catalog.nodes(consistency="stale")
+        assert len(nodes) == 100
+        prefer(c, str(local_server))
+        # only stale reads are hedged
+        assert c.catalog.nodes() == ("1", [])
+        stats = c.hedge_stats()
+        assert stats["requests"] == 1
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        c.close()
+
+    def test_std_threads(self, fake_consul):
+        def counts():
+            gc.collect()
+            return threading.active_count(), sum(isinstance(o, requests.Session) for o in gc.get_objects())
+
+        with FakeConsul() as other:
+            threads, sessions = counts()
+            c = consul.std.Consul(
+                addresses=[f"127.0.0.1:{fake_consul.port}", f"127.0.0.1:{other.port}"],
+                probe_interval=0,
+                thread_safe=True,
+                hedge=HedgePolicy(initial_delay=0, min_delay=0, max_delay=0, max_workers=2, max_concurrency=2),
+            )
+            for _ in range(200):
+                c.catalog.nodes(consistency="stale")
+            # the threads sending the requests, and their sessions, are reused
+            after = counts()
+            assert after[0] <= threads + 4
+            assert after[1] <= sessions + 5
+            assert c.hedge_stats()["hedged"] > 100
+            c.close()
+
+    async def test_aio(self, local_server, gzip_server):
+        c = consul.aio.Consul(
+            addresses=[f"127.0.0.1:{local_server}", f"127.0.0.1:{gzip_server}"],
+            probe_interval=0,
+            hedge=HedgePolicy(initial_delay=0.02),
+        )
+        prefer(c, str(local_server))
+        _, nodes = await c.catalog.nodes(consistency="stale")
+        assert len(nodes) == 100
+        assert c.hedge_stats()["hedge_wins"] == 1
+        await c.close()
@@ -0,0 +1,139 @@
+import pytest
+import requests
+
+import consul.aio
+import consul.std
+from consul.base import HTTPClient, Response
+from consul.callback import CB
+from consul.hooks import Hook, RequestEvent, endpoint_template
+from consul.retry import RetryBudget, RetryPolicy
+
+
+class Recorder(Hook):
+    def __init__(self):
+        self.calls = []
+
+    def request_start(self, event):
+        self.calls.append(("start", event))
+
+    def request_end(self, event):
+        self.calls.append(("end", event))
+
+    @property
+    def events(self):
+        return [event for name, event in self.calls if name == "end"]
+
+
+class Broken(Hook):
+    def request_start(self, event):
+        raise RuntimeError("broken hook")
+
+
+@pytest.mark.parametrize(
+    ("path", "template"),
+    [
+        ("/v1/kv/", "/v1/kv/{key}"),
+        ("/v1/kv/foo/bar", "/v1/kv/{key}"),
+        ("/v1/health/service/web", "/v1/health/service/{service}"),
+        ("/v1/agent/service/register", "/v1/agent/service/register"),
+        ("/v1/agent/service/web-1", "/v1/agent/service/{service_id}"),
+        ("/v1/agent/service/deregister/web-1", "/v1/agent/service/deregister/{service_id}"),
+        ("/v1/acl/token/abc/clone", "/v1/acl/token/{accessor_id}/clone"),
+        ("/v1/query/geo/execute", "/v1/query/{query}/execute"),
+        ("/v1/status/leader", "/v1/status/leader"),
+    ],
+)
+def test_endpoint_template(path, template):
+    assert endpoint_template(path) == template
+
+
+class TestRequestEvent:
+    def test_bytes_out(self):
+        assert RequestEvent("PUT", "/v1/kv/foo", data="é").bytes_out == 2
+        assert RequestEvent("PUT", "/v1/kv/foo", data=b"abc").bytes_out == 3
+        assert RequestEvent("GET", "/v1/kv/foo").bytes_out == 0
+
+    def test_param(self):
+        assert RequestEvent("GET", "/v1/kv/foo", [("dc", "dc1"), ("stale", "1")]).param("dc") == "dc1"
+        assert RequestEvent("GET", "/v1/kv/foo", {"index": "3"}).param("index") == "3"
+        assert RequestEvent("GET", "/v1/kv/foo").param("dc", "default") == "default"
+
+    def test_counted(self):
+        event = RequestEvent("GET", "/v1/kv/foo")
+        attempt = event.counted(lambda: "sent")
+        assert attempt() == "sent"
+        attempt()
+        assert event.attempts == 2
+
+    def test_parse(self):
+        event = RequestEvent("GET", "/v1/catalog/nodes")
+        response = Response(200, {"X-Consul-Index": "4"}, b"[1, 2]")
+        assert HTTPClient.parse(CB.json(postprocess=len), response, event) == 2
+        assert (event.status, event.index, event.bytes_in) == (200, "4", 6)
+        assert event.network_time > 0
+        assert event.decode_time > 0
+        assert event.postprocess_time > 0
+        event = RequestEvent("PUT", "/v1/kv/foo")
+        assert HTTPClient.parse(CB.bool(), Response(200, {}, b"true"), event) is True
+        assert event.decode_time > 0
+        assert event.postprocess_time is None
+
+
+class TestStd:
+    def test_read(self, agent_cache_server):
+        c = consul.std.Consul(port=agent_cache_server)
+        recorder = c.add_hook(Recorder())
+        c.health.service("web", index="2", wait="5s")
+        assert [name for name, _ in recorder.calls] == ["start", "end"]
+        event = recorder.events[0]
+        assert event.method == "GET"
+        assert event.endpoint == "/v1/health/service/{service}"
+        assert event.blocking
+        assert event.wait == 5
+        assert event.params == [("index", "2"), ("wait", "5s")]
+        assert event.status == 200
+        assert event.index == "3"
+        assert event.bytes_in > 0
+        assert event.attempts == 1
+        assert event.error is None
+        assert event.network_time > 0
+        assert event.decode_time > 0
+        assert event.postprocess_time is None
+        assert event.duration >= event.network_time + event.decode_time
+
+    def test_retried(self, flaky_server):
+        port, _ = flaky_server
+        retry = RetryPolicy(backoff=0, budget=RetryBudget())
+        c = consul.std.Consul(port=port, retry=retry, hooks=[Recorder()])
+        c.catalog.nodes()
+        assert c.http.hooks[0].events[0].attempts == 3
+
+    def test_error(self, dead_address):
+        c = consul.std.Consul(addresses=[dead_address], probe_interval=0, hooks=[Recorder()])
+        with pytest.raises(requests.exceptions.ConnectionError):
+            c.kv.get("foo")
+        event = c.http.hooks[0].events[0]
+        assert isinstance(event.error, requests.exceptions.ConnectionError)
+        assert event.status is None
+        c.close()
+
+    def test_broken_hook(self, agent_cache_server):
+        c = consul.std.Consul(port=agent_cache_server, hooks=[Broken()])
+        recorder = c.add_hook(Recorder())
+        assert c.catalog.nodes()[0] == "3"
+        assert len(recorder.events) == 1
+        c.remove_hook(recorder)
+        c.catalog.nodes()
+        assert len(recorder.events) == 1
+
+
+async def test_aio(agent_cache_server):
+    c = consul.aio.Consul(port=agent_cache_server)
+    recorder = c.add_hook(Recorder())
+    await c.health.service("web")
+    await c.catalog.nodes()
+    service, nodes = recorder.events
+    assert (service.method, service.endpoint, service.attempts) == ("GET", "/v1/health/service/{service}", 1)
+    assert (nodes.endpoint, nodes.status, nodes.index) == ("/v1/catalog/nodes", 200, "3")
+    assert nodes.decode_time > 0
+    await c.close()
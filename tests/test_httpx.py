@@ -0,0 +1,87 @@
+import socket
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import consul.httpx  # noqa: E402  # pylint: disable=wrong-import-position
+
+
+class TestHTTPXConsul:
+    # pylint: disable=protected-access
+    def test_uri(self):
+        http = consul.httpx.HTTPClient()
+        assert http.uri("/v1/kv", params={"index": 1}) == "http://127.0.0.1:8500/v1/kv?index=1"
+
+    def test_sync(self, gzip_server):
+        with consul.httpx.Consul(port=gzip_server, compress=True) as c:
+            index, nodes = c.catalog.nodes()
+            assert index == "1"
+            assert len(nodes) == 100
+            stats = c.compression_stats()
+            assert stats["compressed"] == 1
+            assert 0 < stats["wire_bytes"] < stats["body_bytes"]
+
+    async def test_async(self, gzip_server):
+        async with consul.httpx.AsyncConsul(port=gzip_server) as c:
+            index, nodes = await c.catalog.nodes()
+            assert index == "1"
+            assert len(nodes) == 100
+
+    async def test_kv(self, fake_consul):
+        with consul.httpx.Consul(port=fake_consul.port) as c:
+            assert c.kv.put("foo", "bar", connections_timeout=5) is True
+            _, data = c.kv.get("foo", connections_timeout=5)
+            assert data["Value"] == b"bar"
+            fake_consul.latency = 0.5
+            with pytest.raises(consul.Timeout):
+                c.kv.get("foo", connections_timeout=0.1)
+            fake_consul.latency = 0
+            assert c.kv.delete("foo", connections_timeout=5) is True
+        async with consul.httpx.AsyncConsul(port=fake_consul.port) as c:
+            assert await c.kv.put("foo", "baz", connections_timeout=5) is True
+            _, data = await c.kv.get("foo", connections_timeout=5)
+            assert data["Value"] == b"baz"
+            fake_consul.latency = 0.5
+            with pytest.raises(consul.Timeout):
+                await c.kv.get("foo", connections_timeout=0.1)
+            fake_consul.latency = 0
+            assert await c.kv.delete("foo", connections_timeout=5) is True
+
+    async def test_unix_socket(self, unix_server):
+        with consul.httpx.Consul(host=unix_server) as c:
+            _, nodes = c.catalog.nodes()
+            assert len(nodes) == 100
+        async with consul.httpx.AsyncConsul(host=unix_server) as c:
+            _, nodes = await c.catalog.nodes()
+            assert len(nodes) == 100
+
+    async def test_failover(self, gzip_server):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(("127.0.0.1", 0))
+        dead_address = f"127.0.0.1:{s.getsockname()[1]}"
+        s.close()
+        addresses = [dead_address, f"127.0.0.1:{gzip_server}"]
+        with consul.httpx.Consul(addresses=addresses, probe_interval=0) as c:
+            for _ in range(3):
+                _, nodes = c.catalog.nodes()
+                assert len(nodes) == 100
+            assert [e["healthy"] for e in c.http.endpoints.stats()] == [False, True]
+        async with consul.httpx.AsyncConsul(addresses=addresses, probe_interval=0) as c:
+            _, nodes = await c.catalog.nodes()
+            assert len(nodes) == 100
+
+    def test_http2_enabled_for_tls(self):
+        pytest.importorskip("h2")
+        c = consul.httpx.Consul(scheme="https", verify=False)
+        pool = c.http.client._transport._pool
+        assert pool._http2 is True
+        assert pool._ssl_context.verify_mode.name == "CERT_NONE"
+        c.close()
+
+    def test_tls_addresses(self):
+        c = consul.httpx.Consul(
+            addresses=["https://10.0.0.1:8501", "10.0.0.2:8500"], probe_interval=0, verify=False, http2=False
+        )
+        assert c.http.client._transport._pool._ssl_context.verify_mode.name == "CERT_NONE"
+        c.close()
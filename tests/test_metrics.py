@@ -0,0 +1,67 @@
+import consul.std
+from consul.exceptions import NotFound
+from consul.hooks import RequestEvent
+from consul.metrics import MetricsCollector
+
+
+def observe(collector, event, duration, status=200, index=None, error=None):
+    collector.request_start(event)
+    event.duration = duration
+    event.status = status
+    event.index = index
+    event.error = error
+    collector.request_end(event)
+
+
+class TestMetricsCollector:
+    def test_requests(self):
+        collector = MetricsCollector(buckets=(0.01, 0.1))
+        observe(collector, RequestEvent("GET", "/v1/kv/a"), 0.005)
+        observe(collector, RequestEvent("GET", "/v1/kv/b"), 0.1)
+        observe(collector, RequestEvent("GET", "/v1/kv/c"), 0.5, status=404, error=NotFound("c"))
+        observe(collector, RequestEvent("PUT", "/v1/kv/a"), 0.02, status=None, error=ConnectionError())
+        text = collector.expose()
+        assert 'consul_client_requests_total{endpoint="/v1/kv/{key}",method="GET",status="200"} 2' in text
+        assert 'consul_client_requests_total{endpoint="/v1/kv/{key}",method="GET",status="404"} 1' in text
+        assert 'consul_client_requests_total{endpoint="/v1/kv/{key}",method="PUT",status="error"} 1' in text
+        buckets = [line for line in text.splitlines() if 'method="GET",le=' in line]
+        assert [line.rsplit(" ", 1)[1] for line in buckets] == ["1", "2", "3"]
+        assert buckets[-1].endswith('le="+Inf"} 3')
+        assert 'consul_client_request_duration_seconds_sum{endpoint="/v1/kv/{key}",method="GET"} 0.605' in text
+        assert 'consul_client_request_duration_seconds_count{endpoint="/v1/kv/{key}",method="GET"} 3' in text
+        assert 'consul_client_errors_total{endpoint="/v1/kv/{key}",method="GET",error="NotFound"} 1' in text
+        assert 'consul_client_errors_total{endpoint="/v1/kv/{key}",method="PUT",error="ConnectionError"} 1' in text
+        assert 'consul_client_requests_in_flight{endpoint="/v1/kv/{key}",method="GET"} 0' in text
+        assert "# TYPE consul_client_request_duration_seconds histogram" in text
+
+    def test_in_flight(self):
+        collector = MetricsCollector(namespace="app_consul")
+        collector.request_start(RequestEvent("GET", "/v1/health/service/web"))
+        assert 'app_consul_requests_in_flight{endpoint="/v1/health/service/{service}",method="GET"} 1' in (
+            collector.expose()
+        )
+
+    def test_blocking(self):
+        collector = MetricsCollector()
+        params = [("index", "5"), ("wait", "1m")]
+        observe(collector, RequestEvent("GET", "/v1/kv/a", params, blocking=True), 60.0, index="5")
+        observe(collector, RequestEvent("GET", "/v1/kv/a", params, blocking=True), 2.0, index="6")
+        observe(collector, RequestEvent("GET", "/v1/kv/a", params, blocking=True), 2.0, index="7")
+        text = collector.expose()
+        assert 'consul_client_blocking_wakeups_total{endpoint="/v1/kv/{key}",changed="false"} 1' in text
+        assert 'consul_client_blocking_wakeups_total{endpoint="/v1/kv/{key}",changed="true"} 2' in text
+        assert "request_duration_seconds_count" not in text
+
+    def test_escaping(self):
+        collector = MetricsCollector()
+        observe(collector, RequestEvent("GET", '/v1/agent/"x"\n'), 0.1)
+        assert 'endpoint="/v1/agent/\\"x\\"\\n"' in collector.expose()
+
+    def test_std(self, agent_cache_server):
+        collector = MetricsCollector()
+        c = consul.std.Consul(port=agent_cache_server, hooks=[collector])
+        c.catalog.nodes()
+        c.health.service("web", index="2")
+        text = collector.expose()
+        assert 'consul_client_requests_total{endpoint="/v1/catalog/nodes",method="GET",status="200"} 1' in text
+        assert 'consul_client_blocking_wakeups_total{endpoint="/v1/health/service/{service}",changed="true"} 1' in text
@@ -0,0 +1,90 @@
+import pytest
+
+import consul
+import consul.aio
+import consul.std
+from consul.retry import RetryBudget, RetryPolicy
+
+
+def no_backoff(**kwargs):
+    return RetryPolicy(backoff=0, budget=RetryBudget(), **kwargs)
+
+
+class TestRetryBudget:
+    def test_reserve(self):
+        budget = RetryBudget(ratio=0, min_retries_per_second=1, window=3)
+        assert [budget.withdraw() for _ in range(4)] == [True, True, True, False]
+        assert budget.stats() == {"requests": 0, "retries": 3, "rejected": 1}
+
+    def test_ratio(self):
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0)
+        for _ in range(4):
+            budget.record_request()
+        assert [budget.withdraw() for _ in range(3)] == [True, True, False]
+
+
+class TestRetryPolicy:
+    def test_delay(self):
+        policy = RetryPolicy(backoff=0.1, max_backoff=0.3, jitter=False)
+        assert [policy.delay(attempt) for attempt in (1, 2, 3, 4)] == [0.1, 0.2, 0.3, 0.3]
+        policy.jitter = True
+        assert all(0 <= policy.delay(3) <= 0.3 for _ in range(100))
+
+    @pytest.mark.parametrize(
+        ("method", "attempt", "kwargs", "expected"),
+        [
+            ("GET", 1, {"status": 503}, True),
+            ("GET", 1, {"status": 404}, False),
+            ("GET", 3, {"status": 503}, False),
+            ("PUT", 1, {"status": 503}, False),
+            ("GET", 1, {"error": OSError()}, True),
+            ("PUT", 1, {"error": OSError()}, False),
+            ("PUT", 1, {"error": OSError(), "connect_failed": True}, True),
+        ],
+    )
+    def test_should_retry(self, method, attempt, kwargs, expected):
+        assert no_backoff().should_retry(method, attempt, **kwargs) is expected
+
+    def test_budget_exhausted(self):
+        policy = RetryPolicy(backoff=0, budget=RetryBudget(ratio=0, min_retries_per_second=0))
+        assert policy.should_retry("GET", 1, status=503) is False
+        assert policy.budget.stats()["rejected"] == 1
+
+    def test_run_gives_up_after_max_attempts(self):
+        calls = []
+
+        def send():
+            calls.append(1)
+            raise ConnectionError
+
+        with pytest.raises(ConnectionError):
+            no_backoff().run("GET", send, status=None, errors=ConnectionError)
+        assert len(calls) == 3
+
+
+class TestTransports:
+    def test_std(self, flaky_server):
+        port, seen = flaky_server
+        c = consul.std.Consul(port=port, retry=no_backoff())
+        assert c.catalog.nodes() == ("1", [])
+        assert seen == ["GET"] * 3
+
+    def test_std_writes_not_resent(self, flaky_server):
+        port, seen = flaky_server
+        c = consul.std.Consul(port=port, retry=no_backoff())
+        with pytest.raises(consul.ConsulException):
+            c.kv.put("foo", "bar")
+        assert seen == ["PUT"]
+
+    def test_std_default_policy(self, flaky_server):
+        port, _ = flaky_server
+        c = consul.std.Consul(port=port, retry=True)
+        assert isinstance(c.http.retry, RetryPolicy)
+        assert consul.std.Consul(port=port).http.retry is None
+
+    async def test_aio(self, flaky_server):
+        port, seen = flaky_server
+        c = consul.aio.Consul(port=port, retry=no_backoff())
+        assert await c.catalog.nodes() == ("1", [])
+        assert seen == ["GET"] * 3
+        await c.close()
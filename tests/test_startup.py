@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+import consul
+import consul.std
+from consul import base
+
+
+def run(code):
+    return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.split()
+
+
+def test_import_is_lazy():
+    heavy = ("requests", "urllib3", "aiohttp", "httpx", "consul.std", "consul.api.kv")
+    code = f"import sys, consul; print(*[m for m in {heavy!r} if m in sys.modules])"
+    assert run(code) == []
+
+
+def test_endpoints_are_lazy():
+    code = (
+        "import sys, consul; c = consul.Consul(); loaded = 'consul.api.kv' in sys.modules; c.kv;"
+        "print(loaded, 'consul.api.kv' in sys.modules, 'consul.api.acl' in sys.modules)"
+    )
+    assert run(code) == ["False", "True", "False"]
+
+
+def test_lazy_attributes():
+    assert consul.Consul is consul.std.Consul
+    assert "Consul" in dir(consul)
+    c = consul.Consul()
+    assert "kv" not in vars(c)
+    kv = c.kv
+    assert vars(c)["kv"] is kv
+    assert c.kv is kv
+    assert c.agent.service.agent is c
+    assert base.Consul.kv.module == "consul.api.kv"
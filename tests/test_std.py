@@ -1,10 +1,155 @@
+import gc
+import json
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 import consul
+import consul.callback
 import consul.check
 import consul.std
 
 
 class TestHTTPClient:
+    # pylint: disable=protected-access
     def test_uri(self):
         http = consul.std.HTTPClient()
         assert http.uri("/v1/kv") == "http://127.0.0.1:8500/v1/kv"
         assert http.uri("/v1/kv", params={"index": 1}) == "http://127.0.0.1:8500/v1/kv?index=1"
+
+    def test_pool_settings(self):
+        c = consul.std.Consul(pool_connections=3, pool_maxsize=20, pool_block=True, keep_alive=False)
+        adapter = c.http.session.get_adapter("http://127.0.0.1:8500/v1/kv")
+        assert adapter is c.http.adapter
+        assert adapter._pool_connections == 3
+        assert adapter._pool_maxsize == 20
+        assert adapter._pool_block is True
+        assert c.http.session.headers["Connection"] == "close"
+        assert c.pool_stats() == {"pools": 0, "in_use": 0, "idle": 0, "discarded": 0}
+
+    def test_pool_stats(self, local_server):
+        c = consul.std.Consul(port=local_server, pool_maxsize=1)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: c.catalog.nodes(), range(4)))
+        assert results == [("1", [])] * 4
+        stats = c.pool_stats()
+        assert stats["pools"] == 1
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
+        assert stats["discarded"] == 3
+
+    def test_close_releases_connections(self, local_server):
+        with consul.std.Consul(port=local_server) as c:
+            c.catalog.nodes()
+            assert c.pool_stats()["idle"] == 1
+        assert c.pool_stats()["pools"] == 0
+
+    def test_compression(self, gzip_server):
+        c = consul.std.Consul(port=gzip_server, compress=True)
+        _, nodes = c.catalog.nodes()
+        assert len(nodes) == 100
+        stats = c.compression_stats()
+        assert stats["responses"] == 1
+        assert stats["compressed"] == 1
+        assert 0 < stats["wire_bytes"] < stats["body_bytes"]
+        assert stats["body_bytes"] == len(json.dumps(nodes))
+
+    def test_unix_socket(self, unix_server):
+        c = consul.std.Consul(host=unix_server)
+        assert c.http.base_uri == "http://localhost"
+        index, nodes = c.catalog.nodes()
+        assert index == "1"
+        assert len(nodes) == 100
+        assert c.pool_stats()["idle"] == 1
+
+    def test_timeout(self):
+        http = consul.std.HTTPClient(connect_timeout=2, read_timeout=10, wait_margin=5)
+        assert http.timeout([("dc", "dc1")]) == (2, 10)
+        assert http.timeout([("index", "42"), ("wait", "32s")]) == (2, 32 + 2 + 5)
+        # the agent's default wait
+        assert http.timeout({"index": 42}) == (2, 300 + 18.75 + 5)
+        assert http.timeout([("index", "42")], connections_timeout=1) == (2, 1)
+        assert consul.std.HTTPClient().timeout(None) == (None, None)
+
+    def test_read_timeout(self, local_server):
+        c = consul.std.Consul(port=local_server, read_timeout=0.05)
+        with pytest.raises(consul.Timeout):
+            c.catalog.nodes()
+        assert c.catalog.nodes(index=1, wait="1s") == ("1", [])
+
+    def test_connections_timeout(self, local_server):
+        c = consul.std.Consul(port=local_server)
+        with pytest.raises(consul.Timeout):
+            c.kv.get("foo", connections_timeout=0.05)
+
+    def test_thread_safe_sessions(self, local_server):
+        c = consul.std.Consul(port=local_server, thread_safe=True)
+        session = c.http.session
+        assert c.http.session is session
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            sessions = set(executor.map(lambda _: c.http.session, range(2)))
+        assert session not in sessions
+        c.close()
+
+    def test_thread_safe_sessions_released(self, gzip_server):
+        c = consul.std.Consul(port=gzip_server, thread_safe=True)
+        sessions = weakref.WeakSet()
+
+        def call():
+            c.kv.get("foo")
+            sessions.add(c.http.session)
+
+        for _ in range(50):
+            thread = threading.Thread(target=call)
+            thread.start()
+            thread.join()
+        gc.collect()
+        # the session of every thread is gone with it
+        assert len(sessions) == 0
+        assert c.pool_stats()["idle"] == 1
+        c.close()
+
+    def test_thread_safe_stress(self, gzip_server):
+        workers = 64
+        c = consul.std.Consul(port=gzip_server, thread_safe=True, pool_maxsize=workers, pool_block=True, compress=True)
+
+        def call(i):
+            if i % 2:
+                return c.kv.get("foo")[1]["Node"]
+            return c.health.service("foo")[1][99]["Node"]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(call, range(2000)))
+        assert results == ["node-99", "node-0"] * 1000
+        assert c.compression_stats()["responses"] == 2000
+        stats = c.pool_stats()
+        assert stats["in_use"] == 0
+        assert stats["discarded"] == 0
+        assert 0 < stats["idle"] <= workers
+        c.close()
+
+    def test_agent_cache(self, agent_cache_server):
+        c = consul.std.Consul(port=agent_cache_server)
+        meta, body = c.health.service("web", cached=True, max_age=30, stale_if_error=60, meta=True)
+        assert meta == consul.callback.QueryMeta("3", 0.012, True, "stale", cache_hit=True, age=7)
+        assert body["path"] == "/v1/health/service/web?cached="
+        assert body["cache_control"] == "max-age=30, stale-if-error=60"
+        meta, body = c.catalog.services(meta=True)
+        assert meta.cache_hit is None
+        assert body["cache_control"] is None
+        meta, body = c.query.execute("geo", cached=True, meta=True)
+        assert body["path"] == "/v1/query/geo/execute?cached="
+        assert meta.age == 7
+
+    def test_query_meta(self, agent_cache_server):
+        c = consul.std.Consul(port=agent_cache_server)
+        for read in (c.session.list, c.coordinate.nodes, lambda **kw: c.health.state("any", **kw)):
+            meta, _ = read(meta=True)
+            assert meta.index == "3"
+            assert meta.last_contact == 0.012
+            assert meta.known_leader is True
+            assert meta.effective_consistency == "stale"
+        index, _ = c.session.list()
+        assert index == "3"
@@ -0,0 +1,61 @@
+import pytest
+import requests
+
+import consul.aio
+import consul.std
+from consul.tracing import TracingHook
+
+sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+in_memory = pytest.importorskip("opentelemetry.sdk.trace.export.in_memory_span_exporter")
+export = pytest.importorskip("opentelemetry.sdk.trace.export")
+trace = pytest.importorskip("opentelemetry.trace")
+
+
+@pytest.fixture
+def spans():
+    exporter = in_memory.InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(export.SimpleSpanProcessor(exporter))
+    yield provider.get_tracer("test"), exporter
+    provider.shutdown()
+
+
+def test_std(agent_cache_server, spans):
+    tracer, exporter = spans
+    c = consul.std.Consul(port=agent_cache_server, dc="dc1", consistency="stale", hooks=[TracingHook(tracer)])
+    c.catalog.nodes()
+    c.health.service("web", index="2", wait="10s")
+    nodes, service = exporter.get_finished_spans()
+    assert nodes.name == "consul GET /v1/catalog/nodes"
+    assert nodes.kind == trace.SpanKind.CLIENT
+    assert nodes.attributes["consul.dc"] == "dc1"
+    assert nodes.attributes["consul.consistency"] == "stale"
+    assert nodes.attributes["consul.blocking"] is False
+    assert nodes.attributes["consul.response.index"] == "3"
+    assert nodes.attributes["http.response.status_code"] == 200
+    assert nodes.attributes["consul.retry_count"] == 0
+    assert service.name == "consul GET /v1/health/service/{service} blocking"
+    assert service.attributes["consul.index"] == "2"
+    assert service.attributes["consul.wait"] == 10
+
+
+def test_error(dead_address, spans):
+    tracer, exporter = spans
+    c = consul.std.Consul(addresses=[dead_address], probe_interval=0, hooks=[TracingHook(tracer)])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        c.kv.get("foo")
+    (span,) = exporter.get_finished_spans()
+    assert span.status.status_code == trace.StatusCode.ERROR
+    assert span.events[0].name == "exception"
+    c.close()
+
+
+async def test_aio(agent_cache_server, spans):
+    tracer, exporter = spans
+    c = consul.aio.Consul(port=agent_cache_server, hooks=[TracingHook(tracer)])
+    with tracer.start_as_current_span("parent") as parent:
+        await c.catalog.nodes()
+    (span, _) = exporter.get_finished_spans()
+    assert span.parent.span_id == parent.get_span_context().span_id
+    assert trace.get_current_span() is trace.INVALID_SPAN
+    await c.close()
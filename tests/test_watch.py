@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+import consul.aio
+import consul.std
+from consul.callback import QueryMeta
+from consul.watch import Watch
+
+
+class Scripted:
+    """Endpoint returning *results* in turn, recording the index of every call"""
+
+    def __init__(self, watch_stop, *results):
+        self.results = list(results)
+        self.indexes = []
+        self.watch_stop = watch_stop
+
+    def __call__(self, index=None, wait=None):
+        self.indexes.append(index)
+        result = self.results.pop(0)
+        if not self.results:
+            self.watch_stop()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def run(watch, fn):
+    watch.fn = fn
+    return list(watch)
+
+
+def test_index_handling():
+    watch = Watch(None, min_interval=0)
+    fn = Scripted(watch.stop, ("5", "a"), ("5", "a"), ("6", "b"), ("3", "c"), ("0", "c"), ("2", "d"))
+    assert run(watch, fn) == [("5", "a"), ("6", "b"), ("0", "c"), ("2", "d")]
+    # reset once the index went backwards, and to 1 once it was 0
+    assert fn.indexes == [None, 5, 5, 6, None, 1]
+
+
+def test_query_meta():
+    watch = Watch(None, min_interval=0)
+    fn = Scripted(watch.stop, (QueryMeta(index="7"), "a"), (QueryMeta(index="7"), "a"))
+    assert [data for _, data in run(watch, fn)] == ["a"]
+    assert watch.index == 7
+
+
+def test_errors_back_off(monkeypatch):
+    delays = []
+    watch = Watch(None, min_interval=0, backoff=0.001, max_backoff=0.002)
+    monkeypatch.setattr(watch, "_failed", lambda attempt, error: delays.append(attempt) or 0)
+    fn = Scripted(watch.stop, ConnectionError(), ConnectionError(), ("1", "a"), ConnectionError(), ("2", "b"))
+    assert run(watch, fn) == [("1", "a"), ("2", "b")]
+    assert delays == [1, 2, 1]
+
+
+def test_min_interval():
+    watch = Watch(None, min_interval=0.05)
+    fn = Scripted(watch.stop, ("1", "a"), ("2", "b"), ("3", "c"))
+    start = time.monotonic()
+    assert len(run(watch, fn)) == 3
+    assert time.monotonic() - start >= 0.1
+
+
+def test_std(fake_consul):
+    c = consul.std.Consul(port=fake_consul.port)
+    c.kv.put("config/a", "1")
+    updates = []
+    changed = threading.Event()
+
+    def callback(_, data):
+        updates.append([d["Value"] for d in data])
+        changed.set()
+
+    watch = Watch(c.kv.get, "config/", recurse=True, wait="1s", min_interval=0).start(callback)
+    assert changed.wait(5)
+    changed.clear()
+    c.kv.put("config/b", "2")
+    assert changed.wait(5)
+    watch.stop(timeout=5)
+    assert updates == [[b"1"], [b"1", b"2"]]
+
+
+async def test_aio(fake_consul):
+    c = consul.aio.Consul(port=fake_consul.port)
+    await c.kv.put("foo", "1")
+    watch = Watch(c.kv.get, "foo", wait="1s", min_interval=0)
+    values = []
+    async for _, data in watch:
+        values.append(data["Value"])
+        if len(values) == 2:
+            break
+        await c.kv.put("foo", "2")
+    assert values == [b"1", b"2"]
+    await c.close()
+
+
+def test_start_twice():
+    watch = Watch(None, min_interval=0)
+    watch.fn = Scripted(watch.stop, ("1", "a"))
+    watch.start(lambda index, data: None)
+    with pytest.raises(AssertionError):
+        watch.start(print)
+    watch.stop(timeout=5)